@@ -1,24 +1,33 @@
 # /// script
 # requires-python = ">=3.11"
-# dependencies = ["pandas", "seaborn", "matplotlib", "openai", "httpx","chardet","requests","scikit-learn","numpy"]
+# dependencies = ["pandas", "seaborn", "matplotlib", "openai", "httpx","chardet","requests","scikit-learn","numpy","pillow","pyarrow"]
 # ///
 
 
 
 import os
 import sys
-import pandas as pd
-import numpy as np
-import chardet 
 import json
-import requests
-import seaborn as sns
-import matplotlib.pyplot as plt
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.impute import SimpleImputer
-from sklearn.metrics import silhouette_score
+import time
+import argparse
 import base64
+import io
+import math
+from dataclasses import dataclass, field, asdict
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import glob
+import hashlib
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import tempfile
+# heavy dependencies (pandas, numpy, matplotlib, seaborn, scikit-learn, chardet, requests, pillow) are imported inside
+# the functions that use them, so usage errors are reported instantly and --profile-only never loads the plotting or ML
+# stacks
 
 
 # NOTES TO FOLLOW, NOT STRICTLY NECESSARY, MORE OF LIKE A ROADMAP
@@ -35,30 +44,379 @@ import base64
 
 
 
-def load_dataset(file_path):
+# Input formats are recognized by their magic bytes, so a Parquet file named .csv (or a gzipped CSV without .gz)
+# is still read correctly. Compressed CSVs are decompressed on the fly; Parquet and Arrow IPC/Feather files are read
+# column by column, Arrow files memory-mapped. Feather v1 predates the Arrow IPC file format and has its own reader.
+COLUMNAR_FORMATS = ('parquet', 'arrow', 'feather')
+_MAGIC_BYTES = [
+    (b'PAR1', 'parquet', None),
+    (b'ARROW1', 'arrow', None),  # Arrow IPC file, also Feather v2
+    (b'FEA1', 'feather', None),  # Feather v1
+    (b'\x1f\x8b', 'csv', 'gzip'),
+    (b'\x28\xb5\x2f\xfd', 'csv', 'zstd'),
+    (b'BZh', 'csv', 'bz2'),
+    (b'\xfd7zXZ\x00', 'csv', 'xz'),
+]
+DATASET_EXTENSIONS = ('.csv', '.csv.gz', '.csv.zst', '.csv.bz2', '.csv.xz', '.parquet', '.pq', '.feather', '.arrow')
+# usecols value that loads only the numeric columns, the ones correlation and clustering work on
+NUMERIC_COLUMNS = 'numeric'
+# rows parsed to find the numeric columns of a CSV for usecols='numeric'
+CSV_SCHEMA_ROWS = 10_000
+# sidecar cache of CSVs converted to uncompressed Arrow IPC files, so repeat analyses skip parsing
+COLUMNAR_CACHE_DIR = os.environ.get("AUTOLYSIS_COLUMNAR_DIR",
+                                    os.path.join(os.path.expanduser("~"), ".cache", "autolysis", "columnar"))
+
+
+def detect_format(file_path):
     """
-    Load a dataset with automatic encoding detection.
-    
     :param file_path: Path to the dataset file
+    :return: tuple of (format, compression), format is 'csv', 'parquet', 'arrow' or 'feather' (Feather v1) and
+             compression is None or one of 'gzip', 'zstd', 'bz2', 'xz' for compressed CSVs
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(8)
+    for magic, file_format, compression in _MAGIC_BYTES:
+        if head.startswith(magic):
+            return file_format, compression
+    return 'csv', None
+
+
+def _open_binary(file_path, compression=None):
+    # binary file object yielding the decompressed bytes
+    if compression == 'gzip':
+        import gzip
+        return gzip.open(file_path, 'rb')
+    if compression == 'bz2':
+        import bz2
+        return bz2.open(file_path, 'rb')
+    if compression == 'xz':
+        import lzma
+        return lzma.open(file_path, 'rb')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Reading zstd-compressed files needs the zstandard package.")
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+    return open(file_path, 'rb')
+
+
+# Encoding detection reads the file in blocks and stops once the detector is confident or the byte cap is hit,
+# so multi-GB files don't need a full extra pass before they are parsed.
+ENCODING_BLOCK_BYTES = 64 * 1024
+ENCODING_MAX_BYTES = 4 * 1024 * 1024
+
+
+def detect_encoding(file_path, block_size=ENCODING_BLOCK_BYTES, max_bytes=ENCODING_MAX_BYTES, compression=None):
+    """
+    Detect the encoding of a file incrementally instead of reading it whole.
+
+    :param file_path: Path to the dataset file
+    :param block_size: Number of bytes fed to the detector per read
+    :param max_bytes: Stop after this many bytes even if the detector is not confident yet (None reads the whole file)
+    :param compression: Compression of the file (see detect_format), the decompressed bytes are inspected
+    :return: tuple of (encoding, bytes_read)
+    """
+    import chardet
+    detector = chardet.UniversalDetector()
+    bytes_read = 0
+    with _open_binary(file_path, compression) as f:
+        while max_bytes is None or bytes_read < max_bytes:
+            block = f.read(block_size)
+            if not block:
+                break
+            bytes_read += len(block)
+            detector.feed(block)
+            if detector.done:
+                break
+    detector.close()
+
+    encoding = detector.result['encoding'] or 'utf-8'
+    # an ascii prefix only tells us the leading part has no special characters, utf-8 is a superset of it
+    # and can still decode the rest of the file
+    if encoding.lower() == 'ascii':
+        encoding = 'utf-8'
+    return encoding, bytes_read
+
+
+def _read_csv(file_path, encoding, usecols=None, engine=None, chunksize=None, compression=None):
+    import pandas as pd
+    # chunked parsing keeps the parser buffers small and lets usecols drop unwanted columns chunk by chunk
+    if chunksize:
+        reader = pd.read_csv(file_path, encoding=encoding, usecols=usecols, engine=engine, chunksize=chunksize,
+                             compression=compression)
+        return pd.concat(reader, ignore_index=True)
+    return pd.read_csv(file_path, encoding=encoding, usecols=usecols, engine=engine, compression=compression)
+
+
+def _columnar_schema(file_path, file_format):
+    # Arrow schema of a Parquet or Arrow file, read from the footer / the memory-mapped file without loading data
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        import pyarrow.feather as feather
+    except ImportError:
+        raise ValueError("Reading Parquet and Arrow files needs the pyarrow package.")
+    if file_format == 'parquet':
+        return pq.read_schema(file_path)
+    if file_format == 'feather':
+        # Feather v1 has no schema-only reader, the memory-mapped table costs little more than its metadata
+        return feather.read_table(file_path, memory_map=True).schema
+    with pa.memory_map(file_path) as source:
+        return pa.ipc.open_file(source).schema
+
+
+def _read_columnar(file_path, file_format, usecols=None):
+    # only the requested columns are read; Arrow files are memory-mapped, so untouched columns are never paged in
+    try:
+        import pyarrow.parquet as pq
+        import pyarrow.feather as feather
+    except ImportError:
+        raise ValueError("Reading Parquet and Arrow files needs the pyarrow package.")
+    if file_format == 'parquet':
+        table = pq.read_table(file_path, columns=usecols, memory_map=True)
+    else:
+        # Arrow IPC and both Feather versions
+        table = feather.read_table(file_path, columns=usecols, memory_map=True)
+    metadata = table.schema.metadata or {}
+    return table.to_pandas(), metadata.get(b'autolysis.encoding', b'').decode() or None
+
+
+def _project(columns, names):
+    # the requested columns in file order, like read_csv(usecols=...) returns them
+    if columns is None:
+        return None
+    missing = [column for column in columns if column not in names]
+    if missing:
+        raise ValueError(f"Columns not found in the dataset: {missing}")
+    requested = set(columns)
+    return [name for name in names if name in requested]
+
+
+def _numeric_columns(file_path, file_format, encoding=None, compression=None):
+    # the numeric columns of a file, from the schema of columnar files and from a leading sample of CSVs
+    import pandas as pd
+    if file_format in COLUMNAR_FORMATS:
+        import pyarrow as pa
+        return [column.name for column in _columnar_schema(file_path, file_format)
+                if pa.types.is_integer(column.type) or pa.types.is_floating(column.type)]
+    sample = pd.read_csv(file_path, encoding=encoding, nrows=CSV_SCHEMA_ROWS, compression=compression)
+    return sample.select_dtypes(include='number').columns.tolist()
+
+
+def _sidecar_path(file_path, cache_dir):
+    # <hash of the path>-<hash of size and mtime>.arrow, so outdated sidecars of the same file can be found and removed
+    stat = os.stat(file_path)
+    path_key = hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()[:16]
+    version_key = hashlib.sha256(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{path_key}-{version_key}.arrow")
+
+
+def _write_sidecar(df, sidecar_path, encoding):
+    # uncompressed Arrow IPC, so later runs can memory-map it; written atomically and replacing older versions
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    directory = os.path.dirname(sidecar_path)
+    os.makedirs(directory, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'autolysis.encoding': encoding.encode()})
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, sidecar_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    prefix = os.path.basename(sidecar_path).split('-')[0]
+    for old in glob.glob(os.path.join(directory, f"{prefix}-*.arrow")):
+        if old != sidecar_path:
+            os.remove(old)
+
+
+# In compact mode string columns with at most this share of distinct values become categoricals
+COMPACT_CATEGORY_RATIO = 0.5
+
+
+def compact_dataframe(df, category_ratio=COMPACT_CATEGORY_RATIO):
+    """
+    Shrink the in-memory footprint of a DataFrame without changing any value.
+
+    - integer columns are downcast to the smallest integer type holding their range
+    - float columns become float32 when every value survives the round trip unchanged
+    - string columns with few distinct values become categoricals, the remaining object columns Arrow-backed strings
+      (when pyarrow is installed)
+
+    Memory before and after (memory_usage(deep=True)) and the conversions are stored in df.attrs['memory_stats'].
+
+    :param df: pandas DataFrame, left unchanged
+    :param category_ratio: Largest share of distinct non-null values for which a string column becomes categorical
+    :return: compacted copy of df
+    """
+    import pandas as pd
+    import numpy as np
+    try:
+        import pyarrow  # noqa: F401, only needed for the Arrow-backed string dtype
+        string_dtype = pd.StringDtype("pyarrow")
+    except ImportError:
+        string_dtype = None
+
+    before = int(df.memory_usage(deep=True).sum())
+    compact = df.copy(deep=False)
+    conversions = {}
+    for column in df.columns:
+        series = df[column]
+        converted = None
+        if pd.api.types.is_bool_dtype(series.dtype):
+            continue
+        if pd.api.types.is_integer_dtype(series.dtype):
+            downcast = 'unsigned' if len(series) and series.min() >= 0 else 'integer'
+            converted = pd.to_numeric(series, downcast=downcast)
+        elif pd.api.types.is_float_dtype(series.dtype) and series.dtype != np.float32:
+            candidate = series.astype(np.float32)
+            # float32 only when every value is exact; aggregates may still differ in the 7th significant digit
+            if np.array_equal(candidate.to_numpy(dtype=np.float64), series.to_numpy(dtype=np.float64), equal_nan=True):
+                converted = candidate
+        elif pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+            non_null = series.dropna()
+            if len(non_null) and not all(isinstance(value, str) for value in non_null.head(1000)):
+                continue  # mixed objects, leave them alone
+            if len(non_null) and non_null.nunique() <= category_ratio * len(non_null):
+                converted = series.astype('category')
+            elif string_dtype is not None and getattr(series.dtype, 'storage', None) != 'pyarrow':
+                # pandas >= 3 already stores strings in Arrow, older versions hold Python objects
+                converted = series.astype(string_dtype)
+        if converted is not None and converted.dtype != series.dtype:
+            compact[column] = converted
+            conversions[column] = f"{series.dtype} -> {converted.dtype}"
+
+    after = int(compact.memory_usage(deep=True).sum())
+    compact.attrs['memory_stats'] = {"before_bytes": before, "after_bytes": after, "conversions": conversions}
+    return compact
+
+
+def load_dataset(file_path, usecols=None, engine=None, chunksize=None, compact=False, columnar_cache=None):
+    """
+    Load a dataset with automatic format and encoding detection.
+
+    CSV files (plain or gzip/zstd/bz2/xz compressed): the encoding is detected from a bounded, incrementally read
+    prefix of the decompressed data and the file is then parsed in a single pass. Parquet and Arrow IPC/Feather files
+    are read column by column, Arrow files memory-mapped. Ingestion statistics (format, bytes read, time spent
+    detecting vs parsing) are stored in df.attrs['load_stats'].
+
+    :param file_path: Path to the dataset file
+    :param usecols: Optional list of columns to load, the rest are never materialized; NUMERIC_COLUMNS ('numeric')
+                    loads only the numeric columns
+    :param engine: Optional pandas parser engine for CSVs ('c', 'python' or 'pyarrow')
+    :param chunksize: Optional number of rows per chunk for chunked CSV parsing (not supported by the pyarrow engine)
+    :param compact: Downcast numbers and encode strings compactly after parsing (see compact_dataframe)
+    :param columnar_cache: Optional directory for columnar sidecars: a CSV is converted once into an Arrow file
+                           there and later loads of the unchanged CSV memory-map that file instead of parsing
     :return: pandas DataFrame or None if an error occurs
     """
     try:
-        # Detect encoding as it is not safe to assume unknown dataset is encoded using regular utf-8 or any other encoding.
-        with open(file_path, 'rb') as f:
-            result = chardet.detect(f.read())  # Detect encoding from the whole file as only leading part may be misleading
-            detected_encoding = result['encoding']
-        
-        # Load dataset
-        df = pd.read_csv(file_path, encoding=detected_encoding)
+        if engine == 'pyarrow' and chunksize:
+            raise ValueError("The pyarrow engine does not support chunked parsing, use either engine or chunksize.")
+
+        file_format, compression = detect_format(file_path)
+        source = file_path
+        detected_encoding, detect_bytes, detect_seconds = None, 0, 0.0
+        sidecar = _sidecar_path(file_path, columnar_cache) if columnar_cache and file_format == 'csv' else None
+        if sidecar and os.path.exists(sidecar):
+            # converted by an earlier run, read it like any Arrow file
+            source, file_format = sidecar, 'arrow'
+
+        start = time.perf_counter()
+        if file_format in COLUMNAR_FORMATS:
+            columns = _numeric_columns(source, file_format) if usecols == NUMERIC_COLUMNS else usecols
+            columns = _project(columns, _columnar_schema(source, file_format).names)
+            df, detected_encoding = _read_columnar(source, file_format, columns)
+        else:
+            # Detect encoding as it is not safe to assume unknown dataset is encoded using regular utf-8 or any other encoding.
+            detected_encoding, detect_bytes = detect_encoding(file_path, compression=compression)
+            detect_seconds = time.perf_counter() - start
+            columns = usecols
+            if usecols == NUMERIC_COLUMNS:
+                columns = _numeric_columns(file_path, file_format, detected_encoding, compression)
+
+            # Load dataset; a sidecar holds every column, so the projection is applied after converting
+            start = time.perf_counter()
+            read_columns = None if sidecar else columns
+            try:
+                df = _read_csv(file_path, detected_encoding, read_columns, engine, chunksize, compression)
+            except UnicodeDecodeError:
+                # the leading part was misleading, so fall back to detecting the encoding from the whole file
+                retry_start = time.perf_counter()
+                detected_encoding, detect_bytes = detect_encoding(file_path, max_bytes=None, compression=compression)
+                detect_seconds += time.perf_counter() - retry_start
+                start = time.perf_counter()
+                df = _read_csv(file_path, detected_encoding, read_columns, engine, chunksize, compression)
+            if sidecar:
+                try:
+                    _write_sidecar(df, sidecar, detected_encoding)
+                    print(f"Cached a columnar copy of {file_path} in {sidecar}")
+                except Exception as e:
+                    # e.g. mixed-type columns Arrow can't represent, or a read-only cache directory
+                    print(f"Failed to write the columnar sidecar: {e}")
+                if columns is not None:
+                    df = df[_project(columns, df.columns.tolist())]
+        parse_seconds = time.perf_counter() - start
+
         #print(f"Dataset loaded: {file_path}, shape: {df.shape}")
         if df is None or df.empty:
             sys.exit("The dataset is empty or failed to load.")
+
+        df.attrs['load_stats'] = {
+            "format": file_format,
+            "compression": compression,
+            "source": "sidecar" if source != file_path else "file",
+            "encoding": detected_encoding,
+            "file_bytes": os.path.getsize(file_path),
+            "columns_read": df.shape[1],
+            "detect_bytes": detect_bytes,
+            "detect_seconds": round(detect_seconds, 4),
+            "parse_seconds": round(parse_seconds, 4),
+        }
+        if file_format in COLUMNAR_FORMATS:
+            origin = "columnar sidecar" if source != file_path else file_format
+            print(f"Loaded {file_path} ({origin}): read {df.shape[1]} columns in {parse_seconds:.2f}s")
+        else:
+            print(f"Loaded {file_path} ({detected_encoding}{', ' + compression if compression else ''}): detected "
+                  f"encoding from {detect_bytes} bytes in {detect_seconds:.2f}s, parsed "
+                  f"{df.attrs['load_stats']['file_bytes']} bytes in {parse_seconds:.2f}s")
+
+        if compact:
+            df = compact_dataframe(df)
+            stats = df.attrs['memory_stats']
+            print(f"Compact mode: {stats['before_bytes'] / 1e6:.1f} MB -> {stats['after_bytes'] / 1e6:.1f} MB in memory "
+                  f"({len(stats['conversions'])} columns converted)")
         return df
-    
+
     except Exception as e:
         print(f"Failed to load dataset: {e}")
         sys.exit(1)
 
+def dataset_columns(file_path, numeric=False):
+    """
+    Column names of a dataset file without loading its data: from the schema of columnar files, from the header line
+    (or, for numeric=True, a leading sample) of CSVs.
+
+    :param file_path: Path to the dataset file
+    :param numeric: Only the numeric columns
+    :return: list of column names in file order
+    """
+    import pandas as pd
+    file_format, compression = detect_format(file_path)
+    encoding = None
+    if file_format not in COLUMNAR_FORMATS:
+        encoding, _ = detect_encoding(file_path, compression=compression)
+    if numeric:
+        return _numeric_columns(file_path, file_format, encoding, compression)
+    if file_format in COLUMNAR_FORMATS:
+        return _columnar_schema(file_path, file_format).names
+    return pd.read_csv(file_path, encoding=encoding, nrows=0, compression=compression).columns.tolist()
+
+
 def get_headers_as_json(df):
     """
     Function to extract column headers from a DataFrame and return them as a JSON object.json objects because it'll be easier to communicate with llm and less processing will be required.
@@ -72,501 +430,4006 @@ def get_headers_as_json(df):
     
     return headers_json
 
-def profile_dataset(df):
+# Correlations of wide tables are computed in blocks of this many columns, so the temporaries stay O(rows x block)
+# and only the strongest pairs are kept instead of the full p x p matrix.
+CORRELATION_BLOCK_SIZE = 256
+CORRELATION_TOP_K = 50
+# Heatmaps with more numeric columns than this show only the most correlated ones, an annotated 2000x2000 grid is
+# neither renderable nor readable. Up to this size the full matrix is computed directly.
+HEATMAP_MAX_COLUMNS = 20
+
+
+def _column_block(df, columns, method):
+    # float copy of a few columns, ranked for spearman; always a copy, the caller centers it in place
+    data = df[columns]
+    if method == 'spearman':
+        data = data.rank()
+    return data.to_numpy(dtype=float, copy=True)
+
+
+def _correlation_blocks(df, columns, block_size=CORRELATION_BLOCK_SIZE, method='pearson'):
+    """
+    Pearson correlations of columns of a DataFrame with pairwise-complete NaN handling, one block at a time.
+
+    Only the columns of the two blocks being correlated are copied to float arrays, so the temporaries stay
+    O(rows x block_size) however wide the table is. Spearman ranks every block as it is copied, i.e. a block is
+    ranked again for each block it is paired with: time traded for memory.
+
+    :param df: pandas DataFrame
+    :param columns: Numeric columns to correlate
+    :param block_size: Number of columns per block
+    :param method: 'pearson' or 'spearman' (Pearson correlation of the ranks)
+    :return: generator of (row offset, column offset, correlation block) covering the upper block triangle
+    """
+    import numpy as np
+    n = len(df)
+    blocks = [columns[start:start + block_size] for start in range(0, len(columns), block_size)]
+    # per column mean, and for blocks without missing values the standard deviation, in one pass over the blocks
+    means, stds = [], []
+    for block_columns in blocks:
+        values = _column_block(df, block_columns, method)
+        complete = not np.isnan(values).any()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means.append(np.nanmean(values, axis=0))
+            stds.append((values - means[-1]).std(axis=0, ddof=1) if complete else None)
+
+    def block(index):
+        values = _column_block(df, blocks[index], method)
+        # correlations are shift invariant, centering first avoids cancellation in the sums below
+        values -= means[index]
+        if stds[index] is not None:
+            # no missing values: correlations are plain products of standardized columns
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values /= stds[index]
+            return values, None
+        missing = np.isnan(values)
+        values[missing] = 0.0
+        return values, (~missing).astype(float)
+
+    for a in range(len(blocks)):
+        xa, ma = block(a)
+        for b in range(a, len(blocks)):
+            xb, mb = (xa, ma) if b == a else block(b)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if ma is None and mb is None:
+                    corr = xa.T @ xb / (n - 1)
+                else:
+                    # sums over the rows where both columns of a pair are present, all as matrix products; the
+                    # formula is scale invariant, so a standardized block without missing values takes part as is
+                    mask_a = ma if ma is not None else np.ones_like(xa)
+                    mask_b = mb if mb is not None else np.ones_like(xb)
+                    count = mask_a.T @ mask_b
+                    sum_a, sum_b = xa.T @ mask_b, mask_a.T @ xb
+                    cov = xa.T @ xb - sum_a * sum_b / count
+                    var_a = (xa * xa).T @ mask_b - sum_a * sum_a / count
+                    var_b = mask_a.T @ (xb * xb) - sum_b * sum_b / count
+                    corr = cov / np.sqrt(var_a * var_b)
+                    corr[count < 2] = np.nan
+            yield a * block_size, b * block_size, np.clip(corr, -1.0, 1.0)
+
+
+class _TopPairs:
+    # running top-k of correlation pairs, by absolute value or by signed value
+    def __init__(self, k, signed=False):
+        import numpy as np
+        self.k = k
+        self.signed = signed
+        self.scores = np.empty(0)
+        self.values = np.empty(0)
+        self.rows = np.empty(0, dtype=int)
+        self.cols = np.empty(0, dtype=int)
+
+    def add(self, corr, row_offset, col_offset):
+        import numpy as np
+        scores = corr if self.signed else np.abs(corr)
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        if row_offset == col_offset:
+            # diagonal block: keep the strict upper triangle only (no self pairs, no duplicates)
+            scores[np.tril_indices(scores.shape[0], m=scores.shape[1])] = -np.inf
+        flat = scores.ravel()
+        # partial selection, only the k best entries of the block are ever sorted
+        best = np.argpartition(flat, -self.k)[-self.k:] if flat.size > self.k else np.arange(flat.size)
+        best = best[np.isfinite(flat[best])]
+        rows, cols = np.unravel_index(best, scores.shape)
+        self.scores = np.concatenate([self.scores, flat[best]])
+        self.values = np.concatenate([self.values, corr[rows, cols]])
+        self.rows = np.concatenate([self.rows, rows + row_offset])
+        self.cols = np.concatenate([self.cols, cols + col_offset])
+        if self.scores.size > self.k:
+            keep = np.argpartition(self.scores, -self.k)[-self.k:]
+            self.scores, self.values = self.scores[keep], self.values[keep]
+            self.rows, self.cols = self.rows[keep], self.cols[keep]
+
+    def pairs(self, columns):
+        import numpy as np
+        order = np.argsort(-self.scores, kind='stable')
+        return [(columns[self.rows[i]], columns[self.cols[i]], float(self.values[i])) for i in order]
+
+
+def correlation_top_pairs(df, columns=None, k=CORRELATION_TOP_K, method='pearson', block_size=CORRELATION_BLOCK_SIZE,
+                          signed=False):
+    """
+    Find the most correlated column pairs without materializing the full correlation matrix.
+
+    Correlations are computed in column blocks with pairwise-complete observations (like DataFrame.corr) and only
+    the k strongest pairs are kept, using partial selection per block.
+
+    :param df: pandas DataFrame
+    :param columns: Numeric columns to consider, defaults to all numeric columns
+    :param k: Number of pairs to return
+    :param method: 'pearson' or 'spearman'. Spearman ranks every column once and correlates the ranks, which matches
+                   DataFrame.corr(method='spearman') exactly when there are no missing values.
+    :param block_size: Number of columns per block
+    :param signed: Rank pairs by signed correlation (strongest positive first) instead of absolute value
+    :return: list of (column a, column b, correlation) tuples, strongest first
+    """
+    return _top_correlations(df, columns, k, method, block_size)["signed" if signed else "absolute"]
+
+
+def _top_correlations(df, columns, k, method, block_size):
+    # one blocked pass feeding both rankings
+    columns = list(columns) if columns is not None else df.select_dtypes(include='number').columns.tolist()
+    if method not in ('pearson', 'spearman'):
+        raise ValueError(f"Unknown correlation method: {method}")
+    absolute, signed = _TopPairs(k), _TopPairs(k, signed=True)
+    for row_offset, col_offset, corr in _correlation_blocks(df, columns, block_size, method):
+        absolute.add(corr, row_offset, col_offset)
+        signed.add(corr, row_offset, col_offset)
+    return {"absolute": absolute.pairs(columns), "signed": signed.pairs(columns)}
+
+
+# Sampling: every sample of a run (the profile's sample rows, in memory or streamed, and the clustering sample) is a
+# bottom-k sample over hash keys of the row positions. A row's key depends only on its position in the file and the
+# seed, so samples are reproducible across processes and chunkings, the sample of n rows is the first n of any larger
+# sample, and a reservoir fed chunk by chunk ends with exactly the sample drawn from the whole table.
+SAMPLE_SEED = 42
+PROFILE_SAMPLE_ROWS = 3
+# a stratify column with more distinct values than this is an identifier, not a grouping; it is ignored
+SAMPLE_MAX_STRATA = 1_000
+
+
+def _splitmix64(values):
+    # SplitMix64 finalizer: a bijective mix of 64-bit integers, consecutive positions become uniformly spread keys.
+    # uint64 arithmetic wraps around, which is what the mix relies on
+    import numpy as np
+    z = values + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def sample_keys(offset, count, seed=SAMPLE_SEED):
+    """
+    Sampling keys of `count` consecutive rows starting at row position `offset`.
+
+    :return: numpy uint64 array
+    """
+    import numpy as np
+    positions = np.arange(offset, offset + count, dtype=np.uint64)
+    return _splitmix64(positions ^ _splitmix64(np.array([seed], dtype=np.uint64))[0])
+
+
+def _strata(values):
+    # stratum of every row as hashable values, missing values form a stratum of their own
+    return values.astype(object).where(values.notna(), "\0missing")
+
+
+def _allocate(n, counts):
+    # proportional allocation of n sample rows to strata of the given sizes (largest remainder), every stratum gets
+    # at least one row when n allows it; counts is a dict of stratum -> rows, returns stratum -> sample rows
+    total = sum(counts.values())
+    if n >= total:
+        return dict(counts)
+    quotas = {stratum: n * count / total for stratum, count in counts.items()}
+    minimum = 1 if n >= len(counts) else 0
+    allocation = {stratum: min(counts[stratum], max(minimum, int(quota))) for stratum, quota in quotas.items()}
+    # strata in a fixed order, so ties are broken the same way in every run
+    order = sorted(counts, key=lambda stratum: (-(quotas[stratum] - int(quotas[stratum])), str(stratum)))
+    while sum(allocation.values()) < n:
+        for stratum in order:
+            if allocation[stratum] < counts[stratum] and sum(allocation.values()) < n:
+                allocation[stratum] += 1
+    while sum(allocation.values()) > n:
+        largest = max(order, key=lambda stratum: allocation[stratum])
+        allocation[largest] -= 1
+    return allocation
+
+
+class ReservoirSampler:
+    """
+    Seeded, optionally stratified bottom-k reservoir over a stream of DataFrame chunks.
+
+    The reservoir keeps the `capacity` rows with the smallest sample_keys (per stratum when stratified), which is
+    O(capacity) memory whatever the number of rows. sample(n) for any n <= capacity then returns the same rows as
+    sampling n rows from the whole table at once, so one pass serves every sample size. Samplers fed with disjoint
+    chunks of the same file can be merged.
+    """
+
+    def __init__(self, capacity, seed=SAMPLE_SEED, stratify=None):
+        """
+        :param capacity: Largest sample size that will be asked for
+        :param seed: Seed of the sampling keys
+        :param stratify: Optional column; samples are then allocated proportionally to its values
+        """
+        self.capacity = capacity
+        self.seed = seed
+        self.stratify = stratify
+        # set once the stratify column turns out to be an identifier, see _stratified()
+        self.unstratified = False
+        self.rows = 0
+        self.stratum_counts = {}
+        self.reservoir = None
+        self.keys = None
+
+    def update(self, chunk, offset=None):
+        """
+        Add a chunk of rows.
+
+        :param chunk: DataFrame
+        :param offset: Position of the chunk's first row in the file, defaults to the number of rows seen so far
+                       (pass it when chunks are fed to separate samplers that are merged later)
+        :return: self
+        """
+        import numpy as np
+        import pandas as pd
+        offset = self.rows if offset is None else offset
+        positions = np.arange(offset, offset + len(chunk))
+        keys = sample_keys(offset, len(chunk), self.seed)
+        self.rows += len(chunk)
+        if self.stratify is not None and not self.unstratified and self.stratify in chunk.columns:
+            for stratum, count in _strata(chunk[self.stratify]).value_counts(dropna=False).items():
+                self.stratum_counts[stratum] = self.stratum_counts.get(stratum, 0) + int(count)
+        elif self.reservoir is not None and len(self.keys) >= self.capacity:
+            # only rows that beat the current k-th smallest key can enter, usually a tiny fraction of the chunk
+            selected = np.flatnonzero(keys < self.keys.max())
+            chunk, keys, positions = chunk.iloc[selected], keys[selected], positions[selected]
+        # the index becomes the row position, so samples map back to rows of the file
+        chunk = chunk.set_axis(pd.Index(positions), axis=0)
+        if self.reservoir is None:
+            self.reservoir, self.keys = chunk, keys
+        else:
+            self.reservoir = pd.concat([self.reservoir, chunk])
+            self.keys = np.concatenate([self.keys, keys])
+        self._prune()
+        return self
+
+    def merge(self, other):
+        """
+        Combine the reservoir of a sampler fed with other rows of the same file (same seed, capacity and stratify).
+
+        :return: self
+        """
+        import numpy as np
+        import pandas as pd
+        if (other.capacity, other.seed, other.stratify) != (self.capacity, self.seed, self.stratify):
+            raise ValueError("Cannot merge samplers with different capacity, seed or stratify column.")
+        self.rows += other.rows
+        # strata only add up, when one side has too many of them so does the merged sampler
+        self.unstratified = self.unstratified or other.unstratified
+        for stratum, count in other.stratum_counts.items():
+            self.stratum_counts[stratum] = self.stratum_counts.get(stratum, 0) + count
+        if other.reservoir is not None:
+            if self.reservoir is None:
+                self.reservoir, self.keys = other.reservoir, other.keys
+            else:
+                self.reservoir = pd.concat([self.reservoir, other.reservoir])
+                self.keys = np.concatenate([self.keys, other.keys])
+            self._prune()
+        return self
+
+    def _prune(self):
+        # keep the capacity smallest keys, per stratum when stratified
+        import numpy as np
+        if self._stratified():
+            keep = np.sort(self._ranked(lambda stratum: self.capacity))
+        elif len(self.keys) > self.capacity:
+            keep = np.sort(np.argpartition(self.keys, self.capacity - 1)[:self.capacity])
+        else:
+            return
+        self.reservoir, self.keys = self.reservoir.iloc[keep], self.keys[keep]
+
+    def _stratified(self):
+        if self.stratify is None or self.unstratified or self.reservoir is None:
+            return False
+        if self.stratify not in self.reservoir.columns:
+            return False
+        if len(self.stratum_counts) > SAMPLE_MAX_STRATA:
+            # an identifier-like column, every row its own stratum; from here on the sample is not stratified
+            print(f"Not stratifying by {self.stratify}: more than {SAMPLE_MAX_STRATA} distinct values")
+            self.unstratified, self.stratum_counts = True, {}
+            return False
+        return True
+
+    def sample(self, n):
+        """
+        :param n: Sample size, at most capacity
+        :return: DataFrame with (at most) n rows in file order, indexed by their row position
+        """
+        import numpy as np
+        if n > self.capacity:
+            raise ValueError(f"Sample of {n} rows requested from a reservoir of {self.capacity}")
+        if self.reservoir is None:
+            return None
+        if n <= 0:
+            return self.reservoir.iloc[:0]
+        # merges append whole reservoirs in whatever order the chunks finished, so file order is restored from the
+        # row positions in the index
+        if not self._stratified():
+            if len(self.keys) <= n:
+                return self.reservoir.sort_index()
+            return self.reservoir.iloc[np.argpartition(self.keys, n - 1)[:n]].sort_index()
+        allocation = _allocate(n, self.stratum_counts)
+        return self.reservoir.iloc[self._ranked(lambda stratum: allocation.get(stratum, 0))].sort_index()
+
+    def _ranked(self, limit):
+        # positions of the reservoir rows whose key ranks below limit(stratum) within their stratum
+        import numpy as np
+        import pandas as pd
+        order = np.argsort(self.keys, kind='stable')
+        codes, strata = pd.factorize(_strata(self.reservoir[self.stratify]).iloc[order])
+        ranks = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+        limits = np.array([limit(stratum) for stratum in strata])
+        return order[ranks < limits[codes]]
+
+
+class _locked_cached_property:
+    """
+    cached_property whose value is computed once even when several stage threads ask for it at the same time.
+
+    functools.cached_property only holds a lock up to Python 3.11, from 3.12 on concurrent first accesses all run the
+    computation. Every attribute has its own lock, so unrelated statistics are still computed side by side.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        cache = instance.__dict__
+        if self.name in cache:
+            return cache[self.name]
+        with instance._locks_guard:
+            lock = instance._locks.setdefault(self.name, threading.RLock())
+        with lock:
+            # another thread may have computed it while this one waited
+            if self.name not in cache:
+                cache[self.name] = self.func(instance)
+            return cache[self.name]
+
+
+class AnalysisContext:
+    """
+    Per-run cache of the statistics that several stages need, so each of them is computed at most once.
+
+    Every attribute is computed lazily on first access and memoized, once even when stages running in parallel ask
+    for it together, e.g. the correlation matrix is shared by the scatterplot, the heatmap and the README writer.
+    Stages must not modify the DataFrame in place once the context is created, otherwise the memoized values become
+    stale.
+    """
+
+    def __init__(self, df, correlation_method='pearson', sample_seed=SAMPLE_SEED, stratify=None):
+        """
+        :param df: pandas DataFrame the statistics are computed from
+        :param correlation_method: 'pearson' or 'spearman'
+        :param sample_seed: Seed of every sample drawn with sample()
+        :param stratify: Optional column the samples are stratified by
+        """
+        self.df = df
+        self.correlation_method = correlation_method
+        self.sample_seed = sample_seed
+        self.stratify = stratify
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @_locked_cached_property
+    def sample_keys(self):
+        # sampling key of every row, the ones a ReservoirSampler gives the same rows when it reads them from the file
+        return sample_keys(0, len(self.df), self.sample_seed)
+
+    @_locked_cached_property
+    def stratum_ranks(self):
+        # (stratum code of every row, rank of the row's key within its stratum, stratum values), None unstratified
+        import numpy as np
+        import pandas as pd
+        if self.stratify is None or self.stratify not in self.df.columns:
+            return None
+        # missing values are a stratum of their own, named like the reservoir names it
+        codes, strata = pd.factorize(self.df[self.stratify], use_na_sentinel=False)
+        strata = _strata(pd.Series(strata)).tolist()
+        if len(strata) > SAMPLE_MAX_STRATA:
+            print(f"Not stratifying by {self.stratify}: more than {SAMPLE_MAX_STRATA} distinct values")
+            return None
+        # rows sorted by stratum, then key (the keys are distinct); a row's rank is its distance to its stratum's start
+        order = np.lexsort((self.sample_keys, codes))
+        counts = np.bincount(codes, minlength=len(strata))
+        starts = np.cumsum(counts) - counts
+        ranks = np.empty(len(codes), dtype=np.int64)
+        ranks[order] = np.arange(len(codes)) - starts[codes[order]]
+        return codes, ranks, strata
+
+    def sample(self, n):
+        """
+        Seeded sample of n rows, in file order and indexed by row position. A ReservoirSampler fed chunk by chunk from
+        the file with the same seed (as in the streaming profile) draws the same rows, and a smaller sample is always
+        part of a larger one.
+
+        Only the n selected rows are copied: they are picked by their keys and taken with iloc.
+        """
+        import numpy as np
+        import pandas as pd
+        n = max(0, min(n, len(self.df)))
+        if self.stratum_ranks is not None:
+            codes, ranks, strata = self.stratum_ranks
+            allocation = _allocate(n, dict(zip(strata, np.bincount(codes, minlength=len(strata)).tolist())))
+            limits = np.array([allocation[stratum] for stratum in strata], dtype=np.int64)
+            positions = np.flatnonzero(ranks < limits[codes])
+        elif n < len(self.df):
+            positions = np.sort(np.argpartition(self.sample_keys, n - 1)[:n]) if n else np.arange(0)
+        else:
+            positions = np.arange(len(self.df))
+        return self.df.iloc[positions].set_axis(pd.Index(positions), axis=0)
+
+    @_locked_cached_property
+    def numeric_columns(self):
+        # list of numeric column names, in DataFrame order
+        return self.df.select_dtypes(include='number').columns.tolist()
+
+    @_locked_cached_property
+    def correlation_matrix(self):
+        # pairwise correlation of the numeric columns, only meant for narrow tables (see top_correlations)
+        return self.df[self.numeric_columns].corr(method=self.correlation_method)
+
+    @_locked_cached_property
+    def top_correlations(self):
+        """
+        The CORRELATION_TOP_K strongest column pairs as {"absolute": [...], "signed": [...]}, each a list of
+        (column a, column b, correlation) tuples, strongest first.
+
+        Narrow tables take them from the full correlation matrix, wide ones from the blocked engine without ever
+        building the p x p matrix.
+        """
+        if len(self.numeric_columns) <= HEATMAP_MAX_COLUMNS:
+            absolute, signed = _TopPairs(CORRELATION_TOP_K), _TopPairs(CORRELATION_TOP_K, signed=True)
+            matrix = self.correlation_matrix.to_numpy(dtype=float)
+            absolute.add(matrix.copy(), 0, 0)
+            signed.add(matrix.copy(), 0, 0)
+            return {"absolute": absolute.pairs(self.numeric_columns), "signed": signed.pairs(self.numeric_columns)}
+        return _top_correlations(self.df, self.numeric_columns, CORRELATION_TOP_K, self.correlation_method,
+                                 CORRELATION_BLOCK_SIZE)
+
+    def heatmap_matrix(self, max_columns=HEATMAP_MAX_COLUMNS):
+        """
+        Correlation matrix to draw as heatmap: the full one for narrow tables, otherwise the matrix of the (at most
+        max_columns) columns taking part in the strongest correlations.
+        """
+        if len(self.numeric_columns) <= max_columns:
+            return self.correlation_matrix
+        selected = []
+        for column_a, column_b, _ in self.top_correlations["absolute"]:
+            for column in (column_a, column_b):
+                if column not in selected and len(selected) < max_columns:
+                    selected.append(column)
+        # keep the DataFrame order so related columns stay where the reader expects them
+        selected = [column for column in self.numeric_columns if column in selected]
+        return self.df[selected].corr(method=self.correlation_method)
+
+    @_locked_cached_property
+    def describe(self):
+        # same output as df.describe()
+        return self.df.describe()
+
+    @_locked_cached_property
+    def null_counts(self):
+        # number of null values per column as a Series
+        return self.df.isnull().sum()
+
+
+def profile_dataset(df, ctx=None, approximate=False):
     """
     Generate a basic profile of the dataset.
     :param df: pandas DataFrame
+    :param ctx: Optional AnalysisContext to reuse statistics already computed in this run
+    :param approximate: Add sketch-based distinct counts and quartiles with their error bounds (see approximate_statistics)
     :return: Summary as a dictionary
     """
-    # Generate summary of the dataset that includes shape, null values, dtypes, numerical summary and 3 samples of data
+    ctx = ctx or AnalysisContext(df)
+    # Generate summary of the dataset that includes shape, null values, dtypes, numerical summary and 3 sampled rows
     headers = get_headers_as_json(df)
     summary = {
         "shape": df.shape,
-        "null_values": df.isnull().sum().to_dict(),
+        "null_values": ctx.null_counts.to_dict(),
         "dtypes": df.dtypes.apply(str).to_dict(),
-        "numerical_summary": df.describe().to_dict(),
+        "numerical_summary": ctx.describe.to_dict(),
         "headers": headers,
-        "sample_data": df.head(3).to_dict()
+        "sample_data": ctx.sample(PROFILE_SAMPLE_ROWS).to_dict()
     }
+    if 'memory_stats' in df.attrs:
+        # compact mode: memory_usage(deep=True) before and after compacting
+        summary["memory_usage"] = df.attrs['memory_stats']
+    if approximate:
+        summary["approximate_statistics"] = approximate_statistics(df)
     # returns the shape i.e. no of rows and columns in shape, number of null values in null_values, dtypes contains all types of data types in dataset
     # abd adds headers and sample data for better understanding of structure 
     return summary
 
 
-def generate_scatterplot(df, output_dir):
-    """
-    Generates a scatter plot between the two most highly correlated numeric columns in the dataset and saves the plot as a PNG image.
+# Sketch sizes of the approximate statistics: KLL_K items per compactor level give a normalized rank error of about
+# 1.3%, HLL_PRECISION 12 (4096 one-byte registers per column) a relative distinct count error of about 1.6%.
+KLL_K = 200
+HLL_PRECISION = 12
+SKETCH_QUANTILES = (0.25, 0.5, 0.75)
+
+
+class QuantileSketch:
+    """
+    KLL-style mergeable quantile sketch in bounded memory.
+
+    Values enter level 0. A level that outgrows its capacity is sorted and every other item, starting at a random
+    offset, is promoted to the next level where it stands for twice as many values. Capacities shrink by 2/3 per
+    level below the top one, so the sketch keeps O(k) items however long the stream is. While nothing has been
+    compacted the quantiles are exact.
+    """
+
+    def __init__(self, k=KLL_K, seed=0):
+        """
+        :param k: Capacity of the top level, larger is more accurate
+        :param seed: Seed of the random compaction offsets
+        """
+        import numpy as np
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        import numpy as np
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        """
+        Add values, NaN is ignored.
+
+        :param values: array-like of numbers
+        :return: self
+        """
+        import numpy as np
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.count += values.size
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """
+        Add the values summarized by another sketch.
+
+        :return: self
+        """
+        import numpy as np
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        import numpy as np
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # with an odd number of items one stays behind, so the total weight is preserved exactly
+                odd = items.size % 2
+                promoted = items[odd + int(self._rng.integers(2))::2]
+                self.levels[level] = items[:odd]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    @property
+    def exact(self):
+        return len(self.levels) == 1
+
+    @property
+    def rank_error(self):
+        # normalized rank error of a single quantile query (~99% confidence), the empirical KLL bound 2.296 / k^0.9723
+        return 0.0 if self.exact else 2.296 / self.k ** 0.9723
+
+    def quantiles(self, qs=SKETCH_QUANTILES):
+        """
+        :param qs: Quantiles between 0 and 1
+        :return: list of values, None for an empty sketch
+        """
+        import numpy as np
+        if not self.count:
+            return [None for _ in qs]
+        if self.exact:
+            # linear interpolation like DataFrame.describe()
+            return [float(value) for value in np.quantile(self.levels[0], qs)]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(items_.size, 2.0 ** level) for level, items_ in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')
+        values = items[order][np.minimum(positions, items.size - 1)]
+        # the extremes are tracked exactly, compaction may have dropped the items holding them
+        values = np.where(np.asarray(qs) <= 0, self.min, np.where(np.asarray(qs) >= 1, self.max, values))
+        return [float(min(max(value, self.min), self.max)) for value in values]
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter: 2^precision one-byte registers, mergeable by taking the register-wise maximum.
+
+    Values are hashed with pandas' vectorized 64-bit hash; numbers are hashed as float64 so the same value parsed
+    as int in one chunk and as float in another counts once.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        import numpy as np
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        self.count = 0
+
+    def update(self, values):
+        """
+        Add the non-null values of a pandas Series.
+
+        :return: self
+        """
+        import pandas as pd
+        import numpy as np
+        values = values.dropna()
+        if values.empty:
+            return self
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            values = values.astype('float64')
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << suffix_bits) - 1)
+        # rank = position of the leftmost 1-bit in the remaining bits; they fit the float64 mantissa, so log2 is exact
+        bit_length = np.zeros(rest.shape, dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        np.maximum.at(self.registers, index, (suffix_bits - bit_length + 1).astype(np.uint8))
+        self.count += len(values)
+        return self
+
+    def merge(self, other):
+        import numpy as np
+        self.registers = np.maximum(self.registers, other.registers)
+        self.count += other.count
+        return self
+
+    @property
+    def relative_error(self):
+        # standard error of the estimate
+        return 1.04 / (1 << self.precision) ** 0.5
+
+    def estimate(self):
+        """
+        :return: Estimated number of distinct values (exactly 0 for an empty counter)
+        """
+        import numpy as np
+        m = self.registers.size
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if zeros == m:
+            return 0
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        if raw <= 2.5 * m and zeros:
+            # small range correction: linear counting on the empty registers
+            raw = m * np.log(m / zeros)
+        # a column cannot have more distinct values than values
+        return int(min(round(raw), self.count))
+
+
+def _sketch_summary(columns, quantile_sketches, distinct_counters):
+    # approximate_statistics section of a profile, with the error bound next to every estimate
+    statistics = {}
+    for column in columns:
+        entry = {}
+        counter = distinct_counters.get(column)
+        if counter is not None:
+            entry["distinct"] = {"estimate": counter.estimate(), "relative_error": round(counter.relative_error, 4)}
+        sketch = quantile_sketches.get(column)
+        if sketch is not None:
+            entry["quantiles"] = dict(zip([f"{q:.0%}" for q in SKETCH_QUANTILES], sketch.quantiles()))
+            entry["rank_error"] = round(sketch.rank_error, 4)
+        statistics[column] = entry
+    return statistics
+
+
+def approximate_statistics(df, k=KLL_K, precision=HLL_PRECISION):
+    """
+    Approximate quartiles of the numeric columns and distinct counts of all columns, from bounded-memory sketches.
+
+    :param df: pandas DataFrame
+    :param k: QuantileSketch size
+    :param precision: HyperLogLog precision
+    :return: Dictionary of column -> {"distinct": {"estimate", "relative_error"}, "quantiles": {...}, "rank_error"}
+    """
+    numeric_columns = df.select_dtypes(include='number').columns
+    quantile_sketches = {column: QuantileSketch(k).update(df[column].to_numpy(dtype=float, na_value=float('nan')))
+                         for column in numeric_columns}
+    distinct_counters = {column: HyperLogLog(precision).update(df[column]) for column in df.columns}
+    return _sketch_summary(df.columns, quantile_sketches, distinct_counters)
+
+
+def _chan_merge(n1, mean1, m2_1, n2, mean2, m2_2):
+    import numpy as np
+    # Chan et al. parallel update of (count, mean, sum of squared deviations), works element-wise on arrays of any shape.
+    # Entries with a zero count on one side simply take the other side.
+    n = n1 + n2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = np.where((n1 > 0) & (n2 > 0), mean2 - mean1, 0.0)
+        mean = np.where(n1 == 0, mean2, np.where(n2 == 0, mean1, mean1 + delta * n2 / n))
+        correction = np.where(n > 0, delta * delta * n1 * n2 / n, 0.0)
+    return n, mean, m2_1 + m2_2 + correction, delta
+
+
+class StreamingProfiler:
+    """
+    Out-of-core dataset profiler built from mergeable accumulators.
+
+    Each chunk of rows updates the row count, per-column null counts and dtypes, and for the numeric columns a
+    Welford/Chan count, mean, sum of squared deviations, min and max. A pairwise-complete co-moment matrix is kept
+    as well so correlations can be produced without the full table. Two profilers built over different chunks of
+    the same file can be combined with merge(), which is what allows chunks to be profiled in parallel.
+
+    With sketches=True every column also gets a HyperLogLog distinct counter and every numeric column a
+    QuantileSketch, which fill in the quartiles of the summary.
+
+    Memory is bounded by the number of columns (O(p^2) with correlations), not by the number of rows.
+    """
+
+    def __init__(self, numeric_columns=None, correlations=True, sketches=True, sample_seed=SAMPLE_SEED, stratify=None):
+        """
+        :param numeric_columns: Columns to treat as numeric, inferred from the first chunk if None
+        :param correlations: Whether to keep the pairwise co-moment matrix (O(p^2) memory)
+        :param sketches: Whether to keep quantile sketches and distinct counters (O(KLL_K + 2^HLL_PRECISION) per column)
+        :param sample_seed: Seed of the sample rows, the same rows profile_dataset picks from the loaded table
+        :param stratify: Optional column the sample rows are stratified by
+        """
+        self.numeric_columns = list(numeric_columns) if numeric_columns is not None else None
+        self.correlations = correlations
+        self.sketches = sketches
+        self.quantile_sketches = {}
+        self.distinct_counters = {}
+        self.columns = None
+        self.row_count = 0
+        self.null_counts = {}
+        self.dtypes = {}
+        self.sampler = ReservoirSampler(PROFILE_SAMPLE_ROWS, sample_seed, stratify)
+
+        # per numeric column accumulators, allocated once the numeric columns are known
+        self.count = self.mean = self.m2 = self.min = self.max = None
+        # pairwise accumulators: entry [a, b] is computed over the rows where both a and b are present
+        self.pair_count = self.pair_mean = self.pair_m2 = self.comoment = None
+
+    def _allocate(self):
+        import numpy as np
+        p = len(self.numeric_columns)
+        self.count = np.zeros(p)
+        self.mean = np.zeros(p)
+        self.m2 = np.zeros(p)
+        self.min = np.full(p, np.inf)
+        self.max = np.full(p, -np.inf)
+        if self.correlations:
+            self.pair_count = np.zeros((p, p))
+            self.pair_mean = np.zeros((p, p))
+            self.pair_m2 = np.zeros((p, p))
+            self.comoment = np.zeros((p, p))
+
+    def update(self, chunk, offset=None):
+        """
+        Add a chunk of rows to the profile.
+
+        :param chunk: pandas DataFrame with the same columns as the previous chunks
+        :param offset: Position of the chunk's first row in the file, defaults to the rows profiled so far (pass it
+                       when chunks are profiled separately and merged later)
+        :return: self, so calls can be chained
+        """
+        if self.numeric_columns is None:
+            self.numeric_columns = chunk.select_dtypes(include='number').columns.tolist()
+        chunk_profile = StreamingProfiler(self.numeric_columns, self.correlations, self.sketches,
+                                          self.sampler.seed, self.sampler.stratify)
+        chunk_profile._profile_chunk(chunk, self.row_count if offset is None else offset)
+        return self.merge(chunk_profile)
+
+    def _profile_chunk(self, chunk, offset):
+        import pandas as pd
+        import numpy as np
+        self.columns = chunk.columns.tolist()
+        self.row_count = len(chunk)
+        self.null_counts = chunk.isnull().sum().to_dict()
+        self.dtypes = chunk.dtypes.apply(str).to_dict()
+        self.sampler.update(chunk, offset)
+        self._allocate()
+        if self.sketches:
+            self.distinct_counters = {column: HyperLogLog().update(chunk[column])
+                                      for column in self.columns if column not in self.numeric_columns}
+        if not self.numeric_columns or chunk.empty:
+            return
+
+        # chunks are inferred independently by the parser, so coerce the numeric columns in case this one differs
+        values = chunk[self.numeric_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        if self.sketches:
+            for idx, column in enumerate(self.numeric_columns):
+                self.quantile_sketches[column] = QuantileSketch().update(values[:, idx])
+                self.distinct_counters[column] = HyperLogLog().update(pd.Series(values[:, idx]))
+        present = ~np.isnan(values)
+        self.count = present.sum(axis=0).astype(float)
+        with np.errstate(invalid='ignore'):
+            self.mean = np.where(self.count > 0, np.nansum(values, axis=0) / np.maximum(self.count, 1), 0.0)
+        centered = np.where(present, values - self.mean, 0.0)
+        self.m2 = (centered * centered).sum(axis=0)
+        self.min = np.where(self.count > 0, np.nanmin(np.where(present, values, np.inf), axis=0), np.inf)
+        self.max = np.where(self.count > 0, np.nanmax(np.where(present, values, -np.inf), axis=0), -np.inf)
+
+        if self.correlations:
+            # all pairwise sums as matrix products over the presence mask, centered on the column means for stability
+            mask = present.astype(float)
+            self.pair_count = mask.T @ mask
+            sums = centered.T @ mask
+            squares = (centered * centered).T @ mask
+            with np.errstate(invalid='ignore', divide='ignore'):
+                shift = np.where(self.pair_count > 0, sums / self.pair_count, 0.0)
+            self.pair_mean = shift + self.mean[:, None]
+            self.pair_m2 = squares - self.pair_count * shift * shift
+            self.comoment = centered.T @ centered - self.pair_count * shift * shift.T
+
+    def merge(self, other):
+        """
+        Combine the accumulators of another profiler into this one.
+
+        :param other: StreamingProfiler built over rows not seen by this profiler
+        :return: self
+        """
+        import numpy as np
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update(other.__dict__)
+            return self
+        if other.numeric_columns != self.numeric_columns or other.correlations != self.correlations \
+                or other.sketches != self.sketches:
+            raise ValueError("Cannot merge profilers built with different numeric columns, correlation or sketch "
+                             "settings.")
+
+        self.row_count += other.row_count
+        self.sampler.merge(other.sampler)
+        for column, nulls in other.null_counts.items():
+            self.null_counts[column] = self.null_counts.get(column, 0) + nulls
+        for column, dtype in other.dtypes.items():
+            current = self.dtypes.setdefault(column, dtype)
+            if current != dtype:
+                # a column parsed differently across chunks, widen it like pandas would for the whole file
+                numeric = column in self.numeric_columns
+                self.dtypes[column] = 'float64' if numeric else 'object'
+        for sketches, others in ((self.quantile_sketches, other.quantile_sketches),
+                                 (self.distinct_counters, other.distinct_counters)):
+            for column, sketch in others.items():
+                if column in sketches:
+                    sketches[column].merge(sketch)
+                else:
+                    sketches[column] = sketch
+
+        if not self.numeric_columns:
+            return self
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.count, self.mean, self.m2, _ = _chan_merge(self.count, self.mean, self.m2, other.count, other.mean, other.m2)
+        if self.correlations:
+            n1, n2 = self.pair_count, other.pair_count
+            self.pair_count, pair_mean, self.pair_m2, delta = _chan_merge(
+                n1, self.pair_mean, self.pair_m2, n2, other.pair_mean, other.pair_m2)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cross = np.where(self.pair_count > 0, delta * delta.T * n1 * n2 / self.pair_count, 0.0)
+            self.comoment = self.comoment + other.comoment + cross
+            self.pair_mean = pair_mean
+        return self
+
+    def correlation_matrix(self):
+        """
+        Pearson correlation of the numeric columns with pairwise-complete observations, like DataFrame.corr().
+
+        :return: pandas DataFrame
+        """
+        import pandas as pd
+        import numpy as np
+        if not self.correlations:
+            raise ValueError("Correlations were not tracked by this profiler.")
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.sqrt(self.pair_m2 * self.pair_m2.T)
+        corr[self.pair_count < 2] = np.nan
+        return pd.DataFrame(corr, index=self.numeric_columns, columns=self.numeric_columns)
+
+    def summary(self):
+        """
+        Emit the profile in the same shape as profile_dataset().
+
+        Quartiles cannot be computed exactly from a stream: with sketches they are estimates (see rank_error in the
+        added approximate_statistics section, which also holds the distinct counts), without them they are None.
+
+        :return: Summary as a dictionary
+        """
+        import numpy as np
+        columns = self.columns or []
+        numerical_summary = {}
+        for idx, column in enumerate(self.numeric_columns or []):
+            count = self.count[idx]
+            sketch = self.quantile_sketches.get(column)
+            quartiles = sketch.quantiles() if sketch is not None else [None] * 3
+            numerical_summary[column] = {
+                "count": float(count),
+                "mean": float(self.mean[idx]) if count else float('nan'),
+                "std": float(np.sqrt(self.m2[idx] / (count - 1))) if count > 1 else float('nan'),
+                "min": float(self.min[idx]) if count else float('nan'),
+                "25%": quartiles[0],
+                "50%": quartiles[1],
+                "75%": quartiles[2],
+                "max": float(self.max[idx]) if count else float('nan'),
+            }
+        summary = {
+            "shape": (self.row_count, len(columns)),
+            "null_values": {column: int(self.null_counts.get(column, 0)) for column in columns},
+            "dtypes": {column: self.dtypes.get(column) for column in columns},
+            "numerical_summary": numerical_summary,
+            "headers": json.dumps({"headers": columns}),
+            "sample_data": self.sampler.sample(PROFILE_SAMPLE_ROWS).to_dict() if self.sampler.rows else {},
+        }
+        if self.sketches:
+            summary["approximate_statistics"] = _sketch_summary(columns, self.quantile_sketches, self.distinct_counters)
+        return summary
+
+
+def _iter_chunks(file_path, chunksize, usecols=None):
+    # DataFrames of at most chunksize rows from any supported format: CSV chunks, Parquet row groups split into
+    # batches, Arrow record batches (memory-mapped), Feather v1 tables
+    import pandas as pd
+    file_format, compression = detect_format(file_path)
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(file_path, memory_map=True)
+        columns = _numeric_columns(file_path, file_format) if usecols == NUMERIC_COLUMNS else usecols
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif file_format == 'arrow':
+        import pyarrow as pa
+        columns = _numeric_columns(file_path, file_format) if usecols == NUMERIC_COLUMNS else usecols
+        with pa.memory_map(file_path) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for offset in range(0, batch.num_rows, chunksize):
+                    yield batch.slice(offset, chunksize).to_pandas()
+    elif file_format == 'feather':
+        # Feather v1 is not an IPC file, its memory-mapped table is split into batches instead
+        import pyarrow.feather as feather
+        columns = _numeric_columns(file_path, file_format) if usecols == NUMERIC_COLUMNS else usecols
+        table = feather.read_table(file_path, columns=columns, memory_map=True)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield batch.to_pandas()
+    else:
+        encoding, _ = detect_encoding(file_path, compression=compression)
+        if usecols == NUMERIC_COLUMNS:
+            usecols = _numeric_columns(file_path, file_format, encoding, compression)
+        yield from pd.read_csv(file_path, encoding=encoding, usecols=usecols, chunksize=chunksize,
+                               compression=compression)
+
+
+def profile_dataset_streaming(file_path, chunksize=100_000, usecols=None, workers=1, correlations=True, sketches=True,
+                              sample_seed=SAMPLE_SEED, stratify=None):
+    """
+    Profile a dataset file (any format load_dataset accepts) chunk by chunk without loading it into memory.
+
+    :param file_path: Path to the dataset file
+    :param chunksize: Number of rows per chunk
+    :param usecols: Optional list of columns to profile, or NUMERIC_COLUMNS
+    :param workers: Number of threads profiling chunks concurrently, the partial profiles are merged in file order
+    :param correlations: Whether to also accumulate the pairwise co-moment matrix
+    :param sketches: Whether to keep quantile sketches and distinct counters (approximate quartiles and cardinalities)
+    :param sample_seed: Seed of the profile's sample rows
+    :param stratify: Optional column the sample rows are stratified by
+    :return: StreamingProfiler holding the merged accumulators, call summary() for the profile_dataset() shape
+    """
+    reader = _iter_chunks(file_path, chunksize, usecols)
+
+    profiler = StreamingProfiler(correlations=correlations, sketches=sketches, sample_seed=sample_seed,
+                                 stratify=stratify)
+    # at most 2 chunks per worker are in flight, which keeps memory bounded while the pool is busy
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = deque()
+        offset = 0
+        for chunk in reader:
+            offset += len(chunk)
+            if profiler.numeric_columns is None:
+                # the first chunk decides which columns are numeric for the whole file
+                profiler.update(chunk)
+                continue
+            # the chunk's row positions decide which rows are sampled, so they are passed along
+            pending.append(pool.submit(StreamingProfiler(profiler.numeric_columns, correlations, sketches,
+                                                         sample_seed, stratify).update, chunk, offset - len(chunk)))
+            if len(pending) >= 2 * max(1, workers):
+                profiler.merge(pending.popleft().result())
+        while pending:
+            profiler.merge(pending.popleft().result())
+    return profiler
+
+
+# every plot is rendered at this resolution
+PLOT_DPI = 60
+# space in pixels left between the outermost text of a plot and the edge of the image
+PLOT_PAD_PIXELS = 4
+
+# per thread, the subplot parameters the last figure of each (kind, size) was rendered with, see new_figure()
+_figure_layouts = threading.local()
+
+
+@dataclass
+class RenderedFigure:
+    """
+    A plot rendered to an in-memory image.
+
+    name is the file name the image gets when written to disk (and the name used in README.md), data the encoded
+    image bytes and metadata a dictionary describing the plot (type, columns, ...).
+    """
+    name: str
+    data: bytes
+    mime_type: str = 'image/png'
+    metadata: dict = field(default_factory=dict)
+
+    @property
+    def view(self):
+        # zero-copy view of the image bytes
+        return memoryview(self.data)
+
+
+def new_figure(figsize, kind=None):
+    """
+    Create a figure on its own Agg canvas without going through pyplot. pyplot keeps global state (the current
+    figure), these figures don't, so several of them can be drawn in different threads at the same time.
+
+    With a kind (e.g. 'scatterplot') the figure starts from the layout the last figure of that kind and size got in
+    this thread, so the margins fitted by render_figure() only need a small correction, if any. Only the layout is
+    kept: building a new Figure is cheaper than clearing an old one.
+
+    :param figsize: (width, height) in inches
+    :param kind: Optional plot type the layout is kept for
+    :return: tuple of (Figure, Axes)
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=figsize, dpi=PLOT_DPI)
+    FigureCanvasAgg(fig)
+    if kind is not None:
+        fig.set_label(kind)
+        layout = getattr(_figure_layouts, 'layouts', {}).get((kind, tuple(figsize)))
+        if layout is not None:
+            fig.subplots_adjust(**layout)
+    return fig, fig.add_subplot()
+
+
+def _decorations_bbox(fig):
+    # union of the tick labels, axis labels and titles of every Axes in pixels, None for a figure without any;
+    # bbox_extra_artists=[] leaves the data artists out, so nothing is drawn
+    from matplotlib.transforms import Bbox
+    renderer = fig.canvas.get_renderer()
+    boxes = [ax.get_tightbbox(renderer, bbox_extra_artists=[]) for ax in fig.axes if ax.get_visible()]
+    boxes = [box for box in boxes if box is not None]
+    return Bbox.union(boxes) if boxes else None
+
+
+def fit_layout(fig, pad=PLOT_PAD_PIXELS):
+    """
+    Fit the margins of a figure to its text in a single pass.
+
+    The tick labels, axis labels and titles of every Axes (colorbars included) are measured without drawing the data,
+    and the subplot parameters are moved so that the text ends pad pixels from the edge. Together with the crop in
+    render_figure() this replaces savefig(bbox_inches='tight'), which draws the whole figure once to find the
+    bounding box and again to save it.
+
+    :param fig: Figure created with new_figure()
+    :param pad: Space in pixels around the text
+    :return: dictionary of the subplot parameters the figure ends up with
+    """
+    text = _decorations_bbox(fig)
+    params = fig.subplotpars
+    if text is not None:
+        width, height = fig.bbox.width, fig.bbox.height
+        layout = {"left": max(0.0, params.left + (pad - text.x0) / width),
+                  "right": min(1.0, params.right + (width - pad - text.x1) / width),
+                  "bottom": max(0.0, params.bottom + (pad - text.y0) / height),
+                  "top": min(1.0, params.top + (height - pad - text.y1) / height)}
+        # text larger than the figure itself keeps the old margins rather than turning the Axes inside out
+        if layout["left"] < layout["right"] and layout["bottom"] < layout["top"]:
+            fig.subplots_adjust(**layout)
+    return {"left": params.left, "right": params.right, "bottom": params.bottom, "top": params.top}
+
+
+def render_figure(fig, name, metadata=None):
+    """
+    Render a matplotlib figure to PNG bytes in memory.
+
+    The margins are fitted with fit_layout() and the figure is drawn once; the time both take is recorded as
+    render_seconds in the metadata. Space the margins can't take back (a colorbar is only as wide as its aspect
+    allows, not as its slot) is cropped with the bounding box of the decorations measured after the fit, which
+    unlike bbox_inches='tight' needs no extra draw.
+
+    :param fig: Figure created with new_figure()
+    :param name: File name of the image, e.g. 'correlation_heatmap.png'
+    :param metadata: Optional dictionary describing the plot
+    :return: RenderedFigure
+    """
+    from matplotlib.transforms import Bbox
+    start = time.perf_counter()
+    layout = fit_layout(fig)
+    text = _decorations_bbox(fig)
+    crop = None
+    if text is not None:
+        pad = PLOT_PAD_PIXELS
+        crop = Bbox.from_extents(max(text.x0 - pad, 0), max(text.y0 - pad, 0),
+                                 min(text.x1 + pad, fig.bbox.width), min(text.y1 + pad, fig.bbox.height))
+        crop = crop.transformed(fig.dpi_scale_trans.inverted())  # bbox_inches is in inches
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=PLOT_DPI, bbox_inches=crop)
+    render_seconds = time.perf_counter() - start
+    if fig.get_label():
+        # the starting layout for the next figure of this kind in this thread
+        if not hasattr(_figure_layouts, 'layouts'):
+            _figure_layouts.layouts = {}
+        _figure_layouts.layouts[fig.get_label(), tuple(fig.get_size_inches())] = layout
+    metadata = dict(metadata or {}, dpi=PLOT_DPI, render_seconds=round(render_seconds, 4))
+    return RenderedFigure(name=name, data=buffer.getvalue(), metadata=metadata)
+
+
+def save_figure(figure, output_dir):
+    """
+    Write a rendered figure into the output directory.
+
+    :return: Path of the written file
+    """
+    output_path = os.path.join(output_dir, figure.name)
+    print(f"Saving plot to {output_path}")
+    with open(output_path, 'wb') as f:
+        f.write(figure.view)
+    return output_path
+
+
+class FigureWriter:
+    """
+    Optional disk sink for rendered figures.
+
+    With background=True the files are written by a single worker thread, so the disk I/O overlaps with the
+    following stages (e.g. the LLM request); call close() to wait until everything is on disk.
+    """
+
+    def __init__(self, output_dir, background=True):
+        self.output_dir = output_dir
+        self._pool = ThreadPoolExecutor(max_workers=1) if background else None
+        self._pending = []
+
+    def write(self, figure):
+        if figure is None:
+            return
+        if self._pool is None:
+            save_figure(figure, self.output_dir)
+        else:
+            self._pending.append(self._pool.submit(save_figure, figure, self.output_dir))
+
+    def close(self):
+        # waits for the background writes and re-raises the first failure, if any
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            for future in self._pending:
+                future.result()
+
+
+# Above this many points the scatter plots switch to binned density rendering: millions of markers take minutes to
+# rasterize and at 60 dpi are an unreadable blob anyway.
+SCATTER_DENSITY_THRESHOLD = 50_000
+DENSITY_BINS = 100
+
+
+def _density_grid(x, y, bins=DENSITY_BINS, range_=None):
+    # 2D histogram computed with NumPy; returns (counts, x edges, y edges) with counts indexed [x bin, y bin]
+    import numpy as np
+    return np.histogram2d(np.asarray(x, dtype=float), np.asarray(y, dtype=float), bins=bins, range=range_)
+
+
+def generate_scatterplot(df, output_dir=None, ctx=None, density_threshold=SCATTER_DENSITY_THRESHOLD):
+    """
+    Generates a scatter plot between the two most highly correlated numeric columns in the dataset and renders the plot as a PNG image.
+
+    This function performs the following steps:
+    1. Identifies the numeric columns in the given DataFrame.
+    2. Takes the strongest correlations from the shared correlation engine (no full matrix for wide tables).
+    3. Picks the pair of columns with the highest correlation.
+    4. Cleans the data by removing NaN values from the selected columns.
+    5. Creates a scatter plot using seaborn with the two most correlated columns.
+    6. Renders the plot as PNG in memory and, if an output directory is given, saves it there too.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+        The input DataFrame containing the data to be plotted. The DataFrame must contain at least two numeric columns.
+
+    output_dir : str, optional
+        The directory where the scatter plot image will be saved. The image is named after the two columns being plotted.
+        When None, nothing is written to disk and the caller decides what to do with the returned image.
+
+    ctx : AnalysisContext, optional
+        Shared per-run context, the numeric columns and correlation matrix are taken from it instead of being recomputed.
+
+    density_threshold : int, optional
+        Above this many points the plot is drawn as a binned 2D histogram (log-scaled counts) instead of individual
+        markers. None always draws markers.
+
+    Returns:
+    --------
+    RenderedFigure or None
+        The rendered scatter plot, or None if no plot could be made.
+    
+    Notes:
+    ------
+    - If the dataset does not have enough numeric columns or valid data points, the function will print an appropriate message and terminate early.
+    - If a hue_column is provided, the scatter plot will include a hue for color differentiation in the plot.
+    - The saved plot will have a resolution of 60 DPI and margins fitted to its labels to avoid excessive whitespace.
+    """
+    import pandas as pd
+    import numpy as np
+    import seaborn as sns
+    hue_column = None
+    ctx = ctx or AnalysisContext(df)
+    # Ensure there are numeric columns in the dataset
+    numeric_columns = ctx.numeric_columns
+   # print(f"Numeric columns: {numeric_columns}") # sanity check
+    
+    if len(numeric_columns) < 2:
+        print("Not enough numeric columns for a scatterplot.")
+        return  # Not enough numeric columns for a scatterplot
+
+    # Find the pair with the maximum correlation, the shared correlation engine keeps the strongest pairs of the run
+    top_pairs = ctx.top_correlations["signed"]
+    if not top_pairs:
+        print("No correlation pairs found.")
+        return
+    x_column, y_column, max_corr_value = top_pairs[0]
+    #print(f"Max correlation pair: {(x_column, y_column)} with value {max_corr_value}")
+
+    # Ensure there are enough data points to plot
+    if df.empty or pd.isna(max_corr_value):
+        print("No valid data points for plotting.")
+        return  # Return if no valid data points or correlations
+
+    # Convert to numeric values, coercing errors to NaN (which can be dropped later)
+    # work on a copy of the two columns so the shared DataFrame (and the context built on it) is left untouched
+    df_cleaned = df[[x_column, y_column]].apply(pd.to_numeric, errors='coerce')
+
+    # Drop rows with NaN values in either of the selected columns
+    df_cleaned = df_cleaned.dropna(subset=[x_column, y_column])
+
+    # Ensure there are enough data points to plot
+    if df_cleaned.empty:
+        print("No data points left after cleaning.")
+        return
+
+    density = density_threshold is not None and len(df_cleaned) > density_threshold
+    fig, ax = new_figure(figsize=(8, 6), kind='scatterplot')
+    if density:
+        # Large-N mode: aggregate into bins with NumPy and draw the counts, rendering cost no longer grows with rows
+        counts, x_edges, y_edges = _density_grid(df_cleaned[x_column], df_cleaned[y_column])
+        counts = np.ma.masked_equal(counts, 0)  # empty bins stay blank like the background of a scatter plot
+        mesh = ax.pcolormesh(x_edges, y_edges, counts.T, cmap='viridis', norm='log')
+        fig.colorbar(mesh, ax=ax, label='Number of points')
+    else:
+        # Plot the scatter plot using seaborn
+        sns.scatterplot(data=df_cleaned, x=x_column, y=y_column, hue=hue_column, ax=ax)
+
+    # Set plot title and labels
+    ax.set_title(f'Scatterplot between {x_column} and {y_column}')
+    ax.set_xlabel(x_column)
+    ax.set_ylabel(y_column)
+
+    # Add legend if hue_column is provided
+    if hue_column:
+        ax.legend(title=hue_column)
+ 
+    # replace empty spaces in column names by _ as if it is saved without removing spaces, the name of image will be of two parts and can cause problem while inserting
+    x_column_safe = x_column.replace(" ", "_")
+    y_column_safe = y_column.replace(" ", "_")
+    # Render the plot as PNG in memory, saving it is up to the caller unless an output directory is given
+    figure = render_figure(fig, f'{x_column_safe}_{y_column_safe}_scatterplot.png',
+                           {"plot": "scatterplot", "columns": [x_column, y_column], "rows": len(df_cleaned),
+                            "density": density})
+    if output_dir is not None:
+        save_figure(figure, output_dir)
+    return figure
+
+
+
+
+def generate_correlation_heatmap(df, output_dir=None, ctx=None):
+    """
+    Generates a correlation heatmap for the numeric columns in the given DataFrame and renders it as a PNG image.
+
+    Parameters:
+    - df (pd.DataFrame): The input DataFrame containing the data to visualize.
+    - output_dir (str, optional): The directory where the heatmap image will be saved, None keeps it in memory only.
+    - ctx (AnalysisContext, optional): Shared per-run context the correlation matrix is taken from.
+
+    The function:
+    1. Selects only the numeric columns.
+    2. Checks if there are at least two numeric columns (required for correlation).
+    3. Computes the correlation matrix, reduced to the HEATMAP_MAX_COLUMNS most correlated columns for wide tables.
+    4. Creates a heatmap with annotations for correlation values.
+    5. Renders the heatmap as PNG and saves it to the output directory if one is given.
+
+    Returns:
+    - RenderedFigure, or None if there are not enough numeric columns.
+    """
+    import seaborn as sns
+    ctx = ctx or AnalysisContext(df)
+    # Select only numeric columns from the DataFrame
+    numeric_columns = ctx.numeric_columns
+    
+    # Check if there are at least 2 numeric columns for computing correlations
+    if len(numeric_columns) < 2:
+        print("Not enough numeric columns to compute correlations.")
+        return
+
+    # Get the correlation matrix for the numeric columns, shared with the other stages; wide tables are reduced to the
+    # most correlated columns
+    correlation_matrix = ctx.heatmap_matrix()
+    reduced = len(correlation_matrix.columns) < len(numeric_columns)
+
+    # Plot the heatmap
+    fig, ax = new_figure(figsize=(10, 8), kind='correlation_heatmap')  # Set the figure size
+    sns.heatmap(
+        correlation_matrix,        # The correlation matrix as input
+        annot=True,                # Display the correlation values on the heatmap
+        cmap='coolwarm',           # Use the 'coolwarm' color palette
+        fmt=".2f",                 # Format for displaying correlation values (2 decimal places)
+        linewidths=0.5,            # Add lines between cells for better readability
+        ax=ax
+    )
+    
+    # Set the title of the heatmap
+    if reduced:
+        ax.set_title(f'Correlation Heatmap (top {len(correlation_matrix.columns)} of {len(numeric_columns)} columns)')
+    else:
+        ax.set_title('Correlation Heatmap')
+
+    # Render the heatmap and save it if an output directory is given
+    figure = render_figure(fig, 'correlation_heatmap.png',
+                           {"plot": "correlation_heatmap", "columns": list(correlation_matrix.columns),
+                            "reduced_from": len(numeric_columns) if reduced else None})
+    if output_dir is not None:
+        save_figure(figure, output_dir)
+    return figure
+
+
+
+
+# Silhouette is O(n^2), so above this many points it is estimated on a random sample of them.
+SILHOUETTE_SAMPLE_SIZE = 2_000
+
+
+def _make_kmeans(k, algorithm='kmeans'):
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    # MiniBatchKMeans trades a little inertia for fitting on mini-batches, which scales to far more rows
+    if algorithm == 'minibatch':
+        return MiniBatchKMeans(n_clusters=k, random_state=42, n_init='auto', batch_size=1024)
+    if algorithm == 'kmeans':
+        return KMeans(n_clusters=k, random_state=42, n_init='auto')
+    raise ValueError(f"Unknown clustering algorithm: {algorithm}")
+
+
+def _score_k(data, k, algorithm, silhouette_sample_size):
+    from sklearn.metrics import silhouette_score
+    # fit one candidate k and score it; returns (k, inertia, silhouette, fitted model)
+    kmeans = _make_kmeans(k, algorithm)
+    labels = kmeans.fit_predict(data)
+    sample_size = silhouette_sample_size if silhouette_sample_size and len(data) > silhouette_sample_size else None
+    score = silhouette_score(data, labels, sample_size=sample_size, random_state=42)
+    return k, kmeans.inertia_, score, kmeans
+
+
+def sweep_k(data, max_k=5, algorithm='kmeans', silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE, n_jobs=1):
+    """
+    Fit and score every candidate k from 2 to `max_k`.
+
+    Parameters:
+    - data (array-like): The dataset to cluster.
+    - max_k (int): The maximum number of clusters to consider.
+    - algorithm (str): 'kmeans' for full K-Means or 'minibatch' for MiniBatchKMeans.
+    - silhouette_sample_size (int): Score the silhouette on at most this many randomly sampled points (None for all).
+    - n_jobs (int): Number of candidate k values fitted concurrently.
+
+    Returns:
+    - list of (k, inertia, silhouette score, fitted model) tuples ordered by k.
+    """
+    candidates = range(2, max_k + 1)
+    if n_jobs and n_jobs > 1:
+        # the heavy lifting in scikit-learn and NumPy releases the GIL, so threads are enough and avoid copying data
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            return list(pool.map(lambda k: _score_k(data, k, algorithm, silhouette_sample_size), candidates))
+    return [_score_k(data, k, algorithm, silhouette_sample_size) for k in candidates]
+
+
+def find_optimal_k(data, max_k=5, algorithm='kmeans', silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE, n_jobs=1):
+    """
+    Determine the optimal number of clusters for K-Means clustering using the Elbow Method and Silhouette Score.
+
+    Parameters:
+    - data (array-like): The dataset to cluster, typically a NumPy array or pandas DataFrame.
+    - max_k (int): The maximum number of clusters to consider. Default is 5.
+    - algorithm (str): 'kmeans' (default) or 'minibatch' to fit with MiniBatchKMeans.
+    - silhouette_sample_size (int): Above this many points the silhouette score is computed on a random sample of
+      this size, which keeps the O(n^2) scoring bounded. None scores on all points.
+    - n_jobs (int): Number of candidate k values evaluated concurrently. Default is 1.
+
+    Returns:
+    - int: The optimal number of clusters based on the highest silhouette score.
+
+    The function:
+    1. Iterates over k values from 2 to `max_k`.
+    2. Computes the inertia (sum of squared distances to the nearest cluster center) for each k.
+    3. Computes the (sampled) silhouette score for each k.
+    4. Returns the k value with the highest silhouette score.
+    """
+    import numpy as np
+    results = sweep_k(data, max_k, algorithm, silhouette_sample_size, n_jobs)
+
+    # Find the k value corresponding to the highest silhouette score
+    optimal_k = results[int(np.argmax([score for _, _, score, _ in results]))][0]
+
+    return optimal_k
+
+
+# rows per mini-batch when a projection is fitted over the full table
+PROJECTION_BATCH_ROWS = 50_000
+CLUSTER_PROJECTIONS = ('columns', 'pca', 'svd')
+
+
+def _standardized_batches(df, columns, mean, std, batch_rows):
+    # the columns of df in row batches, missing values imputed with the mean and standardized
+    import numpy as np
+    for start in range(0, len(df), batch_rows):
+        batch = df[columns].iloc[start:start + batch_rows].to_numpy(dtype=float)
+        batch = np.where(np.isnan(batch), mean, batch)
+        yield (batch - mean) / std
+
+
+def fit_projection(df, columns, method='pca', ctx=None, batch_rows=PROJECTION_BATCH_ROWS):
+    """
+    Fit a linear projection of the standardized columns to 2D over every row of df, one mini-batch at a time.
+
+    Missing values are imputed with the column mean. 'pca' fits an IncrementalPCA batch by batch; 'svd' accumulates
+    the p x p covariance matrix of the standardized columns and takes its two leading components with randomized SVD.
+    Either way memory stays O(batch_rows x p + p^2) however many rows there are, no standardized copy of the table
+    is made.
+
+    :param df: DataFrame with the rows to fit on
+    :param columns: Numeric columns to project
+    :param method: 'pca' or 'svd'
+    :param ctx: Optional AnalysisContext, the column means and standard deviations are taken from its describe()
+    :param batch_rows: Rows per mini-batch
+    :return: tuple of (transform, explained variance ratio of the two components); transform maps a DataFrame with
+             the same (already imputed or not) columns to an (n, 2) array
+    """
+    import numpy as np
+    ctx = ctx or AnalysisContext(df)
+    mean = ctx.describe.loc['mean', columns].to_numpy(dtype=float)
+    std = ctx.describe.loc['std', columns].to_numpy(dtype=float)
+    # constant columns carry no variance, they only must not divide by zero
+    std = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+
+    if method == 'pca':
+        from sklearn.decomposition import IncrementalPCA
+        pca = IncrementalPCA(n_components=2)
+        for batch in _standardized_batches(df, columns, mean, std, batch_rows):
+            # partial_fit needs at least as many rows as components, a tiny last batch is left out
+            if len(batch) >= 2:
+                pca.partial_fit(batch)
+        components, center = pca.components_, pca.mean_
+        explained = pca.explained_variance_ratio_
+    elif method == 'svd':
+        from sklearn.utils.extmath import randomized_svd
+        p = len(columns)
+        rows, total, scatter = 0, np.zeros(p), np.zeros((p, p))
+        for batch in _standardized_batches(df, columns, mean, std, batch_rows):
+            rows += len(batch)
+            total += batch.sum(axis=0)
+            scatter += batch.T @ batch
+        center = total / rows
+        covariance = (scatter - rows * np.outer(center, center)) / max(rows - 1, 1)
+        _, eigenvalues, components = randomized_svd(covariance, n_components=2, random_state=42)
+        explained = eigenvalues / max(np.trace(covariance), 1e-12)
+    else:
+        raise ValueError(f"Unknown projection: {method}")
+
+    def transform(data):
+        batch = next(_standardized_batches(data, columns, mean, std, max(len(data), 1)))
+        return (batch - center) @ components.T
+
+    return transform, [float(ratio) for ratio in explained]
+
+
+def generate_cluster_data(df, output_dir=None, max_columns=10, max_k=5, sample_size=500, ctx=None, algorithm='kmeans',
+                          silhouette_sample_size=SILHOUETTE_SAMPLE_SIZE, n_jobs=1,
+                          density_threshold=SCATTER_DENSITY_THRESHOLD, projection='columns'):
+    """
+    Perform clustering on a dataset and render a scatterplot of the clusters.
+
+    Parameters:
+    - df: DataFrame containing the data to be clustered.
+    - output_dir: Optional directory to save the clustering plot, None keeps it in memory only.
+    - max_columns: The maximum number of columns to consider for clustering based on variance (default is 10).
+    - max_k: The maximum number of clusters to test for optimal k (default is 5).
+    - sample_size: The number of rows to sample from the dataset if it exceeds this size (default is 500).
+    - ctx: Optional AnalysisContext the numeric columns are taken from.
+    - algorithm: 'kmeans' (default) or 'minibatch' for MiniBatchKMeans, see find_optimal_k.
+    - silhouette_sample_size: Maximum number of points the silhouette score is computed on, see find_optimal_k.
+    - n_jobs: Number of candidate k values evaluated concurrently.
+    - density_threshold: Above this many sampled points each cluster is drawn as density contours instead of
+      individual markers (None always draws markers).
+    - projection: 'columns' plots the first two high-variance columns, 'pca' and 'svd' plot the sample projected on
+      the first two principal components of all selected columns, fitted over the full table (see fit_projection).
+    
+    Returns:
+    - RenderedFigure of the clustering plot.
+    - None if the clustering process cannot proceed due to insufficient data or columns.
+    """
+    import numpy as np
+    import seaborn as sns
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.impute import SimpleImputer
+    ctx = ctx or AnalysisContext(df)
+    # Step 1: Select numeric columns and exclude potential ID-like columns
+    numeric_columns = ctx.numeric_columns
+    excluded_keywords = ['id', 'ID']  # Keywords to identify potential ID-like columns
+    suitable_columns = [col for col in numeric_columns if not any(keyword in col.lower() for keyword in excluded_keywords)]
+
+    if len(suitable_columns) < 2:
+        print("Not enough suitable numeric columns for clustering.")
+        return None  # Return early if there are fewer than two suitable numeric columns
+
+    # Step 2: Select up to max_columns with the highest variance
+    variances = df[suitable_columns].var()
+    high_variance_columns = variances.nlargest(max_columns).index.tolist()
+
+    if len(high_variance_columns) < 2:
+        print("Not enough high-variance columns for clustering.")
+        return None  # Return early if there are fewer than two columns with sufficient variance
+
+    # Step 3: Sample the data if it’s too large (to avoid long processing times)
+    # only the selected columns are taken, which also keeps the imputation and cluster labels below off the caller's DataFrame
+    full_df = df
+    if len(df) > sample_size:
+        # the run's seeded reservoir sample (stratified when the context is)
+        df = ctx.sample(sample_size)[high_variance_columns]
+    else:
+        df = df[high_variance_columns].copy()
+
+    # Step 4: Handle missing values by imputing with the mean of each column
+    numeric_imputer = SimpleImputer(strategy='mean')
+    df[high_variance_columns] = numeric_imputer.fit_transform(df[high_variance_columns])
+
+    # Step 5: Scale the numeric data to ensure equal contribution of each feature
+    scaler = StandardScaler()
+    data_scaled = scaler.fit_transform(df[high_variance_columns])
+
+    # Step 6: Determine the optimal number of clusters using a method like the elbow or silhouette score
+    results = sweep_k(data_scaled, max_k, algorithm, silhouette_sample_size, n_jobs)
+    optimal_k, _, _, kmeans = results[int(np.argmax([score for _, _, score, _ in results]))]
+    print(f"Optimal number of clusters: {optimal_k}")
+
+    # Step 7: Reuse the KMeans model already fitted with the optimal number of clusters (k) during the sweep
+    df['Cluster'] = kmeans.labels_
+
+    # Step 8: Generate a scatterplot using the first two selected columns with high variance, or the projection of
+    # all of them
+    explained = None
+    if projection == 'columns':
+        x_values, y_values = df[high_variance_columns[0]], df[high_variance_columns[1]]
+        x_label, y_label = high_variance_columns[0], high_variance_columns[1]
+    else:
+        import pandas as pd
+        # fitted on every row, only the sampled points are drawn
+        transform, explained = fit_projection(full_df, high_variance_columns, projection, ctx=ctx)
+        coordinates = transform(df[high_variance_columns])
+        x_values = pd.Series(coordinates[:, 0], index=df.index, name='PC1')
+        y_values = pd.Series(coordinates[:, 1], index=df.index, name='PC2')
+        x_label, y_label = (f"PC{i + 1} ({ratio:.1%} of variance)" for i, ratio in enumerate(explained))
+        print(f"Projection ({projection}) of {len(high_variance_columns)} columns explains "
+              f"{explained[0]:.1%} + {explained[1]:.1%} of the variance")
+    density = density_threshold is not None and len(df) > density_threshold
+    fig, ax = new_figure(figsize=(8, 6), kind='clustering')
+    if density:
+        # Per-cluster density mode: every cluster is binned on the same grid and drawn as filled contours in its color
+        from matplotlib.patches import Patch
+        colors = sns.color_palette('viridis', optimal_k)
+        bounds = [[x_values.min(), x_values.max()], [y_values.min(), y_values.max()]]
+        handles = []
+        for cluster in range(optimal_k):
+            members = (df['Cluster'] == cluster).to_numpy()
+            counts, x_edges, y_edges = _density_grid(x_values[members], y_values[members], range_=bounds)
+            if counts.max() == 0:
+                continue
+            x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+            y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+            # levels relative to the cluster's peak, so small clusters remain visible next to big ones
+            levels = counts.max() * np.array([0.02, 0.1, 0.3, 1.0])
+            ax.contourf(x_centers, y_centers, counts.T, levels=levels, colors=[colors[cluster]], alpha=0.35)
+            ax.contour(x_centers, y_centers, counts.T, levels=levels[:-1], colors=[colors[cluster]], linewidths=1)
+            handles.append(Patch(color=colors[cluster], label=str(cluster)))
+        ax.legend(handles=handles, title='Cluster')
+    else:
+        sns.scatterplot(
+            x=x_values,                      # X-axis: First column with high variance
+            y=y_values,                      # Y-axis: Second column with high variance
+            hue=df['Cluster'],               # Hue: Cluster labels
+            palette='viridis',               # Color palette for clusters
+            s=100,                           # Size of points in scatter plot
+            alpha=0.7,                       # Transparency of points
+            ax=ax
+        )
+        ax.legend(title='Cluster')                    # Legend with the title "Cluster"
+
+    ax.set_title(f'KMeans Clustering (k={optimal_k})')  # Plot title with the number of clusters
+    ax.set_xlabel(x_label)                              # Label for the X-axis
+    ax.set_ylabel(y_label)                              # Label for the Y-axis
+
+    # Render the plot with margins fitted to its labels, and save it in the output directory if one is given
+    metadata = {"plot": "clustering", "columns": high_variance_columns[:2], "k": int(optimal_k), "rows": len(df),
+                "density": density, "projection": projection}
+    if explained is not None:
+        metadata.update(columns=high_variance_columns, explained_variance=[round(ratio, 4) for ratio in explained])
+    figure = render_figure(fig, 'clustering_plot.png', metadata)
+    if output_dir is not None:
+        save_figure(figure, output_dir)
+    return figure
+
+    
+
+# narrating the story and making README.md
+# the endpoint can be pointed at another OpenAI compatible server (e.g. a local stub) through AIPROXY_URL
+LLM_ENDPOINT = os.environ.get("AIPROXY_URL", "https://aiproxy.sanand.workers.dev/openai/v1/chat/completions")
+LLM_MODEL = "gpt-4o-mini"
+
+# responses are cached on disk so reruns on unchanged images and headers don't call the LLM again
+LLM_CACHE_DIR = os.environ.get("AUTOLYSIS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "autolysis", "llm"))
+LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LLM_CACHE_MAX_AGE = 30 * 24 * 3600  # seconds
+
+
+class LLMResponseCache:
+    """
+    Persistent on-disk cache of LLM responses, keyed by a content hash of everything that goes into the request.
+
+    Each entry is one JSON file named after its key. Entries are written to a temporary file and atomically renamed
+    into place, so parallel runs sharing the directory never see partial entries. Entries older than max_age seconds
+    are dropped, and the least recently used ones are evicted once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory=LLM_CACHE_DIR, max_bytes=LLM_CACHE_MAX_BYTES, max_age=LLM_CACHE_MAX_AGE):
+        """
+        :param directory: Directory holding the cache entries, created if missing
+        :param max_bytes: Size budget of the directory in bytes
+        :param max_age: Maximum age of an entry in seconds
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(model, prompt, headers_json, images):
+        """
+        Hash the model name, prompt text, headers and image bytes into a cache key.
+
+        :param images: Iterable of image contents as bytes
+        :return: hex digest
+        """
+        digest = hashlib.sha256()
+        for part in (model, prompt, headers_json):
+            encoded = part.encode('utf-8')
+            # length prefixes keep ("ab", "c") and ("a", "bc") from hashing the same
+            digest.update(len(encoded).to_bytes(8, 'big'))
+            digest.update(encoded)
+        for image in images:
+            digest.update(len(image).to_bytes(8, 'big'))
+            digest.update(image)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """
+        :return: The cached response content, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                raise FileNotFoundError(path)
+            with open(path, encoding='utf-8') as f:
+                content = json.load(f)["content"]
+            os.utime(path)  # mark as recently used for the eviction order
+        except (OSError, ValueError, KeyError):
+            # missing, expired, evicted by another process meanwhile or unreadable: all of them are a miss
+            self.misses += 1
+            return None
+        self.hits += 1
+        return content
+
+    def put(self, key, content):
+        """
+        Store a response and evict old entries if the cache is over its budget.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"created": time.time(), "content": content}, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Remove expired entries, then the least recently used ones until the directory fits in max_bytes.
+        """
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(entry.path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        # another process may have removed it already
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# HTTP client settings for the LLM calls
+LLM_CONNECT_TIMEOUT = 10    # seconds to establish the connection
+LLM_READ_TIMEOUT = 180      # seconds to wait for the response, vision requests with several images are slow
+LLM_MAX_RETRIES = 4
+LLM_BACKOFF_BASE = 1.0      # seconds, doubled on every retry
+LLM_BACKOFF_MAX = 30.0
+LLM_RETRY_AFTER_MAX = 120.0  # upper bound on a server supplied Retry-After
+LLM_RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMClient:
+    """
+    Pooled, retrying and timeout-bounded HTTP client for the chat-completions endpoint.
+
+    A single requests.Session keeps connections alive across calls, so one client should be reused for every request
+    made by the process (see get_llm_client). Connection errors, timeouts and 429/5xx responses are retried with
+    exponential backoff and full jitter, honoring a Retry-After header when the server sends one. Every attempt is
+    recorded in `metrics` with its latency and outcome.
+    """
+
+    def __init__(self, api_key, endpoint=None, connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX, pool_size=10):
+        """
+        :param api_key: The API key sent as bearer token
+        :param endpoint: Chat-completions URL, defaults to LLM_ENDPOINT
+        :param connect_timeout: Seconds to establish a connection
+        :param read_timeout: Seconds to wait between bytes of the response
+        :param max_retries: Number of retries after the first attempt
+        :param backoff_base: Delay before the first retry in seconds, doubled for each further retry
+        :param backoff_max: Cap of the backoff delay in seconds
+        :param pool_size: Number of pooled connections kept per host
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.endpoint = endpoint or LLM_ENDPOINT
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = []
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        # retries are handled below, so urllib3's own retrying is switched off
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def _retry_delay(self, attempt, response=None):
+        # server supplied Retry-After wins (either delay-seconds or an HTTP date), otherwise exponential backoff
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), LLM_RETRY_AFTER_MAX)
+        # full jitter spreads out the retries of parallel runs hitting the same rate limit
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record(self, **metric):
+        with self._lock:
+            self.metrics.append(metric)
+
+    def post_json(self, payload, **kwargs):
+        """
+        POST a JSON payload to the endpoint, retrying transient failures.
+
+        :param payload: JSON-serializable request body
+        :param kwargs: Passed on to requests.Session.post (e.g. stream=True)
+        :return: requests.Response with a successful status
+        :raises requests.exceptions.RequestException: once the retries are exhausted or on a non-retryable error
+        """
+        import requests
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            response = None
+            try:
+                response = self.session.post(self.endpoint, json=payload, timeout=self.timeout, **kwargs)
+                retryable = response.status_code in LLM_RETRY_STATUS_CODES
+                if not retryable:
+                    response.raise_for_status()
+                error = f"HTTP {response.status_code}" if retryable else None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                retryable, error = True, type(e).__name__
+                if attempt == self.max_retries:
+                    self._record(attempt=attempt, status=None, seconds=time.perf_counter() - start, error=error)
+                    raise
+            except requests.exceptions.RequestException as e:
+                self._record(attempt=attempt, status=response.status_code if response is not None else None,
+                             seconds=time.perf_counter() - start, error=type(e).__name__)
+                raise
+
+            self._record(attempt=attempt, status=response.status_code if response is not None else None,
+                         seconds=time.perf_counter() - start, error=error)
+            if not retryable:
+                return response
+            if attempt == self.max_retries:
+                response.raise_for_status()
+
+            delay = self._retry_delay(attempt, response)
+            print(f"LLM request failed ({error}), retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+            if response is not None:
+                response.close()  # hand the connection back to the pool
+            time.sleep(delay)
+
+    def latency_summary(self):
+        """
+        :return: Dictionary with the number of attempts, failed attempts and latency statistics in seconds
+        """
+        with self._lock:
+            latencies = sorted(metric["seconds"] for metric in self.metrics)
+            failures = sum(1 for metric in self.metrics if metric["error"])
+        if not latencies:
+            return {"attempts": 0, "failures": 0}
+        return {
+            "attempts": len(latencies),
+            "failures": failures,
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "p50": round(latencies[len(latencies) // 2], 3),
+            "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            "max": round(latencies[-1], 3),
+        }
+
+
+_llm_clients = {}
+_llm_clients_lock = threading.Lock()
+
+
+def get_llm_client(api_key, endpoint=None, **settings):
+    """
+    Return the process-wide LLMClient for this key, endpoint and settings, so every call (and every dataset of a
+    batch worker) shares the same connection pool.
+
+    :param settings: Keyword arguments for LLMClient (connect_timeout, read_timeout, max_retries, ...)
+    """
+    key = (api_key, endpoint or LLM_ENDPOINT, tuple(sorted(settings.items())))
+    with _llm_clients_lock:
+        if key not in _llm_clients:
+            _llm_clients[key] = LLMClient(api_key, endpoint, **settings)
+        return _llm_clients[key]
+
+
+def encode_image(image_path):
+    # encode image to send image to llm because llm can't read images by relative file path in folder structure
+    with open(image_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode('utf-8')
+
+
+def _image_bytes(image):
+    # images are either RenderedFigure objects from this run or paths of PNG files on disk
+    if isinstance(image, RenderedFigure):
+        return image.data
+    with open(image, "rb") as image_file:
+        return image_file.read()
+
+
+def _image_name(image):
+    return image.name if isinstance(image, RenderedFigure) else os.path.basename(image)
+
+
+@dataclass(frozen=True)
+class ImageOptimization:
+    """
+    Settings of the image optimization stage that runs before images are uploaded to the vision model.
+
+    - max_edge: Images whose longer side exceeds this many pixels are downscaled to it.
+    - image_format: 'png' (palette quantized), 'jpeg' or 'webp'; 'original' sends the images untouched.
+    - quality: Encoder quality for jpeg and webp.
+    - colors: Palette size for quantized png.
+    - byte_budget: Optional total size in bytes for all images of one request, shared equally between them.
+      Images over their share are downscaled (and for lossy formats re-encoded at lower quality) until they fit.
+    """
+    max_edge: int = 1024
+    image_format: str = 'png'
+    quality: int = 80
+    colors: int = 256
+    byte_budget: int = None
+
+
+IMAGE_MIME_TYPES = {'png': 'image/png', 'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+
+
+def _encode_image(image, options, quality):
+    # encode a PIL image with the configured format, returns the bytes
+    buffer = io.BytesIO()
+    if options.image_format == 'png':
+        image.convert('RGB').quantize(colors=options.colors).save(buffer, format='PNG', optimize=True)
+    elif options.image_format == 'jpeg':
+        image.convert('RGB').save(buffer, format='JPEG', quality=quality, optimize=True)
+    elif options.image_format == 'webp':
+        image.save(buffer, format='WEBP', quality=quality, method=6)
+    else:
+        raise ValueError(f"Unknown image format: {options.image_format}")
+    return buffer.getvalue()
+
+
+def optimize_image(data, options, max_bytes=None):
+    """
+    Downscale and re-encode one image according to the optimization settings.
+
+    :param data: Encoded image bytes
+    :param options: ImageOptimization
+    :param max_bytes: Optional size limit for this image
+    :return: tuple of (image bytes, mime type)
+    """
+    from PIL import Image
+    if options.image_format == 'original':
+        return data, 'image/png'
+
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    if max(image.size) > options.max_edge:
+        image.thumbnail((options.max_edge, options.max_edge), Image.LANCZOS)
+
+    quality = options.quality
+    optimized = _encode_image(image, options, quality)
+    # shrink step by step until the image fits its share of the budget, giving up on tiny images
+    while max_bytes and len(optimized) > max_bytes and min(image.size) > 64:
+        if options.image_format != 'png' and quality > 40:
+            quality -= 15
+        else:
+            image = image.resize((int(image.width * 0.8), int(image.height * 0.8)), Image.LANCZOS)
+        optimized = _encode_image(image, options, quality)
+
+    # re-encoding a small, already compact PNG can make it larger, keep the original then
+    if options.image_format == 'png' and len(optimized) >= len(data) and not max_bytes:
+        return data, 'image/png'
+    return optimized, IMAGE_MIME_TYPES[options.image_format]
+
+
+def optimize_images(images, names, options):
+    """
+    Optimize all images of one request and log their size before and after.
+
+    :param images: List of image bytes
+    :param names: List of image names used in the log
+    :param options: ImageOptimization, None sends the images unchanged
+    :return: List of (image bytes, mime type) tuples
+    """
+    if options is None:
+        return [(image, 'image/png') for image in images]
+    per_image_budget = options.byte_budget // len(images) if options.byte_budget and images else None
+    optimized = []
+    for image, name in zip(images, names):
+        data, mime_type = optimize_image(image, options, per_image_budget)
+        print(f"Image {name}: {len(image)} -> {len(data)} bytes ({mime_type})")
+        optimized.append((data, mime_type))
+    return optimized
+
+
+def build_story_prompt(headers_json):
+    # instructions sent along with the images, the README parser relies on the "### Image N" labels asked for here
+    return (
+        "For each image, generate a concise and insightful story based on its content. "
+        "Label each story with the corresponding image identifier (e.g., Image 1, Image 2, etc.)."
+        "Make sure to always label image with 3 # (eg. ### Image 1, ### Image 2). "
+        "make the story atleat 250 words long for each image. "
+        "Focus on trends, patterns, and data structure. Headers (and a profile of the dataset when available) for "
+        f"context are provided, don't use these in your story: {headers_json}."
+    )
+
+
+# Token budget of one LLM request (prompt tokens: instructions, dataset context and images). Requests estimated above
+# it are split; gpt-4o-mini has a 128k context, the rest is left for the stories.
+LLM_TOKEN_BUDGET = 100_000
+# share of the budget the dataset context (headers and profile) may take, it is repeated in every split request
+CONTEXT_TOKEN_SHARE = 0.2
+# prompt tokens of an image as (base, per 512px tile), following OpenAI's published vision pricing
+IMAGE_TOKEN_COSTS = {"gpt-4o-mini": (2833, 5667)}
+DEFAULT_IMAGE_TOKEN_COST = (85, 170)
+
+_token_encoder = None
+
+
+def estimate_text_tokens(text):
+    """
+    Number of tokens of a text: exact with tiktoken when it is installed, otherwise about 4 characters per token.
+    """
+    global _token_encoder
+    if _token_encoder is None:
+        try:
+            import tiktoken
+            _token_encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            # optional dependency (and its encoding files need a download), the heuristic is good enough to plan with
+            _token_encoder = False
+    if _token_encoder:
+        return len(_token_encoder.encode(text))
+    return -(-len(text) // 4)
+
+
+def estimate_image_tokens(width, height, model=LLM_MODEL):
+    """
+    Prompt tokens of an image sent with detail "auto"/"high": it is scaled to fit 2048x2048, then its shorter side
+    to 768px, and charged per 512px tile plus a base cost.
+    """
+    base, per_tile = IMAGE_TOKEN_COSTS.get(model, DEFAULT_IMAGE_TOKEN_COST)
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return base + per_tile * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def _round_floats(value, digits=4):
+    # shortens the numbers of the profile, 15 significant digits of a mean are tokens without information
+    if isinstance(value, float):
+        return float(f"{value:.{digits}g}")
+    if isinstance(value, dict):
+        return {key: _round_floats(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_round_floats(item, digits) for item in value]
+    return value
+
+
+def _context_levels(headers_json, profile):
+    # the dataset context from richest to smallest: (level name, text)
+    headers = json.loads(headers_json)["headers"]
+    if profile:
+        profile = {key: value for key, value in profile.items() if key != "headers"}
+        yield "profile", json.dumps({"headers": headers, "profile": _round_floats(profile)}, default=str,
+                                    separators=(',', ':'))
+        summary = {
+            "shape": profile.get("shape"),
+            "dtypes": profile.get("dtypes"),
+            "null_values": {column: count for column, count in (profile.get("null_values") or {}).items() if count},
+            "numerical_summary": {column: {stat: stats.get(stat) for stat in ("mean", "std", "min", "max")}
+                                  for column, stats in (profile.get("numerical_summary") or {}).items()},
+        }
+        yield "summary", json.dumps({"headers": headers, "profile": _round_floats(summary, 3)}, default=str,
+                                    separators=(',', ':'))
+    yield "headers", headers_json
+    # last resort for very wide tables: the first columns only, halved until they fit
+    count = len(headers)
+    while count > 1:
+        count //= 2
+        yield f"headers[:{count}]", json.dumps({"headers": headers[:count],
+                                                "omitted_columns": len(headers) - count})
+
+
+@dataclass
+class RequestPlan:
+    """
+    How the story request for a list of images is sent.
+
+    context is the dataset context put into the prompt (context_level says how much of it was kept), batches lists
+    the image indices of each request (consecutive, in order) and estimated_tokens the estimated prompt tokens of
+    each request.
+    """
+    context: str
+    context_level: str
+    batches: list
+    estimated_tokens: list
+
+
+def plan_requests(images, headers_json, profile=None, token_budget=LLM_TOKEN_BUDGET, model=LLM_MODEL):
+    """
+    Fit the story request into the token budget before anything is sent.
+
+    The dataset context is the richest of profile, summarized profile, headers and truncated headers that fits into
+    CONTEXT_TOKEN_SHARE of the budget. The images are then packed in order into as few requests as possible; an image
+    that alone exceeds the budget still gets a request of its own.
+
+    :param images: List of (image bytes, mime type) tuples as they will be sent
+    :param headers_json: Column headers as returned by get_headers_as_json
+    :param profile: Optional profile from profile_dataset / StreamingProfiler.summary
+    :param token_budget: Prompt tokens per request
+    :param model: Model name, selects the image token costs
+    :return: RequestPlan
+    """
+    from PIL import Image
+    context_budget = int(token_budget * CONTEXT_TOKEN_SHARE)
+    for level, context in _context_levels(headers_json, profile):
+        prompt_tokens = estimate_text_tokens(build_story_prompt(context))
+        if prompt_tokens <= context_budget:
+            break
+
+    # the image header is enough for the size, the pixels are not decoded
+    image_tokens = [estimate_image_tokens(*Image.open(io.BytesIO(data)).size, model=model) for data, _ in images]
+    batches, estimated_tokens = [], []
+    for index, tokens in enumerate(image_tokens):
+        if batches and estimated_tokens[-1] + tokens <= token_budget:
+            batches[-1].append(index)
+            estimated_tokens[-1] += tokens
+        else:
+            batches.append([index])
+            estimated_tokens.append(prompt_tokens + tokens)
+    return RequestPlan(context=context, context_level=level, batches=batches, estimated_tokens=estimated_tokens)
+
+
+def merge_stories(responses):
+    """
+    Merge the responses of split requests back into one text with "### Image N" sections numbered across all of them.
+
+    :param responses: List of (index of the first image of the request, number of images, response or None)
+    :return: Tuple of the merged text (None if every request failed) and the sorted list of the image numbers left
+             without a story, e.g. all images of a failed request
+    """
+    sections = []
+    total = 0
+    for offset, count, response in responses:
+        total = max(total, offset + count)
+        if not response:
+            continue
+        stories = split_stories(response)
+        if not stories and count == 1:
+            # a single image answered without its label
+            stories = {"1": response.strip()}
+        for label, story in stories.items():
+            if label.isdigit() and 1 <= int(label) <= count:
+                sections.append((offset + int(label), story))
+    numbers = {number for number, _ in sections}
+    missing = [number for number in range(1, total + 1) if number not in numbers]
+    if not sections:
+        return None, missing
+    return "\n\n".join(f"### Image {number}\n{story}" for number, story in sorted(sections)), missing
+
+
+def _iter_stream_deltas(response, usage):
+    # content pieces of a chat-completions SSE stream; the usage block (last event, with include_usage) goes into usage
+    import requests
+    # the stream is UTF-8, requests would assume ISO-8859-1 for a text/event-stream without charset
+    response.encoding = 'utf-8'
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        event = json.loads(data)
+        if event.get("usage"):
+            usage.update(event["usage"])
+        for choice in event.get("choices") or []:
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+    # the end of the connection is the end of an SSE response, so a dropped stream looks like a short one; without
+    # [DONE] the last story may be cut off and must neither be written as complete nor cached
+    raise requests.exceptions.ChunkedEncodingError("The response stream ended before [DONE]")
+
+
+def _send_story_request(client, prompt, context, images, cache, on_story=None):
+    # one chat-completions request for a batch of images, returns (content or None, trace annotations).
+    # With on_story the response is streamed and on_story(label, story) is called for every "### Image N" section as
+    # soon as it is complete.
+    import requests
+    annotations = {}
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(LLM_MODEL, prompt, context, [data for data, _ in images])
+        cached = cache.get(cache_key)
+        print(f"LLM response cache {'hit' if cached is not None else 'miss'} (hits={cache.hits}, misses={cache.misses})")
+        annotations["llm_cache"] = 'hit' if cached is not None else 'miss'
+        if cached is not None:
+            if on_story is not None:
+                for label, story in split_stories(cached).items():
+                    on_story(label, story)
+            return cached, annotations
+
+    # Prepare the payload with multiple images, to reduce the number of requests, taking less time.
+    messages_content = [{"type": "text", "text": prompt}]
+
+    # Add each image to the payload
+    for image, mime_type in images:
+        base64_image = base64.b64encode(image).decode('utf-8')
+        messages_content.append({
+            "type": "image_url",
+            "image_url": {"url": f"data:{mime_type};base64,{base64_image}"}
+        })
+
+    # Complete payload for the request
+    payload = {
+        "model": LLM_MODEL,
+        "messages": [{"role": "user", "content": messages_content}]
+    }
+    if on_story is not None:
+        payload.update(stream=True, stream_options={"include_usage": True})
+    annotations.update(llm_requests=1, llm_images=len(images), llm_image_bytes=sum(len(data) for data, _ in images),
+                       llm_request_bytes=len(json.dumps(payload)))
+
+    try:
+        start = time.perf_counter()
+        if on_story is None:
+            response = client.post_json(payload)
+            result = response.json()
+            annotations["llm_response_bytes"] = len(response.content)
+            usage = result.get('usage') or {}
+            #print(result['choices'][0]['message']['content']) # sanity check, also for knowing the structure of the response
+            content = result['choices'][0]['message']['content']
+        else:
+            usage, pieces = {}, []
+            parser = StorySectionParser()
+            with client.post_json(payload, stream=True) as response:
+                if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                    # an endpoint (or proxy) that ignores stream=True answers with the complete response
+                    result = response.json()
+                    usage.update(result.get('usage') or {})
+                    stream = [result['choices'][0]['message']['content']]
+                else:
+                    stream = _iter_stream_deltas(response, usage)
+                for piece in stream:
+                    if not pieces:
+                        annotations["llm_first_token_seconds"] = round(time.perf_counter() - start, 4)
+                    pieces.append(piece)
+                    for label, story in parser.feed(piece):
+                        on_story(label, story)
+            for label, story in parser.finish():
+                on_story(label, story)
+            content = "".join(pieces)
+            annotations["llm_response_bytes"] = len(content.encode('utf-8'))
+        print(f"LLM request completed in {time.perf_counter() - start:.2f}s")
+        annotations.update({f"llm_{key}": usage[key] for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')
+                            if isinstance(usage.get(key), int)})
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+        return None, annotations
+    except (KeyError, IndexError, ValueError) as e:
+        print(f"Unexpected response format: {e}")
+        return None, annotations
+
+    if cache is not None and content:
+        try:
+            cache.put(cache_key, content)
+        except OSError as e:
+            # a read-only or full cache directory must not fail the run
+            print(f"Failed to cache the LLM response: {e}")
+    return content, annotations
+
+
+def get_batched_image_analysis(api_key, images, headers_json, cache=None, client=None,
+                               image_options=ImageOptimization(), trace=None, profile=None,
+                               token_budget=LLM_TOKEN_BUDGET, on_section=None):
+    """
+    Sends a request to an API for generating insights and stories based on multiple images.
+
+    The function prepares a batch request where each image is analyzed to produce a story based on its content. 
+    The API response provides the generated stories, which are then returned by the function.
+    The request is planned against a token budget first (see plan_requests): the dataset context is trimmed to fit,
+    and images that don't fit into one request are split across several requests, sent concurrently and merged back
+    into one "### Image N" numbering.
+
+    Parameters:
+    - api_key: The API key required for authentication in the request headers.
+    - images: A list of RenderedFigure objects or image file paths to be analyzed by the API.
+    - headers_json: Contextual headers or additional information to be included in the prompt for generating stories.
+    - cache: Optional LLMResponseCache. On a hit the stored stories are returned without any HTTP call.
+    - client: Optional LLMClient, defaults to the shared client for api_key.
+    - image_options: ImageOptimization applied to the images before they are sent, None sends them unchanged.
+    - trace: Optional RunTrace, the running stage is annotated with the images, request bytes, estimated and actual
+      token usage.
+    - profile: Optional dataset profile added to the context when it fits the budget.
+    - token_budget: Estimated prompt tokens allowed per request.
+    - on_section: Optional callback on_section(image number, story). The responses are then streamed and it is called
+      for every "### Image N" section as soon as it is complete, numbered across all requests.
+
+    Returns:
+    - The generated content (stories) as a string if the request is successful.
+    - None if the request fails or the response format is unexpected.
+    """
+    # the pooled client carries the endpoint, auth headers, timeouts and retries
+    client = client or get_llm_client(api_key)
+
+    # images are read and optimized once, the bytes that are actually sent feed both the cache key and the payload
+    images = optimize_images([_image_bytes(image) for image in images], [_image_name(image) for image in images],
+                             image_options)
+
+    plan = plan_requests(images, headers_json, profile=profile, token_budget=token_budget)
+    prompt = build_story_prompt(plan.context)
+    print(f"Planned {len(plan.batches)} LLM request(s) of about {plan.estimated_tokens} prompt tokens "
+          f"(context: {plan.context_level}, budget: {token_budget})")
+
+    batches = [[images[index] for index in batch] for batch in plan.batches]
+
+    def send(batch_number):
+        on_story = None
+        if on_section is not None:
+            offset, count = plan.batches[batch_number][0], len(plan.batches[batch_number])
+
+            def on_story(label, story):
+                # labels are numbered per request, the README numbers across all of them
+                if label.isdigit() and 1 <= int(label) <= count:
+                    on_section(offset + int(label), story)
+        return _send_story_request(client, prompt, plan.context, batches[batch_number], cache, on_story)
+
+    if len(batches) == 1:
+        outcomes = [send(0)]
+    else:
+        with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+            outcomes = list(pool.map(send, range(len(batches))))
+
+    estimated = sum(tokens for tokens, (_, annotations) in zip(plan.estimated_tokens, outcomes)
+                    if annotations.get("llm_requests"))
+    actual = sum(annotations.get("llm_prompt_tokens", 0) for _, annotations in outcomes)
+    if trace is not None:
+        # annotations are added here rather than in the request threads, the trace follows the calling thread
+        first_tokens = [annotations.pop("llm_first_token_seconds") for _, annotations in outcomes
+                        if "llm_first_token_seconds" in annotations]
+        if first_tokens:
+            trace.annotate(llm_first_token_seconds=min(first_tokens))
+        for _, annotations in outcomes:
+            trace.annotate(**annotations)
+        cache_outcomes = {annotations["llm_cache"] for _, annotations in outcomes if "llm_cache" in annotations}
+        if len(cache_outcomes) > 1:
+            trace.annotate(llm_cache='partial')
+        trace.annotate(llm_estimated_prompt_tokens=estimated, llm_context_level=plan.context_level,
+                       llm_planned_requests=len(batches))
+    if actual:
+        print(f"Prompt tokens: estimated {estimated}, actual {actual}")
+
+    if len(batches) == 1:
+        return outcomes[0][0]
+    merged, missing = merge_stories([(batch[0], len(batch), content)
+                                     for batch, (content, _) in zip(plan.batches, outcomes)])
+    if missing:
+        print(f"No story for image(s) {', '.join(map(str, missing))}")
+    return merged
+
+
+def process_images_and_create_readme(df, dataset_file, api_key, headers_json, ctx=None, output_dir=None, cache=None,
+                                     client=None, figures=None, image_options=ImageOptimization(), trace=None,
+                                     profile=None, token_budget=LLM_TOKEN_BUDGET, stream=False, missing=None):
+    """
+    Processes images from a given dataset directory, generates image-based narratives using an external API,
+    and creates a README.md file containing the image stories along with key data insights.
+
+    The function performs the following steps:
+    1. Takes the figures rendered in this run, or retrieves all PNG images from the output directory associated
+       with the dataset file when no figures are passed.
+    2. Uses the external API to generate narratives for each image.
+    3. Splits the generated batched stories into individual stories for each image.
+    4. Creates a README.md file that includes each image's narrative and additional data insights.
+
+    Parameters:
+    - df: DataFrame containing the dataset for analysis.
+    - dataset_file: The path to the dataset file.
+    - api_key: The API key for authenticating the external service used to generate image narratives.
+    - headers_json: Contextual information or headers to be used for generating the narratives.
+    - ctx: Optional AnalysisContext, the describe() summary and correlation matrix are reused from it.
+    - output_dir: Optional output directory, derived from dataset_file when not given.
+    - cache: Optional LLMResponseCache used for the narrative request.
+    - client: Optional LLMClient, defaults to the shared client for api_key.
+    - figures: Optional list of RenderedFigure objects. They are sent to the LLM straight from memory and
+      referenced in the README by their name, so they must be written into the output directory as well.
+    - image_options: ImageOptimization applied before upload, None sends the images unchanged.
+    - trace: Optional RunTrace annotated with the LLM request sizes and token usage.
+    - profile: Optional dataset profile sent as context when it fits the token budget.
+    - token_budget: Estimated prompt tokens allowed per LLM request, larger requests are split.
+    - stream: Stream the response and append every story to README.md as soon as it is complete (see ReadmeStream)
+      instead of writing the README once the whole response is in.
+    - missing: Optional list the numbers of the images left without a story (1 for the first image) are appended to,
+      their sections in the README get a placeholder.
+
+    Returns:
+    - Path of the README.md file created in the output directory, or None if it could not be created.
+    """
+    ctx = ctx or AnalysisContext(df)
+    # removes the last file called as file extension, convert it from like dataset.csv to dataset only
+    output_dir = output_dir or os.path.splitext(dataset_file)[0]
+
+    if not os.path.exists(output_dir):
+        print(f"Directory does not exist: {output_dir}")
+        return
+
+    if figures is not None:
+        # exactly the images produced by this run, no stale PNGs from an earlier run in the same directory
+        images = [figure for figure in figures if figure is not None]
+    else:
+        images = [os.path.join(output_dir, f) for f in os.listdir(output_dir) if f.endswith('.png')]
+
+    if not images:
+        print("No PNG images found in the directory.")
+        return
+
+    if stream:
+        readme = ReadmeStream(df, output_dir, images, ctx)
+        batched_stories = get_batched_image_analysis(api_key, images, headers_json, cache=cache, client=client,
+                                                     image_options=image_options, trace=trace, profile=profile,
+                                                     token_budget=token_budget, on_section=readme.add)
+        readme_path = readme.close()
+        if missing is not None:
+            missing.extend(readme.missing)
+        if trace is not None and readme.first_section_seconds is not None:
+            trace.annotate(first_section_seconds=round(readme.first_section_seconds, 4))
+        if not batched_stories:
+            # the sections that did arrive stay in the README, but the run doesn't count it as complete
+            print("Failed to generate stories for the images.")
+            return None
+        return readme_path
+
+    # Get batched stories for all images
+    batched_stories = get_batched_image_analysis(api_key, images, headers_json, cache=cache, client=client,
+                                                 image_options=image_options, trace=trace, profile=profile,
+                                                 token_budget=token_budget)
+    if not batched_stories:
+        print("Failed to generate stories for the images.")
+        return
+
+    # Split the batched stories based on the headers "### Image 1", "### Image 2", etc.
+    stories = split_stories(batched_stories)
+    if missing is not None:
+        missing.extend(idx for idx in range(1, len(images) + 1) if not stories.get(str(idx)))
+    return write_readme(df, output_dir, images, stories, ctx)
+
+
+def split_stories(batched_stories):
+    """
+    Split an LLM response into the stories of the individual images, using the "### Image N" labels the prompt asks
+    for.
+
+    :param batched_stories: Response text
+    :return: Dictionary of image number (as string, "1", "2", ...) to story
+    """
+    parser = StorySectionParser()
+    stories = dict(parser.feed(batched_stories))
+    stories.update(parser.finish())
+
+    # Debugging: print the stories dictionary
+    #print("Stories Dictionary:", stories)
+    return stories
+
+
+class StorySectionParser:
+    """
+    Incremental splitter of an LLM response into "### Image N" sections, for text that arrives in pieces (a
+    streamed response). A section is complete as soon as the header of the next one has arrived.
+    """
+
+    def __init__(self):
+        self.current_label = None
+        self.current_story = []
+        self.partial_line = ""
+
+    def feed(self, text):
+        """
+        :param text: Next piece of the response
+        :return: List of (label, story) tuples of the sections completed by this piece
+        """
+        lines = (self.partial_line + text).split("\n")
+        # the last line may continue in the next piece
+        self.partial_line = lines.pop()
+        completed = []
+        for line in lines:
+            completed.extend(self._line(line))
+        return completed
+
+    def finish(self):
+        """
+        :return: List of (label, story) tuples of the sections left at the end of the response
+        """
+        completed = self._line(self.partial_line) if self.partial_line else []
+        self.partial_line = ""
+        # Save the last story
+        if self.current_label and self.current_story:
+            completed.append((self.current_label, "\n".join(self.current_story).strip()))
+        self.current_label, self.current_story = None, []
+        return completed
+
+    def _line(self, line):
+        # Split batched stories based on the "### Image X" header because we have specified to always start with 3#
+        line = line.rstrip("\r")
+        parts = line.split()
+        if not line.startswith("### Image") or len(parts) < 3:
+            self.current_story.append(line)
+            return []
+        completed = []
+        if self.current_label and self.current_story:
+            # Save the current story for the previous image
+            completed.append((self.current_label, "\n".join(self.current_story).strip()))
+        # Extract image number (e.g., 1, 2, 3)
+        self.current_label = parts[2]  # Get the number part of "### Image X"
+        self.current_story = []  # Reset current story
+        return completed
+
+
+MISSING_STORY = "No story available for this image."
+
+
+def _readme_section(image, story):
+    # one "## <plot>" section of the README: heading, image and story
+    image_name = _image_name(image)
+    return (f"## {os.path.splitext(image_name)[0]}\n\n"
+            f"![{image_name}](./{image_name})\n\n"
+            f"{story}\n\n")
+
+
+def write_readme(df, output_dir, images, stories, ctx=None):
+    """
+    Write README.md with one section per image, in the order of `images`, followed by key insights from the data.
+
+    :param df: DataFrame of the dataset
+    :param output_dir: Directory the README.md and the images are in
+    :param images: List of RenderedFigure objects or image paths
+    :param stories: Dictionary of image number ("1" for the first image, ...) to its story
+    :param ctx: Optional AnalysisContext, the describe() summary and top correlations are reused from it
+    :return: Path of the README.md file
+    """
+    ctx = ctx or AnalysisContext(df)
+    # Initialize the README.md content
+    readme_path = os.path.join(output_dir, "README.md")
+    readme_content = "# Image Narratives\n\n"
+
+    # Process each image and its corresponding story
+    for idx, image in enumerate(images, start=1):
+        readme_content += _readme_section(image, stories.get(str(idx), MISSING_STORY))
+
+    # Write the README.md file
+    with open(readme_path, "w", encoding="utf-8") as readme_file:
+        readme_file.write(readme_content)
+        _write_insights(readme_file, df, ctx)
+
+    print(f"README.md created at {readme_path}")
+    return readme_path
+
+
+def _write_insights(readme_file, df, ctx):
+    # the closing "key insights" section of the README, computed from the data rather than by the LLM
+    readme_file.write('\n\n## Some more key insights from the data:\n\n')
+    # Top column analysis
+    top_column = ctx.describe.loc['mean'].idxmax()
+    narrative = f"- The column '{top_column}' has the highest average value among numerical features.\n\n"
+    readme_file.write(narrative)
+    
+    # Correlation analysis, the strongest absolute correlations come from the shared correlation engine
+    # Skip perfect correlations (features compared to themselves or to an exact copy)
+    highest_corr = [(a, b, abs(r)) for a, b, r in ctx.top_correlations["absolute"] if abs(r) < 1]
+
+    if highest_corr:
+        # Get the highest correlation pair and the correlation value
+        feature_pair, correlation = highest_corr[0][:2], highest_corr[0][2]
+
+        # Now you can use the feature pair and the correlation
+        narrative1 = f"- The highest correlation is between '{feature_pair[0]}' and '{feature_pair[1]}' with a value of {correlation:.2f}.\n\n"
+
+        if correlation > 0.7:
+            narrative2 = f"- This indicates a strong positive correlation between the features '{feature_pair[0]}' and '{feature_pair[1]}'. Growth of one feature is often associated with the growth of the other feature.\n\n"
+        elif correlation < -0.7:
+            narrative2 = f"- This indicates a strong negative correlation between the features '{feature_pair[0]}' and '{feature_pair[1]}'. Growth of one feature is often associated with the decline of the other feature.\n\n"
+        else:
+            narrative2 = f"- This indicates a weak correlation between the features '{feature_pair[0]}' and '{feature_pair[1]}'. They are correlated but not strongly.\n\n"
+        readme_file.write(narrative1)
+        readme_file.write(narrative2)
+    number_of_Rows=df.shape[0]
+    number_of_Columns=df.shape[1]
+    if number_of_Rows > 1000:
+        narrative3 = "- The dataset has more than 1000 rows. It is good for analysis but it may not be suitable for training models, so choose wisely.\n\n"
+    else:
+        narrative3 = "- The dataset have less than 1000 rows. So making any huge analysis may not be a good idea.\n\n"
+    readme_file.write(narrative3)
+    if number_of_Columns > 20:
+        narrative4 = "- The dataset has more than 20 columns. It is good for analysis but make sure to use feature selection or dimensionality reduction techniques if necessary.\n\n\n"
+    else:
+        narrative4 = "- The dataset have less than 20 columns. So it may be ideal to use all the columns if number of rows is also less.\n\n"
+    readme_file.write(narrative4)
+
+
+class ReadmeStream:
+    """
+    Writes README.md section by section while the stories arrive from a streamed LLM response.
+
+    Sections are written in the order of `images`: a story that arrives early waits until the ones before it are
+    written, so the file always reads top to bottom. close() writes the remaining sections (a placeholder for stories
+    that never arrived, their image numbers are kept in `missing`) and the key insights. The file is only created with the first section, so a request that
+    fails right away leaves an existing README.md untouched.
+    """
+
+    def __init__(self, df, output_dir, images, ctx=None):
+        """
+        :param df: DataFrame of the dataset
+        :param output_dir: Directory the README.md and the images are in
+        :param images: List of RenderedFigure objects or image paths, in README order
+        :param ctx: Optional AnalysisContext, the describe() summary and top correlations are reused from it
+        """
+        self.df = df
+        self.ctx = ctx or AnalysisContext(df)
+        self.path = os.path.join(output_dir, "README.md")
+        self.images = images
+        self.stories = {}
+        self.missing = []
+        self.written = 0
+        self.file = None
+        self.started = time.perf_counter()
+        self.first_section_seconds = None
+        self._lock = threading.Lock()
+
+    def add(self, number, story):
+        """
+        :param number: Image number, 1 for the first image
+        :param story: Its story
+        """
+        with self._lock:
+            if 1 <= number <= len(self.images) and number > self.written:
+                self.stories.setdefault(number, story)
+            while self.written + 1 in self.stories:
+                self._write_section(self.stories.pop(self.written + 1))
+
+    def _write_section(self, story):
+        # called with the lock held
+        if self.file is None:
+            self.file = open(self.path, "w", encoding="utf-8")
+            self.file.write("# Image Narratives\n\n")
+        self.file.write(_readme_section(self.images[self.written], story))
+        # flushed section by section, so the README can be read while the rest is generated
+        self.file.flush()
+        self.written += 1
+        if self.first_section_seconds is None:
+            self.first_section_seconds = time.perf_counter() - self.started
+            print(f"First README section written after {self.first_section_seconds:.2f}s")
+
+    def close(self):
+        """
+        :return: Path of the README.md file, None if no story arrived at all
+        """
+        with self._lock:
+            if self.file is None and not self.stories:
+                return None
+            while self.written < len(self.images):
+                story = self.stories.pop(self.written + 1, None)
+                if not story:
+                    self.missing.append(self.written + 1)
+                self._write_section(story or MISSING_STORY)
+            _write_insights(self.file, self.df, self.ctx)
+            self.file.close()
+        print(f"README.md created at {self.path}")
+        return self.path
+
+
+def narrate_figure(api_key, figure, headers_json, cache=None, client=None, image_options=ImageOptimization(),
+                   trace=None, profile=None, token_budget=LLM_TOKEN_BUDGET):
+    """
+    Ask the LLM for the story of a single figure, so each narration can be sent as soon as its plot is ready.
+
+    :param figure: RenderedFigure or image path
+    :return: The story, or None if the request failed
+    """
+    response = get_batched_image_analysis(api_key, [figure], headers_json, cache=cache, client=client,
+                                          image_options=image_options, trace=trace, profile=profile,
+                                          token_budget=token_budget)
+    if not response:
+        return None
+    # the prompt still asks for a "### Image 1" label, a reply without it is taken as the story itself
+    return split_stories(response).get("1") or response.strip()
+
+
+
+
+
+
+# Tracing: wall time, CPU time, peak memory and input/output sizes of every stage, written as JSON (see --trace)
+TRACE_VERSION = 1
+
+@contextmanager
+def _atomic_output(path):
+    """
+    Open a temporary file next to path for writing text and move it over path once the block succeeds, so a reader
+    never sees half a file.
+
+    The file is created with mode 0o666 like open() does, so it gets the permissions the umask gives the plots and the
+    README (mkstemp would make it readable by the owner only).
+
+    :param path: File to write
+    """
+    while True:
+        tmp_path = f"{path}.{os.urandom(4).hex()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _peak_rss_bytes():
+    # high-water mark of the resident set size of this process, None where the resource module is unavailable
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RunTrace:
+    """
+    Machine-readable record of where a run spends its time and memory.
+
+    Every stage entry holds its wall and CPU seconds, how much it raised the peak RSS of the process (0 when the
+    stage stayed below an earlier peak) and whatever sizes the caller attaches, e.g. input bytes, rows or the bytes
+    and tokens of an LLM request. CPU time and RSS cover this process only, not the workers of a process pool.
+    Stages may run concurrently in threads (see StageScheduler); their wall times then overlap, and CPU time and RSS
+    are process-wide, so they include whatever the other stages did in the meantime.
+
+    With profile=True every stage also runs under cProfile and its stats are dumped next to the trace file as
+    <trace name>.<stage>.prof (readable with pstats or snakeviz).
+    """
+
+    def __init__(self, path, profile=False):
+        """
+        :param path: JSON file the trace is written to by save()
+        :param profile: Dump cProfile stats per stage
+        """
+        self.path = path
+        self.profile = profile
+        self.stages = []
+        self.info = {}
+        # the stack of running stages is per thread, so annotate() in a concurrent stage finds its own entry
+        self._local = threading.local()
+        self._started = time.time()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    @contextmanager
+    def stage(self, name, **sizes):
+        """
+        Measure the enclosed block as one stage. Yields the stage entry, so sizes known only at the end can be
+        added to it (entry["output_bytes"] = ...).
+
+        :param name: Stage name
+        :param sizes: Sizes known up front (input_bytes, rows, ...)
+        """
+        entry = {"stage": name, **sizes}
+        profiler = None
+        if self.profile:
+            import cProfile
+            profiler = cProfile.Profile()
+        peak_before = _peak_rss_bytes()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        self._active.append(entry)
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows a single active profiler per process; a stage running concurrently with a
+                # profiled one goes unprofiled
+                profiler = None
+        try:
+            yield entry
+        except BaseException as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            self._active.pop()
+            entry["wall_seconds"] = round(time.perf_counter() - start_wall, 4)
+            entry["cpu_seconds"] = round(time.process_time() - start_cpu, 4)
+            peak_after = _peak_rss_bytes()
+            if peak_after is not None:
+                entry["peak_rss_bytes"] = peak_after
+                entry["peak_rss_delta_bytes"] = peak_after - peak_before
+            if profiler is not None:
+                entry["profile"] = self._dump_profile(profiler, name)
+            self.stages.append(entry)
+
+    @property
+    def _active(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def skipped(self, name, reason="inputs unchanged"):
+        # record a stage that did not run, so every trace of a pipeline lists the same stages
+        self.stages.append({"stage": name, "skipped": reason})
+
+    def annotate(self, **values):
+        """
+        Add values to the innermost running stage; numbers are summed, so repeated calls (e.g. one per LLM
+        request) accumulate. Does nothing outside of a stage.
+        """
+        if not self._active:
+            return
+        entry = self._active[-1]
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key in entry:
+                entry[key] += value
+            else:
+                entry[key] = value
+
+    def _dump_profile(self, profiler, name):
+        path = f"{os.path.splitext(self.path)[0]}.{name}.prof"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError as e:
+            print(f"Failed to write the profile of {name}: {e}")
+            return None
+        return path
+
+    def to_dict(self):
+        return {
+            "version": TRACE_VERSION,
+            "started": time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self._started)),
+            "wall_seconds": round(time.perf_counter() - self._start_wall, 4),
+            "cpu_seconds": round(time.process_time() - self._start_cpu, 4),
+            "peak_rss_bytes": _peak_rss_bytes(),
+            **self.info,
+            "stages": self.stages,
+        }
 
-    This function performs the following steps:
-    1. Identifies the numeric columns in the given DataFrame.
-    2. Computes the correlation matrix for the numeric columns.
-    3. Finds the pair of columns with the highest correlation.
-    4. Cleans the data by removing NaN values from the selected columns.
-    5. Creates a scatter plot using seaborn with the two most correlated columns.
-    6. Saves the plot as a PNG file in the specified output directory.
+    def save(self):
+        """
+        Write the trace as JSON, atomically so a reader polling the file never sees half a trace.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with _atomic_output(self.path) as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        print(f"Trace written to {self.path}")
 
-    Parameters:
-    -----------
-    df : pandas.DataFrame
-        The input DataFrame containing the data to be plotted. The DataFrame must contain at least two numeric columns.
 
-    output_dir : str
-        The directory where the scatter plot image will be saved. The image will be saved with the name of the two columns being plotted.
+# the manifest records what every stage was built from, so reruns on unchanged inputs can skip it
+MANIFEST_NAME = "autolysis_manifest.json"
+MANIFEST_VERSION = 1
 
-    Returns:
-    --------
-    None
-        This function does not return any value. The scatter plot is saved as a PNG file in the specified directory.
-    
-    Notes:
-    ------
-    - If the dataset does not have enough numeric columns or valid data points, the function will print an appropriate message and terminate early.
-    - If a hue_column is provided, the scatter plot will include a hue for color differentiation in the plot.
-    - The saved plot will have a resolution of 60 DPI and tight bounding boxes to avoid excessive whitespace.
-    """
-    hue_column = None
-    # Ensure there are numeric columns in the dataset
-    numeric_columns = df.select_dtypes(include='number').columns.tolist()
-   # print(f"Numeric columns: {numeric_columns}") # sanity check
-    
-    if len(numeric_columns) < 2:
-        print("Not enough numeric columns for a scatterplot.")
-        return  # Not enough numeric columns for a scatterplot
 
-    # Calculate the correlation matrix
-    correlation_matrix = df[numeric_columns].corr()
-    #rint(f"Correlation matrix: \n{correlation_matrix}")
+def _sha256_file(path):
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
 
-    # Create a boolean mask for the upper triangle (excluding diagonal)
-    upper_triangle_mask = np.triu(np.ones(correlation_matrix.shape), k=1).astype(bool)
 
-    # Apply the mask to the correlation matrix
-    upper_triangle = correlation_matrix.where(upper_triangle_mask)
-    #print(f"Upper triangle of correlation matrix: \n{upper_triangle}")
-    
-    # Find the index of the maximum correlation
-    try:
-        max_corr_pair = upper_triangle.stack().idxmax()
-        max_corr_value = upper_triangle.stack().max()
-    except ValueError:
-        print("No correlation pairs found.")
-        return
-    
-    #print(f"Max correlation pair: {max_corr_pair} with value {max_corr_value}")
+class ArtifactManifest:
+    """
+    Record of the input file, the parameters and the produced artifacts of each stage, stored as JSON in the
+    output directory.
 
-    # Extract the two columns for the scatterplot
-    x_column, y_column = max_corr_pair
+    A stage is fresh when it was last built from the same input content with the same parameters and all of its
+    artifacts are still on disk with the recorded hashes. The input is hashed only when its size or mtime differ
+    from the recorded ones, so checking an unchanged multi-GB file costs a stat() call.
+    """
 
-    # Ensure there are enough data points to plot
-    if df.empty or pd.isna(max_corr_value):
-        print("No valid data points for plotting.")
-        return  # Return if no valid data points or correlations
+    def __init__(self, output_dir, data=None):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.output_dir = output_dir
+        self.data = data or {"version": MANIFEST_VERSION, "input": {}, "stages": {}}
 
-    # Convert to numeric values, coercing errors to NaN (which can be dropped later)
-    df[x_column] = pd.to_numeric(df[x_column], errors='coerce')
-    df[y_column] = pd.to_numeric(df[y_column], errors='coerce')
+    @classmethod
+    def load(cls, output_dir):
+        """
+        :return: ArtifactManifest of the output directory, empty if there is none or it is unreadable or outdated
+        """
+        try:
+            with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                data = None
+        except (OSError, ValueError):
+            data = None
+        return cls(output_dir, data)
 
-    # Drop rows with NaN values in either of the selected columns
-    df_cleaned = df.dropna(subset=[x_column, y_column])
+    def fingerprint_input(self, file_path):
+        """
+        Record size, mtime and content hash of the input file.
 
-    # Ensure there are enough data points to plot
-    if df_cleaned.empty:
-        print("No data points left after cleaning.")
-        return
+        :return: The content hash
+        """
+        stat = os.stat(file_path)
+        previous = self.data.get("input", {})
+        if previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime and previous.get("sha256"):
+            digest = previous["sha256"]
+        else:
+            digest = _sha256_file(file_path)
+        self.data["input"] = {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime": stat.st_mtime,
+                              "sha256": digest}
+        return digest
 
-    # Plot the scatter plot using seaborn
-    plt.figure(figsize=(8, 6))
-    sns.scatterplot(data=df_cleaned, x=x_column, y=y_column, hue=hue_column)
+    def is_fresh(self, stage, input_key, params):
+        """
+        :param stage: Stage name
+        :param input_key: JSON-serializable description of the stage input (e.g. the input hash and projection)
+        :param params: JSON-serializable parameters of the stage
+        :return: True if the stage can be skipped and its artifacts reused
+        """
+        record = self.data["stages"].get(stage)
+        # round trip through JSON so tuples and lists compare equal to what was stored
+        if record is None or record["input"] != json.loads(json.dumps(input_key)) \
+                or record["params"] != json.loads(json.dumps(params)):
+            return False
+        for name, digest in record["artifacts"].items():
+            path = os.path.join(self.output_dir, name)
+            if not os.path.exists(path) or _sha256_file(path) != digest:
+                return False
+        return True
 
-    # Set plot title and labels
-    plt.title(f'Scatterplot between {x_column} and {y_column}')
-    plt.xlabel(x_column)
-    plt.ylabel(y_column)
+    def stage(self, stage):
+        # the stored record of a stage: input, params, artifacts (name -> sha256) and metadata
+        return self.data["stages"][stage]
 
-    # Add legend if hue_column is provided
-    if hue_column:
-        plt.legend(title=hue_column)
- 
-    # replace empty spaces in column names by _ as if it is saved without removing spaces, the name of image will be of two parts and can cause problem while inserting
-    x_column_safe = x_column.replace(" ", "_")
-    y_column_safe = y_column.replace(" ", "_")
-    # Save the plot as PNG (uncomment this if you want to save the plot)
-    output_path = os.path.join(output_dir, f'{x_column_safe}_{y_column_safe}_scatterplot.png')
-    print(f"Saving plot to {output_path}")
-    plt.savefig(output_path, dpi=60, bbox_inches='tight')
-    plt.close()
+    def record(self, stage, input_key, params, artifacts, metadata=None):
+        """
+        Store the outcome of a stage.
 
-    
+        :param artifacts: Dictionary of artifact file name (relative to the output directory) to its bytes
+        """
+        self.data["stages"][stage] = {
+            "input": json.loads(json.dumps(input_key)),
+            "params": json.loads(json.dumps(params)),
+            "artifacts": {name: hashlib.sha256(data).hexdigest() for name, data in artifacts.items()},
+            "metadata": json.loads(json.dumps(metadata or {}, default=str)),
+        }
+
+    def forget(self, stage):
+        self.data["stages"].pop(stage, None)
+
+    def save(self):
+        # atomic replace, a crash mid-write must not leave a manifest that claims artifacts are fresh
+        with _atomic_output(self.path) as f:
+            json.dump(self.data, f, indent=2)
 
 
+# threads for the independent stages of one dataset; the plots hold the GIL for part of their rendering, the
+# narrations mostly wait on the network
+STAGE_WORKERS = 4
 
 
-def generate_correlation_heatmap(df, output_dir):
+class StageScheduler:
     """
-    Generates a correlation heatmap for the numeric columns in the given DataFrame and saves it as a PNG file.
+    Runs the stages of a pipeline as a DAG on a thread pool, driven by asyncio.
 
-    Parameters:
-    - df (pd.DataFrame): The input DataFrame containing the data to visualize.
-    - output_dir (str): The directory where the heatmap image will be saved.
+    Every stage is started as soon as the stages it depends on have finished, and gets their results as positional
+    arguments (in the order the dependencies were listed). Stages without a path between them overlap, e.g. the plots
+    render side by side and the narration of one plot is in flight while the next one is drawn.
 
-    The function:
-    1. Selects only the numeric columns.
-    2. Checks if there are at least two numeric columns (required for correlation).
-    3. Computes the correlation matrix.
-    4. Creates a heatmap with annotations for correlation values.
-    5. Saves the heatmap as a PNG file to the specified output directory.
+    Threads rather than processes: the stages share the DataFrame and the AnalysisContext, which would otherwise be
+    pickled for every stage. Matplotlib is safe here because every figure is an independent Figure/FigureCanvasAgg
+    pair, pyplot's global state is never touched.
     """
-    # Select only numeric columns from the DataFrame
-    numeric_columns = df.select_dtypes(include=['number'])
-    
-    # Check if there are at least 2 numeric columns for computing correlations
-    if len(numeric_columns.columns) < 2:
-        print("Not enough numeric columns to compute correlations.")
-        return
 
-    # Compute the correlation matrix for the numeric columns
-    correlation_matrix = numeric_columns.corr()
+    def __init__(self, max_workers=None):
+        """
+        :param max_workers: Size of the thread pool, defaults to ThreadPoolExecutor's default
+        """
+        self.max_workers = max_workers
+        self.stages = {}
 
-    # Plot the heatmap
-    plt.figure(figsize=(10, 8))  # Set the figure size
-    sns.heatmap(
-        correlation_matrix,        # The correlation matrix as input
-        annot=True,                # Display the correlation values on the heatmap
-        cmap='coolwarm',           # Use the 'coolwarm' color palette
-        fmt=".2f",                 # Format for displaying correlation values (2 decimal places)
-        linewidths=0.5             # Add lines between cells for better readability
-    )
-    
-    # Set the title of the heatmap
-    plt.title('Correlation Heatmap')
+    def add(self, name, func, depends_on=()):
+        """
+        Add a stage. Dependencies must have been added before, which also rules out cycles.
 
-    # Save the heatmap to the specified output directory with a dynamic filename
-    output_path = os.path.join(output_dir, 'correlation_heatmap.png')
-    print(f"Saving heatmap to {output_path}")
-    plt.savefig(output_path, dpi=60, bbox_inches='tight')
-    
-    # Close the plot to free up memory
-    plt.close()
+        :param name: Unique stage name
+        :param func: Callable receiving the results of depends_on
+        :param depends_on: Names of the stages whose results func needs
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        unknown = [dep for dep in depends_on if dep not in self.stages]
+        if unknown:
+            raise ValueError(f"Stage {name} depends on unknown stages: {', '.join(unknown)}")
+        self.stages[name] = (func, list(depends_on))
+
+    def run(self):
+        """
+        Run every stage and wait for all of them, a failing stage doesn't cancel the stages independent of it.
+        Must not be called from a running event loop.
+
+        :return: Dictionary of stage name to result
+        :raises: The exception of the first failed stage, in the order the stages were added (stages depending on
+                 a failed stage fail with the same exception)
+        """
+        import asyncio
+        return asyncio.run(self._run())
+
+    async def _run(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        tasks = {}
 
+        async def run_stage(func, depends_on):
+            results = [await tasks[dep] for dep in depends_on]
+            return await loop.run_in_executor(pool, func, *results)
 
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as pool:
+            for name, (func, depends_on) in self.stages.items():
+                tasks[name] = asyncio.ensure_future(run_stage(func, depends_on))
+            outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        return dict(zip(tasks, outcomes))
 
 
-def find_optimal_k(data, max_k=5):
+def analyze_dataset(dataset_file, api_key, output_dir=None, usecols=None, engine=None, chunksize=None,
+                    streaming_profile=False, max_k=5, sample_size=500, cluster_algorithm='kmeans', cluster_jobs=1,
+                    cache_dir=LLM_CACHE_DIR, llm_settings=None, image_options=ImageOptimization(), force=False,
+                    density_threshold=SCATTER_DENSITY_THRESHOLD, correlation_method='pearson', trace_file=None,
+                    trace_profile=False, compact=False, approximate=False, columnar_cache=None,
+                    narration='batched', stage_workers=STAGE_WORKERS, token_budget=LLM_TOKEN_BUDGET,
+                    sample_seed=SAMPLE_SEED, stratify=None, cluster_projection='columns', numeric_only=False):
     """
-    Determine the optimal number of clusters for K-Means clustering using the Elbow Method and Silhouette Score.
+    Run the whole analysis for one dataset: load, profile, plot and narrate the README.md.
+
+    An ArtifactManifest in the output directory records the input file, the parameters and the artifacts of each
+    stage. Stages whose input and parameters did not change since the last run are skipped and their artifacts
+    reused; when nothing changed the dataset is not even loaded.
 
     Parameters:
-    - data (array-like): The dataset to cluster, typically a NumPy array or pandas DataFrame.
-    - max_k (int): The maximum number of clusters to consider. Default is 5.
+    - dataset_file: Path to the dataset file.
+    - api_key: The API key for the LLM proxy.
+    - output_dir: Directory for the plots and README.md, defaults to the dataset path without its extension
+      (e.g. goodreads.csv -> goodreads/).
+    - usecols, engine, chunksize, compact, columnar_cache: Passed on to load_dataset.
+    - numeric_only: Project per stage: only the numeric columns (and the stratify column) are loaded for the
+      correlation, scatterplot and clustering stages, while the profile streams every column from the file and the
+      headers sent to the LLM are read from the file itself.
+    - streaming_profile: Profile the file chunk by chunk instead of from the loaded DataFrame.
+    - approximate: Add sketch-based distinct counts and quartiles to the in-memory profile.
+    - max_k, sample_size, cluster_algorithm, cluster_jobs: Passed on to generate_cluster_data as max_k, sample_size,
+      algorithm and n_jobs.
+    - cache_dir: Directory of the LLM response cache, None disables caching.
+    - llm_settings: Optional dictionary of LLMClient settings (connect_timeout, read_timeout, max_retries).
+    - image_options: ImageOptimization applied to the plots before upload, None sends them unchanged.
+    - force: Rebuild every stage even if the manifest says it is up to date.
+    - density_threshold: Point count above which the scatter plots switch to binned density rendering.
+    - correlation_method: 'pearson' or 'spearman', used for the scatterplot pair, the heatmap and the README.
+    - trace_file: Write a RunTrace of the stages to this JSON file, a relative path is taken relative to the output
+      directory (so every dataset of a batch gets its own trace).
+    - trace_profile: Also dump cProfile stats per stage next to the trace file.
+    - narration: 'batched' sends a single request with all plots once every plot is done, 'streamed' the same
+      request with the response streamed and appended to README.md story by story, 'per-figure' one LLM request per
+      plot as soon as it is rendered.
+    - stage_workers: Number of threads the independent stages (profile, plots, narrations) run on.
+    - token_budget: Estimated prompt tokens allowed per LLM request; the dataset context is trimmed and the plots are
+      split across requests to stay within it.
+    - sample_seed: Seed of every sample of the run (preview, profile rows, clustering sample).
+    - stratify: Optional column the samples are stratified by.
+    - cluster_projection: Axes of the cluster plot, 'columns', 'pca' or 'svd' (see generate_cluster_data).
 
     Returns:
-    - int: The optimal number of clusters based on the highest silhouette score.
-
-    The function:
-    1. Iterates over k values from 2 to `max_k`.
-    2. Computes the inertia (sum of squared distances to the nearest cluster center) for each k.
-    3. Computes the silhouette score for each k.
-    4. Returns the k value with the highest silhouette score.
+    - The output directory the artifacts were written to, or None if the dataset has no numeric columns to analyze.
     """
-    # Initialize lists to store inertia and silhouette scores for each k
-    inertias = []
-    silhouette_scores = []
+    # it was done to make the essential folder structure and manage it in seperate directories
+    if output_dir is None:
+        output_dir = os.path.splitext(dataset_file)[0]  # Remove file extension
 
-    # Test k values from 2 to max_k (since k=1 is not meaningful for silhouette score)
-    for k in range(2, max_k + 1):
-        # Perform K-Means clustering with k clusters
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init='auto')
-        labels = kmeans.fit_predict(data)
+    trace = None
+    if trace_file:
+        trace = RunTrace(os.path.join(output_dir, trace_file), profile=trace_profile)
+        trace.info.update(dataset=os.path.abspath(dataset_file), output_dir=os.path.abspath(output_dir))
+    try:
+        return _run_stages(dataset_file, api_key, output_dir, trace or _NullTrace(), usecols=usecols, engine=engine,
+                           chunksize=chunksize, streaming_profile=streaming_profile, max_k=max_k,
+                           sample_size=sample_size, cluster_algorithm=cluster_algorithm, cluster_jobs=cluster_jobs,
+                           cache_dir=cache_dir, llm_settings=llm_settings, image_options=image_options, force=force,
+                           density_threshold=density_threshold, correlation_method=correlation_method,
+                           compact=compact, approximate=approximate, columnar_cache=columnar_cache,
+                           narration=narration, stage_workers=stage_workers, token_budget=token_budget,
+                           sample_seed=sample_seed, stratify=stratify, cluster_projection=cluster_projection,
+                           numeric_only=numeric_only)
+    finally:
+        # written even when a stage fails, the failing stage carries the error
+        if trace is not None and os.path.isdir(output_dir):
+            trace.save()
 
-        # Store the inertia (sum of squared distances to cluster centers)
-        inertias.append(kmeans.inertia_)
 
-        # Compute and store the silhouette score
-        silhouette_scores.append(silhouette_score(data, labels))
+class _NullTrace:
+    # stands in for RunTrace when tracing is off, so the stages don't need an `if trace` around every block
+    def __init__(self):
+        self.info = {}
 
-    # Find the k value corresponding to the highest silhouette score
-    optimal_k = range(2, max_k + 1)[np.argmax(silhouette_scores)]
+    @contextmanager
+    def stage(self, name, **sizes):
+        yield dict(sizes, stage=name)
 
-    return optimal_k
+    def skipped(self, name, reason="inputs unchanged"):
+        pass
 
+    def annotate(self, **values):
+        pass
 
-def generate_cluster_data(df, output_dir, max_columns=10, max_k=5, sample_size=500):
-    """
-    Perform clustering on a dataset and save a scatterplot of the clusters.
 
-    Parameters:
-    - df: DataFrame containing the data to be clustered.
-    - output_dir: Directory to save the clustering plot.
-    - max_columns: The maximum number of columns to consider for clustering based on variance (default is 10).
-    - max_k: The maximum number of clusters to test for optimal k (default is 5).
-    - sample_size: The number of rows to sample from the dataset if it exceeds this size (default is 500).
-    
-    Returns:
-    - Empty string if the clustering process cannot proceed due to insufficient data or columns.
-    """
-    # Step 1: Select numeric columns and exclude potential ID-like columns
-    numeric_columns = df.select_dtypes(include='number').columns.tolist()
-    excluded_keywords = ['id', 'ID']  # Keywords to identify potential ID-like columns
-    suitable_columns = [col for col in numeric_columns if not any(keyword in col.lower() for keyword in excluded_keywords)]
+def _run_stages(dataset_file, api_key, output_dir, trace, usecols, engine, chunksize, streaming_profile, max_k,
+                sample_size, cluster_algorithm, cluster_jobs, cache_dir, llm_settings, image_options, force,
+                density_threshold, correlation_method, compact, approximate, columnar_cache, narration,
+                stage_workers, token_budget, sample_seed, stratify, cluster_projection, numeric_only):
+    # the body of analyze_dataset, every stage runs inside a trace.stage() block
+    # check which stages are out of date before paying for loading the dataset
+    with trace.stage("manifest", input_bytes=os.path.getsize(dataset_file)):
+        manifest = ArtifactManifest(output_dir) if force else ArtifactManifest.load(output_dir)
+        input_key = {"sha256": manifest.fingerprint_input(dataset_file), "usecols": usecols}
+        if compact:
+            # float32 statistics and categorical dtypes can change the plots, so compact runs are built separately
+            input_key["compact"] = True
+        if numeric_only:
+            # the profile is streamed in this mode, which changes the README context
+            input_key["numeric_only"] = True
+    # with numeric_only the profile never sees the loaded table, it streams the file instead
+    streaming_profile = streaming_profile or numeric_only
+    plot_params = {
+        "scatterplot": {"dpi": PLOT_DPI, "density_threshold": density_threshold, "correlation": correlation_method},
+        "correlation_heatmap": {"dpi": PLOT_DPI, "correlation": correlation_method,
+                                "max_columns": HEATMAP_MAX_COLUMNS},
+        "clustering": {"dpi": PLOT_DPI, "max_k": max_k, "sample_size": sample_size, "max_columns": 10,
+                       "algorithm": cluster_algorithm, "silhouette_sample_size": SILHOUETTE_SAMPLE_SIZE,
+                       "density_threshold": density_threshold, "sample_seed": sample_seed, "stratify": stratify,
+                       "projection": cluster_projection},
+    }
+    with trace.stage("freshness"):
+        stale = {stage for stage, params in plot_params.items() if not manifest.is_fresh(stage, input_key, params)}
 
-    if len(suitable_columns) < 2:
-        print("Not enough suitable numeric columns for clustering.")
-        return ''  # Return early if there are fewer than two suitable numeric columns
+    def readme_params(figure_artifacts):
+        # the narrative depends on the exact images sent and on how they are sent
+        return {"model": LLM_MODEL, "figures": figure_artifacts, "correlation": correlation_method,
+                "image_options": asdict(image_options) if image_options else None, "narration": narration,
+                "token_budget": token_budget,
+                # the profile is sent as context as well
+                "profile": {"streaming": streaming_profile, "approximate": approximate, "sample_seed": sample_seed}}
 
-    # Step 2: Select up to max_columns with the highest variance
-    variances = df[suitable_columns].var()
-    high_variance_columns = variances.nlargest(max_columns).index.tolist()
+    if not stale:
+        figure_artifacts = [manifest.stage(stage)["artifacts"] for stage in plot_params]
+        if manifest.is_fresh("readme", input_key, readme_params(figure_artifacts)):
+            print(f"{dataset_file} is unchanged since the last run, reusing the artifacts in {output_dir}")
+            for stage in ["load", "profile", "correlations", *plot_params, "readme"]:
+                trace.skipped(stage)
+            return output_dir
 
-    if len(high_variance_columns) < 2:
-        print("Not enough high-variance columns for clustering.")
-        return ''  # Return early if there are fewer than two columns with sufficient variance
+    def nothing_to_analyze(stages):
+        # every plot, and so the README, is built from the numeric columns; without any the dataset is skipped
+        print(f"No numeric columns to analyze in {dataset_file}, skipping it")
+        for stage in stages:
+            trace.skipped(stage, reason="no numeric columns")
+        return None
 
-    # Step 3: Sample the data if it’s too large (to avoid long processing times)
-    if len(df) > sample_size:
-        df = df.sample(n=sample_size, random_state=42)
+    # load the dataset, all essential checks are done in this function itself; with numeric_only just the columns the
+    # plot stages work on
+    load_columns = usecols
+    if numeric_only:
+        load_columns = dataset_columns(dataset_file, numeric=True)
+        if not load_columns:
+            return nothing_to_analyze(["load", "profile", "correlations", *plot_params, "readme"])
+        if stratify and stratify not in load_columns and stratify in dataset_columns(dataset_file):
+            load_columns.append(stratify)
+    with trace.stage("load", input_bytes=os.path.getsize(dataset_file)) as entry:
+        df = load_dataset(dataset_file, usecols=load_columns, engine=engine, chunksize=chunksize, compact=compact,
+                          columnar_cache=columnar_cache)
+        entry.update(rows=df.shape[0], columns=df.shape[1], output_bytes=int(df.memory_usage(deep=True).sum()))
+    if stratify and stratify not in df.columns:
+        raise ValueError(f"Stratify column {stratify!r} not found in {dataset_file}")
+    if df.select_dtypes(include='number').columns.empty:
+        return nothing_to_analyze(["profile", "correlations", *plot_params, "readme"])
+    os.makedirs(output_dir, exist_ok=True)
 
-    # Step 4: Handle missing values by imputing with the mean of each column
-    numeric_imputer = SimpleImputer(strategy='mean')
-    df[high_variance_columns] = numeric_imputer.fit_transform(df[high_variance_columns])
+    # statistics shared by the stages below (numeric columns, correlations, describe, null counts) are computed once here
+    ctx = AnalysisContext(df, correlation_method=correlation_method, sample_seed=sample_seed, stratify=stratify)
 
-    # Step 5: Scale the numeric data to ensure equal contribution of each feature
-    scaler = StandardScaler()
-    data_scaled = scaler.fit_transform(df[high_variance_columns])
+    # Get headers as JSON, for passing it to the llm; every column of the file, also when only some were loaded
+    if numeric_only:
+        headers_json = json.dumps({"headers": dataset_columns(dataset_file)})
+    else:
+        headers_json = get_headers_as_json(df)
 
-    # Step 6: Determine the optimal number of clusters using a method like the elbow or silhouette score
-    optimal_k = find_optimal_k(data_scaled, max_k)
-    print(f"Optimal number of clusters: {optimal_k}")
+    cache = LLMResponseCache(cache_dir) if cache_dir else None
+    client = get_llm_client(api_key, **(llm_settings or {}))
+    writer = FigureWriter(output_dir)
 
-    # Step 7: Perform KMeans clustering with the optimal number of clusters (k)
-    kmeans = KMeans(n_clusters=optimal_k, random_state=42)
-    df['Cluster'] = kmeans.fit_predict(data_scaled)
-
-    # Step 8: Generate a scatterplot using the first two selected columns with high variance
-    plt.figure(figsize=(8, 6))
-    sns.scatterplot(
-        x=df[high_variance_columns[0]],  # X-axis: First column with high variance
-        y=df[high_variance_columns[1]],  # Y-axis: Second column with high variance
-        hue=df['Cluster'],               # Hue: Cluster labels
-        palette='viridis',               # Color palette for clusters
-        s=100,                           # Size of points in scatter plot
-        alpha=0.7                        # Transparency of points
-    )
+    # the remaining stages form a DAG: the plots only need the shared statistics, so they render side by side,
+    # and with per-figure narration each plot's LLM request goes out as soon as that plot is ready instead of
+    # after the slowest one
+    def profile_stage():
+        # Perform dataset profiling for sending to llm
+        with trace.stage("profile", streaming=streaming_profile) as entry:
+            if streaming_profile:
+                result = profile_dataset_streaming(dataset_file, chunksize=chunksize or 100_000, usecols=usecols,
+                                                   sample_seed=sample_seed, stratify=stratify).summary()
+            else:
+                result = profile_dataset(df, ctx, approximate=approximate)
+            entry["output_bytes"] = len(json.dumps(result, default=str))
+        #print(json.dumps(result, indent=4))  #sanity check
+        return result
 
-    plt.title(f'KMeans Clustering (k={optimal_k})')  # Plot title with the number of clusters
-    plt.xlabel(high_variance_columns[0])             # Label for the X-axis
-    plt.ylabel(high_variance_columns[1])             # Label for the Y-axis
-    plt.legend(title='Cluster')                       # Legend with the title "Cluster"
+    def correlations_stage():
+        # the correlation work is shared by the scatterplot, the heatmap and the README; done as its own stage so
+        # the trace attributes it here instead of to whichever plot happens to need it first
+        with trace.stage("correlations", columns=len(ctx.numeric_columns), method=correlation_method) as entry:
+            entry["pairs"] = len(ctx.top_correlations["absolute"])
 
-    # Save the plot in the specified output directory
-    output_path = os.path.join(output_dir, 'clustering_plot.png')
-    plt.savefig(output_path, dpi=60, bbox_inches='tight')  # Save the plot with tight bounding box
-    print(f"Clustering plot saved to {output_path}")
-    # plt.show()  # Uncomment to display the plot
-    plt.close()  # Close the plot to free memory
+    #run functions and generate visulizations, they are rendered in memory and written to disk in the background
+    generators = {
+        "scatterplot": lambda: generate_scatterplot(df, ctx=ctx, density_threshold=density_threshold),
+        "correlation_heatmap": lambda: generate_correlation_heatmap(df, ctx=ctx),
+        "clustering": lambda: generate_cluster_data(df, max_k=max_k, sample_size=sample_size, ctx=ctx,
+                                                    algorithm=cluster_algorithm, n_jobs=cluster_jobs,
+                                                    density_threshold=density_threshold,
+                                                    projection=cluster_projection),
+    }
+    # which shared stage a plot has to wait for, the clustering needs neither
+    plot_dependencies = {"scatterplot": ["correlations"], "correlation_heatmap": ["correlations"], "clustering": []}
 
-    return ''  # Return empty string to indicate successful completion
+    def plot_stage(stage):
+        def run(*_):
+            if stage not in stale:
+                # unchanged since the last run, reuse the image on disk
+                record = manifest.stage(stage)
+                print(f"Skipping {stage}, inputs unchanged")
+                trace.skipped(stage)
+                figures = []
+                for name in record["artifacts"]:
+                    with open(os.path.join(output_dir, name), 'rb') as f:
+                        figures.append(RenderedFigure(name=name, data=f.read(), metadata=record["metadata"]))
+                return figures
+            with trace.stage(stage) as entry:
+                figure = generators[stage]()
+                entry["output_bytes"] = len(figure.data) if figure is not None else 0
+                if figure is not None:
+                    entry["render_seconds"] = figure.metadata["render_seconds"]
+            artifacts = {figure.name: figure.data} if figure is not None else {}
+            manifest.record(stage, input_key, plot_params[stage], artifacts, figure.metadata if figure else None)
+            if figure is None:
+                return []
+            writer.write(figure)
+            return [figure]
+        return run
 
-    
+    def narrate_stage(stage):
+        def run(figures, profile):
+            with trace.stage(f"narrate_{stage}", input_bytes=sum(len(figure.data) for figure in figures)):
+                return [narrate_figure(api_key, figure, headers_json, cache=cache, client=client,
+                                       image_options=image_options, trace=trace, profile=profile,
+                                       token_budget=token_budget) for figure in figures]
+        return run
 
-# narrating the story and making README.md
-def encode_image(image_path):
-    # encode image to send image to llm because llm can't read images by relative file path in folder structure
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+    def readme_stage(profile, *results):
+        # results are the figure lists of the plots in plot_params order, then (per-figure) their stories
+        figure_lists = results[:len(plot_params)]
+        figures = [figure for figure_list in figure_lists for figure in figure_list]
+        figure_artifacts = [manifest.stage(stage)["artifacts"] for stage in plot_params]
+        if manifest.is_fresh("readme", input_key, readme_params(figure_artifacts)):
+            print("Skipping README.md, inputs unchanged")
+            trace.skipped("readme")
+            return
+        manifest.forget("readme")
+        complete = True
+        with trace.stage("readme", input_bytes=sum(len(figure.data) for figure in figures)) as entry:
+            if narration in ('batched', 'streamed'):
+                missing = []
+                readme_path = process_images_and_create_readme(df, dataset_file, api_key, headers_json, ctx=ctx,
+                                                               output_dir=output_dir, cache=cache, client=client,
+                                                               figures=figures, image_options=image_options,
+                                                               trace=trace, profile=profile,
+                                                               token_budget=token_budget,
+                                                               stream=narration == 'streamed', missing=missing)
+                complete = not missing
+            else:
+                story_list = [story for story_lists in results[len(plot_params):] for story in story_lists]
+                complete = all(story_list)
+                if any(story_list):
+                    # sections follow the plot order, however the narrations happened to finish
+                    stories = {str(idx): story for idx, story in enumerate(story_list, start=1) if story}
+                    readme_path = write_readme(df, output_dir, figures, stories, ctx)
+                else:
+                    print("Failed to generate stories for the images.")
+                    readme_path = None
+            entry["output_bytes"] = os.path.getsize(readme_path) if readme_path else 0
+        # a README with a missing story is kept but not recorded, so the next run asks again
+        if readme_path and complete:
+            with open(readme_path, 'rb') as f:
+                manifest.record("readme", input_key, readme_params(figure_artifacts),
+                                {os.path.basename(readme_path): f.read()})
 
-def get_batched_image_analysis(api_key, image_paths, headers_json):
+    scheduler = StageScheduler(max_workers=stage_workers)
+    scheduler.add("profile", profile_stage)
+    scheduler.add("correlations", correlations_stage)
+    for stage in plot_params:
+        scheduler.add(stage, plot_stage(stage), plot_dependencies[stage])
+    readme_dependencies = list(plot_params)
+    if narration == 'per-figure':
+        for stage in plot_params:
+            # the profile is sent along as context, it is usually done long before the plots
+            scheduler.add(f"narrate_{stage}", narrate_stage(stage), [stage, "profile"])
+        readme_dependencies += [f"narrate_{stage}" for stage in plot_params]
+    # the profile is only the LLM context (the README's insights come from ctx), with batched narration it is sent here
+    scheduler.add("readme", readme_stage, ["profile"] + readme_dependencies)
+    try:
+        scheduler.run()
+    finally:
+        with trace.stage("write"):
+            writer.close()
+            manifest.save()
+    latency = client.latency_summary()
+    if latency["attempts"]:
+        print(f"LLM latency so far: {latency}")
+        trace.info["llm_latency"] = latency
+    return output_dir
+
+
+def find_datasets(target):
     """
-    Sends a request to an API for generating insights and stories based on multiple images.
+    Resolve a batch target to the list of dataset files it refers to.
+
+    :param target: A directory (all files with one of the DATASET_EXTENSIONS directly inside it) or a glob pattern
+                   such as 'data/**/*.csv'
+    :return: Sorted list of file paths
+    """
+    if os.path.isdir(target):
+        return sorted(entry.path for entry in os.scandir(target)
+                      if entry.is_file() and entry.name.lower().endswith(DATASET_EXTENSIONS))
+    return sorted(path for path in glob.glob(target, recursive=True) if os.path.isfile(path))
+
+
+def _analyze_dataset_job(dataset_file, api_key, options):
+    # runs in a worker process; every failure (including sys.exit from load_dataset) is turned into a result
+    # so one bad dataset doesn't take the rest of the batch down
+    start = time.perf_counter()
+    try:
+        output_dir = analyze_dataset(dataset_file, api_key, **options)
+        status, error = ("ok", None) if output_dir else ("skipped", "no numeric columns to analyze")
+    except BaseException as e:
+        output_dir = None
+        status, error = "failed", f"{type(e).__name__}: {e}"
+    return {
+        "dataset": dataset_file,
+        "output_dir": output_dir,
+        "status": status,
+        "error": error,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
 
-    The function prepares a batch request where each image is analyzed to produce a story based on its content. 
-    The API response provides the generated stories, which are then returned by the function.
+
+def _analyze_dataset_isolated(dataset_file, api_key, options):
+    # one dataset in a worker process of its own, so a worker that dies (out of memory, segfault) only takes this
+    # dataset down
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(_analyze_dataset_job, dataset_file, api_key, options).result()
+        except BrokenProcessPool as e:
+            return {"dataset": dataset_file, "output_dir": None, "status": "failed",
+                    "error": f"worker process died: {e}", "seconds": round(time.perf_counter() - start, 2)}
+
+
+def run_batch(dataset_files, api_key, workers=None, **options):
+    """
+    Analyze many datasets in parallel, each one in its own worker process and output directory.
 
     Parameters:
-    - api_key: The API key required for authentication in the request headers.
-    - image_paths: A list of image file paths to be analyzed by the API.
-    - headers_json: Contextual headers or additional information to be included in the prompt for generating stories.
+    - dataset_files: List of dataset file paths.
+    - api_key: The API key for the LLM proxy.
+    - workers: Number of worker processes, defaults to the number of CPUs.
+    - options: Keyword arguments passed on to analyze_dataset (usecols, engine, chunksize, streaming_profile, force, ...).
 
     Returns:
-    - The generated content (stories) as a string if the request is successful.
-    - None if the request fails or the response format is unexpected.
+    - List of per-dataset result dictionaries (dataset, output_dir, status, error, seconds), in input order. status
+      is 'ok', 'skipped' (no numeric columns) or 'failed'.
     """
-    # Endpoint and headers
-    endpoint = "https://aiproxy.sanand.workers.dev/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    start = time.perf_counter()
+    results = {}
 
-    # Prepare the payload with multiple images, to reduce the number of requests, taking less time.
-    messages_content = [
-        {
-            "type": "text",
-            "text": (
-                "For each image, generate a concise and insightful story based on its content. "
-                "Label each story with the corresponding image identifier (e.g., Image 1, Image 2, etc.)."
-                "Make sure to always label image with 3 # (eg. ### Image 1, ### Image 2). "
-                "make the story atleat 250 words long for each image. "
-                "Focus on trends, patterns, and data structure. Headers for context are provided, don't use these in your story: "
-                f"{headers_json}."
-            )
-        }
-    ]
+    def report(result):
+        results[result["dataset"]] = result
+        print(f"[{len(results)}/{len(dataset_files)}] {result['dataset']}: {result['status']} in {result['seconds']}s")
 
-    # Add each image to the payload
-    for idx, image_path in enumerate(image_paths, start=1):
-        base64_image = encode_image(image_path)
-        messages_content.append({
-            "type": "image_url",
-            "image_url": {"url": f"data:image/png;base64,{base64_image}"}
-        })
+    lost = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_analyze_dataset_job, path, api_key, options): path for path in dataset_files}
+        for future in as_completed(futures):
+            try:
+                report(future.result())
+            except BrokenProcessPool:
+                # a worker died and took the pool down with every dataset still in it
+                lost.append(futures[future])
+    if lost:
+        # which one killed the worker is unknown, so each is rerun in a process of its own
+        print(f"A worker process died, rerunning {len(lost)} datasets one at a time")
+        for path in sorted(lost, key=dataset_files.index):
+            report(_analyze_dataset_isolated(path, api_key, options))
+    results = [results[path] for path in dataset_files]
+
+    # aggregate summary of the run
+    succeeded = [r for r in results if r["status"] == "ok"]
+    skipped = [r for r in results if r["status"] == "skipped"]
+    print(f"\nBatch finished in {time.perf_counter() - start:.2f}s: {len(succeeded)} succeeded, "
+          f"{len(skipped)} skipped, {len(results) - len(succeeded) - len(skipped)} failed")
+    for result in sorted(results, key=lambda r: r["seconds"], reverse=True):
+        line = f"  {result['seconds']:>8.2f}s  {result['status']:<7}  {result['dataset']}"
+        if result["error"]:
+            line += f"  ({result['error']})"
+        print(line)
+    if succeeded:
+        timings = [r["seconds"] for r in succeeded]
+        print(f"  per dataset: min {min(timings):.2f}s, mean {sum(timings) / len(timings):.2f}s, max {max(timings):.2f}s")
+    return results
 
-    # Complete payload for the request
-    payload = {
-        "model": "gpt-4o-mini",
-        "messages": [{"role": "user", "content": messages_content}]
-    }
 
+# Server mode (--serve): one long-lived process accepts jobs over HTTP and runs them on worker processes that are
+# started once, so a request doesn't pay interpreter startup, the heavy imports or a new connection to the LLM proxy
+SERVER_JOBS_DIR = "autolysis_jobs"
+SERVER_MAX_FINISHED_JOBS = 1000   # finished job records kept for status queries, their files stay on disk
+SERVER_MAX_UPLOAD_BYTES = 2 * 1024 ** 3
+SERVER_POLL_INTERVAL = 0.2        # seconds between checks for cancellation while a job runs
+
+
+def _warm_up(api_key, llm_settings):
+    # import the plotting and ML stacks and render a tiny figure (loads the fonts) before the first job arrives,
+    # and create the pooled LLM client the jobs of this worker will share
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
     try:
-        response = requests.post(endpoint, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        #print(result['choices'][0]['message']['content']) # sanity check, also for knowing the structure of the response
-        return result['choices'][0]['message']['content']
-    except requests.exceptions.RequestException as e:
-        print(f"Request failed: {e}")
-        return None
-    except (KeyError, IndexError) as e:
-        print(f"Unexpected response format: {e}")
-        return None
+        import pyarrow  # noqa: F401, optional, only used by the Arrow formats and compact mode
+    except ImportError:
+        pass
+    import seaborn  # noqa: F401
+    from PIL import Image  # noqa: F401
+    from sklearn.cluster import KMeans  # noqa: F401
+    from sklearn.metrics import silhouette_score  # noqa: F401
+    fig, ax = new_figure((1, 1))
+    ax.set_title("warm-up")
+    render_figure(fig, "warm-up.png")
+    get_llm_client(api_key, **(llm_settings or {}))
+
 
-def process_images_and_create_readme(df, dataset_file, api_key, headers_json):
+def _serve_worker(conn, api_key, options):
+    # entry point of a warm worker process: runs the datasets sent over the pipe one at a time until it is closed
+    _warm_up(api_key, options.get("llm_settings"))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        dataset_file, output_dir = message
+        conn.send(_analyze_dataset_job(dataset_file, api_key, dict(options, output_dir=output_dir)))
+
+
+@dataclass
+class Job:
     """
-    Processes images from a given dataset directory, generates image-based narratives using an external API,
-    and creates a README.md file containing the image stories along with key data insights.
+    One analysis requested from the server. status is one of queued, running, ok, failed or cancelled.
+    """
+    id: str
+    dataset: str
+    output_dir: str
+    status: str = "queued"
+    submitted: float = field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    error: str = None
+    cancel_requested: threading.Event = field(default_factory=threading.Event, repr=False)
 
-    The function performs the following steps:
-    1. Retrieves all PNG images from the output directory associated with the dataset file.
-    2. Uses the external API to generate narratives for each image.
-    3. Splits the generated batched stories into individual stories for each image.
-    4. Creates a README.md file that includes each image's narrative and additional data insights.
+    def to_dict(self):
+        result = {key: getattr(self, key) for key in ("id", "dataset", "output_dir", "status", "submitted", "started",
+                                                      "finished", "error")}
+        readme_path = os.path.join(self.output_dir, "README.md")
+        if self.status == "ok" and os.path.exists(readme_path):
+            result["readme"] = readme_path
+        return result
 
-    Parameters:
-    - df: DataFrame containing the dataset for analysis.
-    - dataset_file: The path to the dataset file.
-    - api_key: The API key for authenticating the external service used to generate image narratives.
-    - headers_json: Contextual information or headers to be used for generating the narratives.
 
-    Returns:
-    - None. The function creates a README.md file in the output directory.
+class _WarmWorker:
+    # a pre-started worker process and the pipe to it; a cancelled or crashed job replaces it with a fresh one
+
+    def __init__(self, context, api_key, options):
+        self.context = context
+        self.args = (api_key, options)
+        self.start()
+
+    def start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=_serve_worker, args=(child_conn, *self.args), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def restart(self):
+        self.stop(graceful=False)
+        self.start()
+
+    def stop(self, graceful=True):
+        if graceful:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+class AnalysisServer:
     """
-    # removes the last file called as file extension, convert it from like dataset.csv to dataset only
-    output_dir = os.path.splitext(dataset_file)[0]
+    Job queue in front of a fixed number of warm worker processes.
 
-    if not os.path.exists(output_dir):
-        print(f"Directory does not exist: {output_dir}")
-        return
+    Every worker is a process that imported the whole stack once and keeps its LLM connection pool between jobs,
+    each runs one job at a time through analyze_dataset, exactly like the CLI. Jobs wait in a FIFO queue until a
+    worker is free. A queued job is cancelled by removing it from the queue, a running one by terminating its worker,
+    which is then replaced by a freshly warmed one.
+    """
 
-    images = [os.path.join(output_dir, f) for f in os.listdir(output_dir) if f.endswith('.png')]
+    def __init__(self, api_key, workers=None, jobs_dir=SERVER_JOBS_DIR, **options):
+        """
+        :param api_key: The API key for the LLM proxy
+        :param workers: Number of worker processes, defaults to the number of CPUs
+        :param jobs_dir: Directory with one output directory (and uploaded dataset) per job
+        :param options: Keyword arguments passed on to analyze_dataset for every job
+        """
+        import multiprocessing
+        self.jobs_dir = jobs_dir
+        self.jobs = {}
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.started = time.time()
+        self.closed = False
+        # spawn, not fork: workers are restarted while the HTTP threads are running, forking a threaded process
+        # can deadlock the child
+        context = multiprocessing.get_context("spawn")
+        self.workers = [_WarmWorker(context, api_key, options) for _ in range(workers or os.cpu_count() or 1)]
+        self.busy = 0
+        self.threads = [threading.Thread(target=self._run_worker, args=(worker,), daemon=True)
+                        for worker in self.workers]
+        for thread in self.threads:
+            thread.start()
 
-    if not images:
-        print("No PNG images found in the directory.")
-        return
+    def submit(self, dataset_file=None, upload=None, name=None):
+        """
+        Queue a dataset for analysis.
 
-    # Get batched stories for all images
-    batched_stories = get_batched_image_analysis(api_key, images, headers_json)
-    if not batched_stories:
-        print("Failed to generate stories for the images.")
-        return
+        :param dataset_file: Path of a dataset readable by the server
+        :param upload: Alternatively a binary file object with the dataset, stored in the job's directory
+        :param name: File name for the upload
+        :return: The queued Job
+        :raises ValueError: If the dataset file does not exist or the upload name is not a file name
+        """
+        job_id = hashlib.sha256(os.urandom(16)).hexdigest()[:16]
+        output_dir = os.path.join(self.jobs_dir, job_id)
+        if upload is not None:
+            file_name = os.path.basename(name or "") or "dataset"
+            if file_name in (os.curdir, os.pardir):
+                raise ValueError(f"Invalid upload file name: {name}")
+            os.makedirs(output_dir, exist_ok=True)
+            dataset_file = os.path.join(output_dir, file_name)
+            with open(dataset_file, 'wb') as f:
+                while chunk := upload.read(1024 * 1024):
+                    f.write(chunk)
+        elif not dataset_file or not os.path.isfile(dataset_file):
+            raise ValueError(f"No such dataset file: {dataset_file}")
+        job = Job(id=job_id, dataset=os.path.abspath(dataset_file), output_dir=os.path.abspath(output_dir))
+        with self.condition:
+            if self.closed:
+                raise ValueError("The server is shutting down")
+            self.jobs[job_id] = job
+            self.queue.append(job)
+            self.condition.notify()
+        return job
 
-    # Split the batched stories based on the headers "### Image 1", "### Image 2", etc.
-    stories = {}
-    current_label = None
-    current_story = []
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job.
 
-    # Split batched stories based on the "### Image X" header because we have specified to always start with 3#
-    for line in batched_stories.splitlines():
+        :return: The Job, None if the id is unknown
+        :raises ValueError: If the job has already finished
+        """
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job.status == "queued":
+                self.queue.remove(job)
+                self._finish(job, "cancelled")
+            elif job.status == "running":
+                # the worker thread terminates the process on its next poll
+                job.cancel_requested.set()
+            else:
+                raise ValueError(f"Job {job_id} has already finished ({job.status})")
+        return job
 
-        if line.startswith("### Image"):
-            if current_label and current_story:
-                # Save the current story for the previous image
-                stories[current_label] = "\n".join(current_story).strip()
+    def status(self):
+        with self.condition:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                "workers": len(self.workers),
+                "busy": self.busy,
+                "queue_depth": len(self.queue),
+                "jobs": counts,
+                "uptime_seconds": round(time.time() - self.started, 1),
+            }
 
-            # Extract image number (e.g., 1, 2, 3)
-            current_label = line.split()[2]  # Get the number part of "### Image X"
-            current_story = []  # Reset current story
-        else:
-            current_story.append(line)
+    def close(self):
+        # running jobs are terminated, queued ones cancelled
+        with self.condition:
+            self.closed = True
+            while self.queue:
+                self._finish(self.queue.popleft(), "cancelled")
+            for job in self.jobs.values():
+                if job.status == "running":
+                    job.cancel_requested.set()
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+        for worker in self.workers:
+            worker.stop()
 
-    # Save the last story
-    if current_label and current_story:
-        stories[current_label] = "\n".join(current_story).strip()
+    def _finish(self, job, status, error=None):
+        # called with the condition held
+        job.status, job.error, job.finished = status, error, time.time()
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(finished) - SERVER_MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
 
-    # Debugging: print the stories dictionary
-    #print("Stories Dictionary:", stories)
+    def _run_worker(self, worker):
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                job = self.queue.popleft()
+                job.status, job.started = "running", time.time()
+                self.busy += 1
+            try:
+                status, error = self._run_job(worker, job)
+            except Exception as e:
+                status, error = "failed", f"{type(e).__name__}: {e}"
+                worker.restart()
+            with self.condition:
+                self.busy -= 1
+                self._finish(job, status, error)
 
+    def _run_job(self, worker, job):
+        print(f"Job {job.id}: {job.dataset}")
+        worker.conn.send((job.dataset, job.output_dir))
+        while not worker.conn.poll(SERVER_POLL_INTERVAL):
+            if job.cancel_requested.is_set():
+                print(f"Job {job.id}: cancelled")
+                worker.restart()
+                return "cancelled", None
+            if not worker.process.is_alive():
+                exitcode = worker.process.exitcode
+                worker.restart()
+                return "failed", f"worker exited with code {exitcode}"
+        result = worker.conn.recv()
+        print(f"Job {job.id}: {result['status']} in {result['seconds']}s")
+        return result["status"], result["error"]
 
-    # Initialize the README.md content
-    readme_path = os.path.join(output_dir, "README.md")
-    readme_content = "# Image Narratives\n\n"
 
-    # Process each image and its corresponding story
-    for idx, image_path in enumerate(images, start=1):
-        image_name = os.path.basename(image_path)
-        story = stories.get(str(idx), "No story available for this image.")
+class _ServerHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of the analysis server:
 
-        readme_content += f"## {os.path.splitext(image_name)[0]}\n\n"
-        readme_content += f"![{image_name}](./{image_name})\n\n"
-        readme_content += f"{story}\n\n"
+    - POST /jobs with {"dataset": "path/to/file.csv"}, or with the raw dataset as body (any other Content-Type,
+      file name in ?name=...), returns the queued job (202)
+    - GET /jobs lists the jobs, GET /jobs/<id> returns one
+    - DELETE /jobs/<id> cancels a queued or running job
+    - GET /status returns the number of workers, busy workers, queue depth and job counts
+    """
+    server_version = "autolysis"
 
-    # Write the README.md file
-    with open(readme_path, "w", encoding="utf-8") as readme_file:
-        readme_file.write(readme_content)
-        readme_file.write('\n\n## Some more key insights from the data:\n\n')
-        
-        # Top column analysis
-        top_column = df.describe().loc['mean'].idxmax()
-        narrative = f"- The column '{top_column}' has the highest average value among numerical features.\n\n"
-        readme_file.write(narrative)
-        
-        # Correlation analysis
-        corr_matrix = df.select_dtypes(include=[float, int]).corr()
-        highest_corr = corr_matrix.abs().unstack().sort_values(ascending=False).drop_duplicates()
-
-        # Skip self-correlation (where features are compared to themselves)
-        highest_corr = highest_corr[highest_corr < 1]
+    def log_message(self, format, *args):
+        pass
 
-        # Get the highest correlation pair and the correlation value
-        feature_pair, correlation = highest_corr.idxmax(), highest_corr.max()
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
-        # Now you can use the feature pair and the correlation
-        narrative1 = f"- The highest correlation is between '{feature_pair[0]}' and '{feature_pair[1]}' with a value of {correlation:.2f}.\n\n"
+    def _job_id(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
 
-        if correlation > 0.7:
-            narrative2 = f"- This indicates a strong positive correlation between the features '{feature_pair[0]}' and '{feature_pair[1]}'. Growth of one feature is often associated with the growth of the other feature.\n\n"
-        elif correlation < -0.7:
-            narrative2 = f"- This indicates a strong negative correlation between the features '{feature_pair[0]}' and '{feature_pair[1]}'. Growth of one feature is often associated with the decline of the other feature.\n\n"
-        else:
-            narrative2 = f"- This indicates a weak correlation between the features '{feature_pair[0]}' and '{feature_pair[1]}'. They are correlated but not strongly.\n\n"
-        readme_file.write(narrative1)
-        readme_file.write(narrative2)
-        number_of_Rows=df.shape[0]
-        number_of_Columns=df.shape[1]
-        if number_of_Rows > 1000:
-            narrative3 = "- The dataset has more than 1000 rows. It is good for analysis but it may not be suitable for training models, so choose wisely.\n\n"
+    def do_GET(self):
+        analysis = self.server.analysis
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/status":
+            self._send_json(200, analysis.status())
+        elif path == "/jobs":
+            with analysis.condition:
+                jobs = [job.to_dict() for job in analysis.jobs.values()]
+            self._send_json(200, {"jobs": jobs})
+        elif job_id := self._job_id():
+            # looked up and copied under the lock, finished jobs are pruned from another thread
+            with analysis.condition:
+                job = analysis.jobs.get(job_id)
+                state = job.to_dict() if job is not None else None
+            if state is not None:
+                self._send_json(200, state)
+            else:
+                self._send_json(404, {"error": "not found"})
         else:
-            narrative3 = "- The dataset have less than 1000 rows. So making any huge analysis may not be a good idea.\n\n"
-        readme_file.write(narrative3)
-        if number_of_Columns > 20:
-            narrative4 = "- The dataset has more than 20 columns. It is good for analysis but make sure to use feature selection or dimensionality reduction techniques if necessary.\n\n\n"
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        from urllib.parse import urlparse, parse_qs
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {"error": "invalid Content-Length"})
+            return
+        if length > SERVER_MAX_UPLOAD_BYTES:
+            self._send_json(413, {"error": f"upload larger than {SERVER_MAX_UPLOAD_BYTES} bytes"})
+            return
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                request = json.loads(self.rfile.read(length) or b"{}")
+                job = self.server.analysis.submit(dataset_file=request.get("dataset"))
+            else:
+                name = parse_qs(url.query).get("name", [None])[0]
+                job = self.server.analysis.submit(upload=io.BufferedReader(_LimitedReader(self.rfile, length)),
+                                                  name=name)
+        except (ValueError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(202, dict(job.to_dict(), queue_depth=len(self.server.analysis.queue)))
+
+    def do_DELETE(self):
+        try:
+            job = self.server.analysis.cancel(self._job_id())
+        except ValueError as e:
+            self._send_json(409, {"error": str(e)})
+            return
+        if job is None:
+            self._send_json(404, {"error": "not found"})
         else:
-            narrative4 = "- The dataset have less than 20 columns. So it may be ideal to use all the columns if number of rows is also less.\n\n"
-        readme_file.write(narrative4)
+            self._send_json(200, job.to_dict())
 
-    print(f"README.md created at {readme_path}")
 
+class _LimitedReader(io.RawIOBase):
+    # reads at most `length` bytes of the request body, the connection may carry more requests after it
+
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        data = self.stream.read(size)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+
+def serve(api_key, address, workers=None, jobs_dir=SERVER_JOBS_DIR, **options):
+    """
+    Run the analysis server until interrupted.
+
+    :param address: "PORT" or "HOST:PORT", the host defaults to 127.0.0.1. The server reads any dataset path it is
+                    given, so only bind it to other interfaces on a trusted network.
+    :param workers: Number of warm worker processes, defaults to the number of CPUs
+    :param jobs_dir: Directory the job outputs (and uploads) are written to
+    :param options: Keyword arguments passed on to analyze_dataset for every job
+    """
+    host, _, port = address.rpartition(":")
+    analysis = AnalysisServer(api_key, workers=workers, jobs_dir=jobs_dir, **options)
+    httpd = ThreadingHTTPServer((host or "127.0.0.1", int(port)), _ServerHandler)
+    httpd.analysis = analysis
+    print(f"Serving on http://{httpd.server_address[0]}:{httpd.server_address[1]} with {len(analysis.workers)} "
+          f"workers, job outputs in {jobs_dir}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        analysis.close()
 
 
+def parse_args(argv=None):
+    """
+    Parse the command-line arguments.
 
+    :param argv: Optional list of arguments, defaults to sys.argv[1:]
+    :return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(prog="uv run autolysis.py", description="Automated analysis of a CSV dataset.")
+    parser.add_argument("dataset", nargs="?",
+                        help="Path to the dataset file (CSV, optionally gzip/zstd/bz2/xz compressed, Parquet or "
+                             "Arrow/Feather), or with --batch a directory or glob; not used with --serve")
+    parser.add_argument("--profile-only", action="store_true",
+                        help="only load and profile the dataset and print the profile as JSON (no plots, no LLM)")
+    parser.add_argument("--batch", action="store_true",
+                        help="analyze every dataset matched by the directory or glob, each into its own output directory")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes in batch and server mode (default: number of CPUs)")
+    parser.add_argument("--serve", default=None, metavar="[HOST:]PORT",
+                        help="run an HTTP server that queues analysis jobs on warm worker processes "
+                             "(POST /jobs, GET /jobs/<id>, DELETE /jobs/<id>, GET /status)")
+    parser.add_argument("--jobs-dir", default=SERVER_JOBS_DIR,
+                        help=f"directory of the job outputs in server mode (default: {SERVER_JOBS_DIR})")
+    parser.add_argument("--engine", choices=["c", "python", "pyarrow"], default=None,
+                        help="pandas parser engine used to read the CSV")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="parse the CSV in chunks of this many rows")
+    parser.add_argument("--streaming-profile", action="store_true",
+                        help="profile the file chunk by chunk (uses --chunksize, default 100000 rows) instead of in memory")
+    parser.add_argument("--approximate", action="store_true",
+                        help="add sketch-based distinct counts and quartiles with error bounds to the profile "
+                             "(always on with --streaming-profile)")
+    parser.add_argument("--max-k", type=int, default=5, help="largest number of clusters tried (default: 5)")
+    parser.add_argument("--sample-size", type=int, default=500,
+                        help="number of rows sampled for clustering (default: 500)")
+    parser.add_argument("--seed", type=int, default=SAMPLE_SEED,
+                        help=f"seed of every sample (preview, profile rows, clustering sample); the same seed draws "
+                             f"the same rows in every run (default: {SAMPLE_SEED})")
+    parser.add_argument("--stratify", default=None, metavar="COLUMN",
+                        help="draw the samples proportionally from the values of this column")
+    parser.add_argument("--cluster-algorithm", choices=["kmeans", "minibatch"], default="kmeans",
+                        help="full K-Means or MiniBatchKMeans for the cluster plot")
+    parser.add_argument("--cluster-projection", choices=list(CLUSTER_PROJECTIONS), default="columns",
+                        help="axes of the cluster plot: the two highest-variance columns (default), or the first two "
+                             "principal components of all clustered columns, fitted over the full table with "
+                             "IncrementalPCA ('pca') or randomized SVD of the covariance ('svd')")
+    parser.add_argument("--cluster-jobs", type=int, default=1,
+                        help="number of candidate k values fitted concurrently (default: 1)")
+    parser.add_argument("--density-threshold", type=int, default=SCATTER_DENSITY_THRESHOLD,
+                        help=f"draw scatter plots as binned densities above this many points "
+                             f"(default: {SCATTER_DENSITY_THRESHOLD})")
+    parser.add_argument("--correlation-method", choices=["pearson", "spearman"], default="pearson",
+                        help="correlation used to pick the scatterplot pair, for the heatmap and the README")
+    parser.add_argument("--cache-dir", default=LLM_CACHE_DIR,
+                        help=f"directory of the LLM response cache (default: {LLM_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="always call the LLM, don't read or write the cache")
+    parser.add_argument("--connect-timeout", type=float, default=LLM_CONNECT_TIMEOUT,
+                        help=f"seconds to connect to the LLM endpoint (default: {LLM_CONNECT_TIMEOUT})")
+    parser.add_argument("--read-timeout", type=float, default=LLM_READ_TIMEOUT,
+                        help=f"seconds to wait for the LLM response (default: {LLM_READ_TIMEOUT})")
+    parser.add_argument("--max-retries", type=int, default=LLM_MAX_RETRIES,
+                        help=f"retries of failed or rate limited LLM requests (default: {LLM_MAX_RETRIES})")
+    parser.add_argument("--image-format", choices=["png", "jpeg", "webp", "original"], default="png",
+                        help="encoding of the images sent to the vision model, 'original' sends them untouched")
+    parser.add_argument("--image-max-edge", type=int, default=1024,
+                        help="downscale images whose longer side exceeds this many pixels (default: 1024)")
+    parser.add_argument("--image-quality", type=int, default=80, help="jpeg/webp quality (default: 80)")
+    parser.add_argument("--image-budget", type=int, default=None,
+                        help="total bytes of all images in one LLM request, images are shrunk to fit")
+    parser.add_argument("--narration", choices=["batched", "streamed", "per-figure"], default="batched",
+                        help="a single LLM request with all plots (default), that request streamed into README.md "
+                             "story by story, or one request per plot sent as soon as the plot is ready")
+    parser.add_argument("--token-budget", type=int, default=LLM_TOKEN_BUDGET,
+                        help=f"estimated prompt tokens per LLM request, the dataset context is trimmed and the plots "
+                             f"split across requests to fit (default: {LLM_TOKEN_BUDGET})")
+    parser.add_argument("--stage-workers", type=int, default=STAGE_WORKERS,
+                        help=f"threads for the independent stages: profile, plots and narrations "
+                             f"(default: {STAGE_WORKERS})")
+    parser.add_argument("--trace", default=None, metavar="OUT.json",
+                        help="write wall/CPU time, peak memory and input/output sizes of every stage to this JSON file "
+                             "(relative to each output directory in batch mode)")
+    parser.add_argument("--trace-profile", action="store_true",
+                        help="with --trace, also dump cProfile stats of every stage next to the trace file")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild every artifact even if the manifest says the inputs are unchanged")
+    parser.add_argument("--compact", action="store_true",
+                        help="downcast numeric columns and store repetitive strings as categoricals to save memory")
+    parser.add_argument("--usecols", type=lambda value: [col.strip() for col in value.split(",") if col.strip()],
+                        default=None, help="comma separated list of columns to load, others are skipped")
+    parser.add_argument("--numeric-only", action="store_true",
+                        help="load only the numeric columns for correlation, scatterplot and clustering; the profile "
+                             "streams every column from the file instead")
+    parser.add_argument("--columnar-cache", nargs="?", const=COLUMNAR_CACHE_DIR, default=None, metavar="DIR",
+                        help=f"convert a CSV once into an Arrow sidecar and memory-map it on later runs "
+                             f"(default directory: {COLUMNAR_CACHE_DIR})")
+    args = parser.parse_args(argv)
+    if args.dataset is None and not args.serve:
+        parser.error("the dataset argument is required")
+    if args.numeric_only and args.usecols:
+        parser.error("--numeric-only and --usecols can't be combined")
+    # only checks that need no data: whether the --stratify column exists is checked once the dataset is loaded
+    if args.stratify and args.usecols and args.stratify not in args.usecols:
+        parser.error(f"--stratify column {args.stratify!r} is not one of the --usecols columns")
+    return args
 
 
 if __name__ == "__main__":
@@ -574,8 +4437,8 @@ if __name__ == "__main__":
     Main execution block for processing the dataset and generating analyses.
 
     This block serves as the entry point for the script. It executes the following tasks:
-    1. Retrieves the API key (`AIPROXY_TOKEN`) from the environment variables.
-    2. Validates that a dataset file path is provided via command-line arguments.
+    1. Validates that a dataset file path is provided via command-line arguments.
+    2. Retrieves the API key (`AIPROXY_TOKEN`) from the environment variables (not needed with --profile-only).
     3. Loads and processes the dataset.
     4. Generates and saves visualizations (scatterplots, correlation heatmap, and cluster data).
     5. Profiles the dataset and sends it to the LLM.
@@ -586,6 +4449,9 @@ if __name__ == "__main__":
     - It checks if a dataset file is provided and validates its format.
     - Once the dataset is loaded, it generates summary statistics, visualizations, and a dataset profile.
     - The script also processes images and writes a detailed summary in the `README.md` file.
+    - With --batch, every dataset matched by a directory or glob is analyzed on a process pool, each into its own
+      output directory, and a summary of per-dataset timings is printed at the end.
+    - With --serve, an HTTP server queues analysis jobs on warm worker processes until interrupted.
 
     Parameters:
     -----------
@@ -603,50 +4469,82 @@ if __name__ == "__main__":
     Notes:
     ------
     - The script is intended to be run from the command line with a dataset file passed as an argument.
-    - All output files (visualizations, profiles) will be saved in the current directory (`.`).
+    - All output files (visualizations, profiles) will be saved in the current directory (`.`), in batch mode
+      in a directory named after each dataset.
     - If the dataset is invalid or empty, the script will handle it within respective functions.
     """
+    # if no filepath is provided, argparse prints the usage and exits as entire code is based on this file
+    # (nothing heavy is imported yet, so usage errors are reported instantly)
+    args = parse_args()
+
+    if args.profile_only:
+        # only pandas is needed here, the plotting and ML stacks are never imported
+        if args.streaming_profile:
+            profiler = profile_dataset_streaming(args.dataset, chunksize=args.chunksize or 100_000,
+                                                 usecols=args.usecols, sample_seed=args.seed, stratify=args.stratify)
+            columns, profile = profiler.columns or [], profiler.summary()
+        else:
+            df = load_dataset(args.dataset, usecols=args.usecols, engine=args.engine, chunksize=args.chunksize,
+                              compact=args.compact, columnar_cache=args.columnar_cache)
+            columns = df.columns
+            profile = profile_dataset(df, AnalysisContext(df, sample_seed=args.seed, stratify=args.stratify),
+                                      approximate=args.approximate)
+        if args.stratify and args.stratify not in columns:
+            sys.exit(f"--stratify column {args.stratify!r} not found in {args.dataset}")
+        print(json.dumps(profile, indent=4, default=str))
+        sys.exit(0)
+
     try:
         # may be present or not, better to check
         api_key = os.environ["AIPROXY_TOKEN"]
     except KeyError:
         raise ValueError("AIPROXY_TOKEN environment variable not set.")
-    def check_filepath():
-        # if no filepath is provided, exit the running as entire code is based on this file
-        if len(sys.argv) < 2:
-            print("Usage: uv run autolysis.py <dataset.csv>")
-            sys.exit(1)
-    # if provided, we can try to get the file. If it is valid or not, it'll be checked by the function load_dataset defined earlier
-    dataset_file = sys.argv[1]
-
-    check_filepath()
-    # load the dataset, all essential checks are done in this function itself
-    df = load_dataset(dataset_file)
-
-    # Get headers as JSON, for passing it to the llm
-    headers_json = get_headers_as_json(df)
-
-    # to make sure data is not empty, it is also checked in load_dataset also
-    sample_data = df.sample(n=min(5, len(df))).to_string(index=False)
-
+    options = {
+        "usecols": args.usecols,
+        "engine": args.engine,
+        "chunksize": args.chunksize,
+        "streaming_profile": args.streaming_profile,
+        "max_k": args.max_k,
+        "sample_size": args.sample_size,
+        "cluster_algorithm": args.cluster_algorithm,
+        "cluster_jobs": args.cluster_jobs,
+        "cache_dir": None if args.no_cache else args.cache_dir,
+        "llm_settings": {
+            "connect_timeout": args.connect_timeout,
+            "read_timeout": args.read_timeout,
+            "max_retries": args.max_retries,
+        },
+        "image_options": ImageOptimization(max_edge=args.image_max_edge, image_format=args.image_format,
+                                           quality=args.image_quality, byte_budget=args.image_budget),
+        "force": args.force,
+        "density_threshold": args.density_threshold,
+        "correlation_method": args.correlation_method,
+        "trace_file": args.trace,
+        "trace_profile": args.trace_profile,
+        "compact": args.compact,
+        "approximate": args.approximate,
+        "columnar_cache": args.columnar_cache,
+        "narration": args.narration,
+        "stage_workers": args.stage_workers,
+        "token_budget": args.token_budget,
+        "sample_seed": args.seed,
+        "stratify": args.stratify,
+        "cluster_projection": args.cluster_projection,
+        "numeric_only": args.numeric_only,
+    }
 
-    # Perform dataset profiling for sending to llm
-    profile = profile_dataset(df)
-    #print(json.dumps(profile, indent=4))  #sanity check
+    if args.serve:
+        serve(api_key, args.serve, workers=args.workers, jobs_dir=args.jobs_dir, **options)
+        sys.exit(0)
 
-    # it was done to make the essential folder structure and manage it in seperate directories. For evaluation, everything must be done in current directory
-    #output_dir = os.path.splitext(dataset_file)[0]  # Remove file extension
-    #os.makedirs(output_dir, exist_ok=True)
+    if args.batch:
+        dataset_files = find_datasets(args.dataset)
+        if not dataset_files:
+            sys.exit(f"No datasets found for {args.dataset}")
+        results = run_batch(dataset_files, api_key, workers=args.workers, **options)
+        sys.exit(0 if all(r["status"] != "failed" for r in results) else 1)
 
-    # now save it to the current directory as per the mentioned required
-    output_dir = '.'
+    # if provided, we can try to get the file. If it is valid or not, it'll be checked by the function load_dataset defined earlier
+    # For evaluation, everything must be done in current directory, so save it to the current directory as per the mentioned required.
     # no need to check if current directory is present or not, because thats where we are now in folder structure
-
-
-    #run functions and generate visulizations
-    generate_scatterplot(df,output_dir)
-    generate_correlation_heatmap(df,output_dir)
-    generate_cluster_data(df, output_dir)
-
-    # narrate story in README.md
-    process_images_and_create_readme(df,output_dir, api_key,headers_json)
+    analyze_dataset(args.dataset, api_key, output_dir='.', **options)
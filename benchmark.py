@@ -0,0 +1,523 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = ["pandas", "seaborn", "matplotlib", "chardet", "requests", "scikit-learn", "numpy", "pillow"]
+# ///
+
+# Performance benchmarks for autolysis.py, run with: uv run benchmark.py <benchmark> [options]
+
+
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_blobs
+from sklearn.preprocessing import StandardScaler
+
+import autolysis
+
+
+AUTOLYSIS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "autolysis.py")
+
+# modules --profile-only must never import, they are only needed by the plotting, clustering and LLM stages
+PLOTTING_AND_ML_MODULES = ["matplotlib", "seaborn", "sklearn", "requests", "PIL"]
+
+# suite results are appended here, one JSON object per line, keyed by commit so later runs can be compared
+RESULTS_FILE = os.path.join(os.path.dirname(AUTOLYSIS), ".benchmarks", "results.jsonl")
+DATA_DIR = os.path.join(os.path.dirname(AUTOLYSIS), ".benchmarks", "data")
+
+# category labels with non-ASCII characters (all representable in latin-1/cp1252), so a non-UTF-8 encoding actually
+# changes the bytes on disk and exercises the encoding detection
+CATEGORY_LABELS = ["café", "Zürich", "São Paulo", "naïve", "Ålesund", "Málaga", "crème brûlée", "Bogotá", "façade",
+                   "plain"]
+GENERATOR_CHUNK_ROWS = 500_000
+
+# above this many rows the exact O(n^2) silhouette of the original path needs too much memory to be worth running
+EXACT_SILHOUETTE_MAX_ROWS = 20_000
+
+
+def _timed(func, *args, **kwargs):
+    # run func once and return (result, seconds)
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_clustering(sizes, max_k, true_k, features, jobs):
+    """
+    Compare the chosen k and runtime of the original find_optimal_k path against the scalable engine.
+
+    The original path is full K-Means with an exact silhouette and a sequential k sweep, it is only run up to
+    EXACT_SILHOUETTE_MAX_ROWS rows. The data are Gaussian blobs with a known number of clusters.
+
+    :param sizes: List of row counts to benchmark
+    :param max_k: Largest k tried
+    :param true_k: Number of blobs in the generated data
+    :param features: Number of features (columns)
+    :param jobs: Number of candidate k values fitted concurrently by the parallel configurations
+    :return: List of result dictionaries
+    """
+    configs = [
+        ("original", dict(algorithm='kmeans', silhouette_sample_size=None, n_jobs=1)),
+        ("sampled", dict(algorithm='kmeans', silhouette_sample_size=autolysis.SILHOUETTE_SAMPLE_SIZE, n_jobs=1)),
+        ("sampled+parallel", dict(algorithm='kmeans', silhouette_sample_size=autolysis.SILHOUETTE_SAMPLE_SIZE, n_jobs=jobs)),
+        ("minibatch+parallel", dict(algorithm='minibatch', silhouette_sample_size=autolysis.SILHOUETTE_SAMPLE_SIZE, n_jobs=jobs)),
+    ]
+    results = []
+    print(f"{'rows':>9}  {'config':<20} {'k':>3}  {'seconds':>8}")
+    for rows in sizes:
+        data, _ = make_blobs(n_samples=rows, n_features=features, centers=true_k, random_state=42)
+        data = StandardScaler().fit_transform(data)
+        for name, config in configs:
+            if config['silhouette_sample_size'] is None and rows > EXACT_SILHOUETTE_MAX_ROWS:
+                continue
+            k, seconds = _timed(autolysis.find_optimal_k, data, max_k, **config)
+            results.append({"rows": rows, "config": name, "k": k, "seconds": round(seconds, 3)})
+            print(f"{rows:>9}  {name:<20} {k:>3}  {seconds:>8.2f}")
+    return results
+
+
+def _count(value):
+    # 1000, 1k, 10M -> int
+    value = value.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value[:-1] if scale > 1 else value) * scale)
+
+
+def generate_dataset(path, rows, numeric=8, categorical=2, null_rate=0.05, correlation=0.8, encoding='utf-8', seed=42):
+    """
+    Write a synthetic CSV with a known correlation structure.
+
+    The numeric columns follow a one-factor model, column j = l_j * factor + sqrt(1 - l_j^2) * noise, rescaled to its
+    own mean and spread. The first two columns correlate with `correlation`, the loadings of the others fall off
+    linearly to 0, so the strongest pair is known. Categorical columns draw from CATEGORY_LABELS with skewed
+    frequencies. Every cell is missing with probability null_rate. Rows are written in chunks, so 10M rows don't
+    need to fit in memory.
+
+    :param path: Output CSV path
+    :param rows: Number of rows
+    :param numeric: Number of numeric columns
+    :param categorical: Number of categorical columns
+    :param null_rate: Probability of a missing value per cell
+    :param correlation: Correlation of the first two numeric columns, between 0 and 1
+    :param encoding: Encoding of the file, e.g. 'utf-8', 'latin-1', 'cp1252' or 'utf-16'
+    :param seed: Seed of the random generator, the same arguments always produce the same file
+    :return: path
+    """
+    rng = np.random.default_rng(seed)
+    loadings = np.sqrt(correlation) * np.r_[1.0, np.linspace(1.0, 0.0, max(numeric - 1, 0))][:numeric]
+    means = rng.uniform(-100, 100, numeric)
+    scales = rng.uniform(1, 50, numeric)
+    weights = 1.0 / np.arange(1, len(CATEGORY_LABELS) + 1)
+    weights /= weights.sum()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        for start in range(0, rows, GENERATOR_CHUNK_ROWS):
+            n = min(GENERATOR_CHUNK_ROWS, rows - start)
+            factor = rng.standard_normal((n, 1))
+            values = loadings * factor + np.sqrt(1 - loadings ** 2) * rng.standard_normal((n, numeric))
+            chunk = pd.DataFrame((values * scales + means).round(4), columns=[f"num_{j}" for j in range(numeric)])
+            for j in range(categorical):
+                chunk[f"cat_{j}"] = rng.choice(CATEGORY_LABELS, size=n, p=weights)
+            if null_rate:
+                chunk = chunk.mask(rng.random(chunk.shape) < null_rate)
+            chunk.to_csv(f, header=start == 0, index=False)
+    return path
+
+
+class _StubLLMHandler(BaseHTTPRequestHandler):
+    # answers chat-completions requests with one "### Image N" section per image, plus a usage block. Streamed
+    # requests get server-sent events of one word each, `word_delay` seconds apart, like a model generating tokens.
+    # The first requests can be answered with a fault instead, one entry of `faults` per request (see stub_llm_server).
+    protocol_version = "HTTP/1.1"
+    story_words = 6
+    word_delay = 0.0
+    faults = []
+    received = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.lock:
+            self.received.append(body)
+            fault = self.faults.pop(0) if self.faults else {}
+        time.sleep(fault.get("delay", 0.0))
+        if fault.get("status"):
+            self._error(fault["status"], fault.get("retry_after"))
+            return
+        content = body["messages"][0]["content"]
+        images = sum(1 for part in content if isinstance(part, dict) and part.get("type") == "image_url")
+        story = " ".join(["A synthetic story about image {i}."] + ["word"] * max(0, self.story_words - 6))
+        text = "".join(f"### Image {i}\n{story.format(i=i)}\n\n" for i in range(1, images + 1))
+        if body.get("stream"):
+            self._stream(text, fault.get("drop_after"))
+            return
+        # a non-streamed answer takes as long as generating every word of it
+        time.sleep(self.word_delay * len(text.split(" ")))
+        payload = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, retry_after=None):
+        payload = json.dumps({"error": {"message": f"injected HTTP {status}"}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, text, drop_after=None):
+        # SSE without Content-Length, the end of the stream is the end of the connection
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for index, word in enumerate(text.split(" ")):
+            if index == drop_after:
+                # the connection goes away mid-response, without the usage block and [DONE]
+                self.close_connection = True
+                return
+            event = {"choices": [{"index": 0, "delta": {"content": word + " "}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(self.word_delay)
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\ndata: [DONE]\n\n".encode())
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def stub_llm_server(story_words=6, word_delay=0.0, faults=None, received=None):
+    """
+    Run a local chat-completions stub on a free port for the duration of the block.
+
+    :param story_words: Words per image story
+    :param word_delay: Seconds between the words of a streamed response
+    :param faults: Optional list of faults for the first requests, one dictionary per request in arrival order
+                   (later requests are answered normally), with any of the keys
+                   - "delay": seconds to stall before answering
+                   - "status": answer with this HTTP status code and an error body instead of the stories
+                   - "retry_after": value of the Retry-After header sent with the status
+                   - "drop_after": close a streamed response after this many words, without [DONE]
+    :param received: Optional list every request body is appended to
+    :return: Endpoint URL of the stub
+    """
+    handler = type("_StubLLMHandler", (_StubLLMHandler,), {
+        "story_words": story_words, "word_delay": word_delay, "faults": list(faults or []),
+        "received": received if received is not None else [], "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _best_of(func, repeat):
+    # best of `repeat` calls in seconds and the last result; autolysis' progress output is swallowed
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result, seconds = _timed(func)
+        timings.append(seconds)
+    return result, min(timings)
+
+
+def _commit():
+    # commit the measured code belongs to, marked dirty when autolysis.py or benchmark.py have local changes
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=os.path.dirname(AUTOLYSIS), capture_output=True,
+                              text=True).stdout.strip()
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    if git("status", "--porcelain", "--", "autolysis.py", "benchmark.py"):
+        commit += "+dirty"
+    return commit
+
+
+def _load_results(results_file):
+    if not os.path.exists(results_file):
+        return []
+    with open(results_file, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def bench_suite(rows_list, numeric, categorical, null_rate, correlation, encoding, repeat, max_k, results_file,
+                data_dir, baseline=None, tolerance=1.25):
+    """
+    Time every public stage of autolysis.py on synthetic datasets of several sizes and compare against earlier runs.
+
+    Each function runs `repeat` times with a fresh AnalysisContext, so shared statistics are not reused between
+    functions, and the best time is kept. The README stage talks to a local stub, so the numbers contain the
+    request building, image optimization and HTTP round-trip but no model latency. Results are appended to
+    results_file with the commit, and compared against the newest results of another commit (or `baseline`) for
+    the same dataset configuration on the same host.
+
+    :param rows_list: List of row counts
+    :param numeric, categorical, null_rate, correlation, encoding: Passed on to generate_dataset
+    :param repeat: Number of runs per function, the best one is reported
+    :param max_k: Largest k tried by find_optimal_k and generate_cluster_data
+    :param results_file: JSON lines file the results are appended to
+    :param data_dir: Directory the generated datasets are kept in, they are reused by later runs
+    :param baseline: Commit to compare against, defaults to the newest other commit in results_file
+    :param tolerance: Ratio to the baseline above which a function counts as regressed
+    :return: True if no function regressed
+    """
+    commit = _commit()
+    history = _load_results(results_file)
+    host = platform.node()
+    records = []
+    with stub_llm_server() as endpoint:
+        client = autolysis.LLMClient("benchmark", endpoint=endpoint, max_retries=0)
+        for rows in rows_list:
+            config = {"rows": rows, "numeric": numeric, "categorical": categorical, "null_rate": null_rate,
+                      "correlation": correlation, "encoding": encoding}
+            name = "_".join(f"{key}={value}" for key, value in config.items()) + ".csv"
+            path = os.path.join(data_dir, name)
+            if not os.path.exists(path):
+                print(f"Generating {path}")
+                generate_dataset(path, **config)
+
+            df, _ = _best_of(lambda: autolysis.load_dataset(path), 1)
+            data = StandardScaler().fit_transform(df.select_dtypes(include='number').dropna())
+            figures = []
+            stages = {
+                "load_dataset": lambda: autolysis.load_dataset(path),
+                "profile_dataset": lambda: autolysis.profile_dataset(df),
+                "generate_scatterplot": lambda: autolysis.generate_scatterplot(df),
+                "generate_correlation_heatmap": lambda: autolysis.generate_correlation_heatmap(df),
+                "find_optimal_k": lambda: autolysis.find_optimal_k(data, max_k=max_k),
+                "generate_cluster_data": lambda: autolysis.generate_cluster_data(df, max_k=max_k),
+                "process_images_and_create_readme": lambda: autolysis.process_images_and_create_readme(
+                    df, path, "benchmark", autolysis.get_headers_as_json(df), output_dir=readme_dir, client=client,
+                    figures=figures),
+            }
+            print(f"\n{rows:,} rows ({os.path.getsize(path) / 1e6:.1f} MB, {encoding})")
+            with tempfile.TemporaryDirectory() as readme_dir:
+                for function, call in stages.items():
+                    result, seconds = _best_of(call, repeat)
+                    if function in ("generate_scatterplot", "generate_correlation_heatmap", "generate_cluster_data"):
+                        figures.append(result)
+                    records.append({"commit": commit, "host": host, "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                                    "config": config, "function": function, "seconds": round(seconds, 4),
+                                    "repeat": repeat})
+                    print(f"  {function:<34} {seconds:>9.3f}s")
+
+    os.makedirs(os.path.dirname(os.path.abspath(results_file)), exist_ok=True)
+    with open(results_file, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    print(f"\nResults of {commit} appended to {results_file}")
+    return _compare(records, history, baseline, tolerance)
+
+
+def _compare(records, history, baseline, tolerance):
+    # compare every new record with the newest matching one of the baseline commit
+    def key(record):
+        return record["host"], json.dumps(record["config"], sort_keys=True), record["function"]
+
+    commit = records[0]["commit"] if records else None
+    if baseline is None:
+        others = [r for r in history if r["commit"] != commit and r["host"] == (records[0]["host"] if records else None)]
+        baseline = others[-1]["commit"] if others else None
+    if baseline is None:
+        print("No earlier commit to compare against yet.")
+        return True
+    reference = {key(r): r for r in history if r["commit"] == baseline}
+
+    regressions = 0
+    print(f"\nCompared with {baseline} (regression above {tolerance:.2f}x):")
+    print(f"{'rows':>10}  {'function':<34} {'before':>9} {'after':>9} {'ratio':>7}")
+    for record in records:
+        before = reference.get(key(record))
+        if before is None:
+            continue
+        ratio = record["seconds"] / max(before["seconds"], 1e-9)
+        regressed = ratio > tolerance
+        regressions += regressed
+        print(f"{record['config']['rows']:>10,}  {record['function']:<34} {before['seconds']:>9.3f} "
+              f"{record['seconds']:>9.3f} {ratio:>6.2f}x{'  REGRESSION' if regressed else ''}")
+    print("OK" if not regressions else f"{regressions} regression(s)")
+    return not regressions
+
+
+def _best_wall_time(command, repeat, expected_returncode=0):
+    # best of `repeat` runs of a subprocess, in seconds; the minimum is the least noisy estimate of the fixed cost.
+    # Runs next to autolysis.py so `import autolysis` resolves, and fails loudly if the command itself is broken.
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=os.path.dirname(AUTOLYSIS), stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, text=True)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != expected_returncode:
+            raise RuntimeError(f"{' '.join(command)} exited with {result.returncode}: {result.stderr.strip()}")
+    return min(timings)
+
+
+def bench_imports(dataset, repeat, max_seconds):
+    """
+    Guard the fast-start path of autolysis.py against regressions.
+
+    Measures the wall time of a bare interpreter, of `import autolysis` and of a usage error, and checks which heavy
+    modules a --profile-only run imports (when a dataset is given).
+
+    :param dataset: Optional CSV used for the --profile-only check
+    :param repeat: Number of runs per measurement, the best one is reported
+    :param max_seconds: Budget for importing autolysis on top of the bare interpreter start
+    :return: True if the budget holds and --profile-only imports none of PLOTTING_AND_ML_MODULES
+    """
+    baseline = _best_wall_time([sys.executable, "-c", "pass"], repeat)
+    import_time = _best_wall_time([sys.executable, "-c", "import autolysis"], repeat)
+    usage_time = _best_wall_time([sys.executable, AUTOLYSIS], repeat, expected_returncode=2)
+    print(f"interpreter start:     {baseline:.3f}s")
+    print(f"import autolysis:      {import_time:.3f}s (+{import_time - baseline:.3f}s)")
+    print(f"usage error:           {usage_time:.3f}s (+{usage_time - baseline:.3f}s)")
+    ok = import_time - baseline <= max_seconds and usage_time - baseline <= max_seconds
+
+    if dataset:
+        # run the CLI in-process so the imported modules can be inspected afterwards
+        script = (
+            "import json, runpy, sys\n"
+            f"sys.argv = [{AUTOLYSIS!r}, '--profile-only', {os.path.abspath(dataset)!r}]\n"
+            "try:\n"
+            f"    runpy.run_path({AUTOLYSIS!r}, run_name='__main__')\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            f"heavy = sorted({{m.split('.')[0] for m in sys.modules}} & set({PLOTTING_AND_ML_MODULES!r}))\n"
+            "sys.stderr.write(json.dumps(heavy))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", script], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                text=True)
+        heavy = json.loads(result.stderr.strip().splitlines()[-1])
+        print(f"--profile-only loaded: {', '.join(heavy) or 'no plotting or ML modules'}")
+        ok = ok and not heavy
+
+    print("OK" if ok else f"REGRESSION (budget {max_seconds:.2f}s, heavy modules must not load in --profile-only)")
+    return ok
+
+
+def bench_stream(dataset, story_words, word_delay):
+    """
+    Compare the batched and the streamed README stage against a stub that generates the stories word by word.
+
+    Reports the total time and, when streamed, the time until the first README section is on disk.
+
+    :param dataset: CSV file the plots are made from
+    :param story_words: Words per image story
+    :param word_delay: Seconds between the words the stub sends
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = autolysis.load_dataset(dataset)
+        figures = [autolysis.generate_scatterplot(df), autolysis.generate_correlation_heatmap(df),
+                   autolysis.generate_cluster_data(df)]
+    figures = [figure for figure in figures if figure is not None]
+    headers_json = autolysis.get_headers_as_json(df)
+    with stub_llm_server(story_words, word_delay) as endpoint:
+        client = autolysis.LLMClient("benchmark", endpoint=endpoint, max_retries=0)
+        for stream in (False, True):
+            with tempfile.TemporaryDirectory() as readme_dir:
+                trace = autolysis.RunTrace(os.path.join(readme_dir, "trace.json"))
+                with contextlib.redirect_stdout(io.StringIO()), trace.stage("readme") as entry:
+                    autolysis.process_images_and_create_readme(df, dataset, "benchmark", headers_json,
+                                                               output_dir=readme_dir, client=client, figures=figures,
+                                                               trace=trace, stream=stream)
+                first = entry.get("first_section_seconds")
+                print(f"{'streamed' if stream else 'batched':<9} total {entry['wall_seconds']:>7.2f}s   "
+                      f"first section {f'{first:.2f}s' if first is not None else 'at the end'}")
+
+
+def parse_args(argv=None):
+    """
+    Parse the command-line arguments.
+
+    :param argv: Optional list of arguments, defaults to sys.argv[1:]
+    :return: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(prog="uv run benchmark.py", description="Performance benchmarks for autolysis.py.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    clustering = subparsers.add_parser("clustering", help="chosen k and runtime of find_optimal_k, original vs scalable")
+    clustering.add_argument("--sizes", type=lambda value: [int(v) for v in value.split(",")],
+                            default=[500, 5_000, 20_000, 100_000], help="comma separated row counts")
+    clustering.add_argument("--max-k", type=int, default=15)
+    clustering.add_argument("--true-k", type=int, default=4)
+    clustering.add_argument("--features", type=int, default=10)
+    clustering.add_argument("--jobs", type=int, default=4)
+
+    imports = subparsers.add_parser("imports", help="import time of autolysis.py and modules loaded by --profile-only")
+    imports.add_argument("--dataset", default=None, help="CSV used to check the modules --profile-only imports")
+    imports.add_argument("--repeat", type=int, default=5)
+    imports.add_argument("--max-seconds", type=float, default=0.25,
+                         help="budget for importing autolysis / reporting a usage error on top of interpreter start")
+
+    stream = subparsers.add_parser("stream", help="time to the first README section, batched vs streamed response")
+    stream.add_argument("dataset", help="CSV file the plots are made from")
+    stream.add_argument("--story-words", type=int, default=250, help="words per image story (default: 250)")
+    stream.add_argument("--word-delay", type=float, default=0.005,
+                        help="seconds between the words the stub sends (default: 0.005)")
+
+    generate = subparsers.add_parser("generate", help="write a synthetic CSV dataset")
+    generate.add_argument("output", help="CSV file to write")
+    generate.add_argument("--rows", type=_count, default=10_000, help="number of rows, k/M suffixes allowed")
+    suite = subparsers.add_parser("suite", help="time every public function of autolysis.py at several scales and "
+                                                "compare with earlier commits")
+    suite.add_argument("--rows", type=lambda value: [_count(v) for v in value.split(",")], default=[1_000, 10_000, 100_000],
+                       help="comma separated row counts, k/M suffixes allowed (default: 1k,10k,100k; up to 10M)")
+    for command in (generate, suite):
+        command.add_argument("--numeric", type=int, default=8, help="number of numeric columns")
+        command.add_argument("--categorical", type=int, default=2, help="number of categorical columns")
+        command.add_argument("--null-rate", type=float, default=0.05, help="probability of a missing value per cell")
+        command.add_argument("--correlation", type=float, default=0.8,
+                             help="correlation of the first two numeric columns, the others fall off to 0")
+        command.add_argument("--encoding", default="utf-8", help="file encoding, e.g. utf-8, latin-1, cp1252, utf-16")
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--max-k", type=int, default=5)
+    suite.add_argument("--results", default=RESULTS_FILE, help=f"JSON lines history (default: {RESULTS_FILE})")
+    suite.add_argument("--data-dir", default=DATA_DIR, help="where the generated datasets are kept between runs")
+    suite.add_argument("--baseline", default=None, help="commit to compare against (default: the previous one)")
+    suite.add_argument("--tolerance", type=float, default=1.25,
+                       help="slowdown ratio above which a function counts as regressed (default: 1.25)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.benchmark == "clustering":
+        bench_clustering(args.sizes, args.max_k, args.true_k, args.features, args.jobs)
+    elif args.benchmark == "imports":
+        sys.exit(0 if bench_imports(args.dataset, args.repeat, args.max_seconds) else 1)
+    elif args.benchmark == "stream":
+        bench_stream(args.dataset, args.story_words, args.word_delay)
+    elif args.benchmark == "generate":
+        generate_dataset(args.output, args.rows, args.numeric, args.categorical, args.null_rate, args.correlation,
+                         args.encoding)
+        print(f"Wrote {args.rows:,} rows to {args.output}")
+    elif args.benchmark == "suite":
+        ok = bench_suite(args.rows, args.numeric, args.categorical, args.null_rate, args.correlation, args.encoding,
+                         args.repeat, args.max_k, args.results, args.data_dir, args.baseline, args.tolerance)
+        sys.exit(0 if ok else 1)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# autolysis.py and benchmark.py are plain scripts in the repository root, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+
+import pandas as pd
+import pytest
+
+import autolysis
+from benchmark import stub_llm_server
+
+
+def test_dataset_without_numeric_columns_is_skipped(tmp_path):
+    dataset = tmp_path / "text.csv"
+    pd.DataFrame({"a": ["x", "y", "z"], "b": ["u", "v", "w"]}).to_csv(dataset, index=False)
+    with stub_llm_server() as endpoint:
+        options = {"output_dir": str(tmp_path / "out"), "cache_dir": None, "llm_settings": {"endpoint": endpoint}}
+        result = autolysis._analyze_dataset_job(str(dataset), "test", options)
+        numeric_only = autolysis._analyze_dataset_job(str(dataset), "test", dict(options, numeric_only=True))
+    assert result["status"] == numeric_only["status"] == "skipped"
+    assert result["error"] == "no numeric columns to analyze"
+    assert not os.path.exists(str(tmp_path / "out" / "README.md"))
+
+
+def _fake_analyze_dataset(dataset_file, api_key, **options):
+    name = os.path.basename(dataset_file)
+    if name == "crash.csv":
+        os._exit(1)  # like a worker killed by the OOM killer
+    if name == "text.csv":
+        return None
+    if name == "bad.csv":
+        raise ValueError("broken file")
+    return options.get("output_dir") or "out"
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="the workers only see the patched analyze_dataset when they are forked")
+def test_a_dying_worker_only_fails_its_own_dataset(monkeypatch):
+    monkeypatch.setattr(autolysis, "analyze_dataset", _fake_analyze_dataset)
+    datasets = ["a.csv", "crash.csv", "b.csv", "text.csv", "bad.csv", "c.csv"]
+    results = autolysis.run_batch(datasets, "test", workers=2)
+    assert [result["dataset"] for result in results] == datasets
+    assert {result["dataset"]: result["status"] for result in results} == {
+        "a.csv": "ok", "crash.csv": "failed", "b.csv": "ok", "text.csv": "skipped", "bad.csv": "failed", "c.csv": "ok"}
+    errors = {result["dataset"]: result["error"] for result in results}
+    assert errors["crash.csv"].startswith("worker process died")
+    assert errors["bad.csv"] == "ValueError: broken file"
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+import autolysis
+
+AUTOLYSIS = os.path.abspath(autolysis.__file__)
+HEAVY_MODULES = ["matplotlib", "seaborn", "sklearn", "requests", "PIL"]
+
+# runs the CLI in-process, then reports the imported top-level modules on stderr
+SCRIPT = """
+import json, runpy, sys
+sys.argv = [{path!r}] + {args!r}
+try:
+    runpy.run_path({path!r}, run_name='__main__')
+except SystemExit as e:
+    code = e.code
+except Exception as e:
+    code = type(e).__name__ + ': ' + str(e)
+else:
+    code = 0
+sys.stderr.write(json.dumps({{"code": code, "modules": sorted({{m.split('.')[0] for m in sys.modules}})}}))
+"""
+
+
+def _run(args, tmp_path):
+    env = {key: value for key, value in os.environ.items() if key != "AIPROXY_TOKEN"}
+    result = subprocess.run([sys.executable, "-c", SCRIPT.format(path=AUTOLYSIS, args=args)], cwd=str(tmp_path),
+                            env=env, capture_output=True, text=True, timeout=120)
+    return result.stdout, json.loads(result.stderr.strip().splitlines()[-1])
+
+
+def test_import_loads_no_heavy_dependency(tmp_path):
+    _, report = _run(["--help"], tmp_path)
+    assert report["code"] == 0
+    assert not set(report["modules"]) & set(HEAVY_MODULES + ["pandas", "numpy", "chardet"])
+
+
+def test_profile_only_needs_pandas_but_no_token_or_plotting(tmp_path):
+    dataset = tmp_path / "data.csv"
+    pd.DataFrame({"a": [1, 2, 3, 4], "b": [2.5, 3.5, None, 1.0], "c": list("wxyz")}).to_csv(dataset, index=False)
+    for extra in ([], ["--streaming-profile"]):
+        stdout, report = _run(["--profile-only", *extra, str(dataset)], tmp_path)
+        assert report["code"] == 0
+        assert "pandas" in report["modules"]
+        assert not set(report["modules"]) & set(HEAVY_MODULES)
+        # the profile is printed after the loading log lines
+        lines = stdout.splitlines()
+        profile = json.loads("\n".join(lines[lines.index("{"):]))
+        assert profile["shape"] == [4, 3]
+        assert profile["null_values"]["b"] == 1
+    # nothing but the profile is produced
+    assert sorted(os.listdir(str(tmp_path))) == ["data.csv"]
+
+
+def test_missing_token_is_reported_before_the_dataset_is_read(tmp_path):
+    dataset = tmp_path / "data.csv"
+    pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}).to_csv(dataset, index=False)
+    _, report = _run(["--stratify", "b", str(dataset)], tmp_path)
+    assert report["code"] == "ValueError: AIPROXY_TOKEN environment variable not set."
+    assert not set(report["modules"]) & set(HEAVY_MODULES + ["pandas", "numpy", "chardet"])
+
+
+def test_profile_only_checks_the_stratify_column_after_loading(tmp_path):
+    dataset = tmp_path / "data.csv"
+    pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}).to_csv(dataset, index=False)
+    for extra in ([], ["--streaming-profile"]):
+        _, report = _run(["--profile-only", *extra, "--stratify", "missing", str(dataset)], tmp_path)
+        assert report["code"] == f"--stratify column 'missing' not found in {dataset}"
+        _, report = _run(["--profile-only", *extra, "--stratify", "b", str(dataset)], tmp_path)
+        assert report["code"] == 0
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.decomposition import PCA
+
+import autolysis
+
+
+def _blobs(rows=3_000, k=4, seed=0):
+    data, _ = make_blobs(n_samples=rows, centers=k, n_features=5, cluster_std=0.6, random_state=seed)
+    return data
+
+
+@pytest.mark.parametrize("algorithm", ["kmeans", "minibatch"])
+def test_finds_the_true_k(algorithm):
+    assert autolysis.find_optimal_k(_blobs(), max_k=6, algorithm=algorithm, silhouette_sample_size=500) == 4
+
+
+def test_parallel_sweep_matches_the_serial_one():
+    data = _blobs()
+    serial = autolysis.sweep_k(data, max_k=5, silhouette_sample_size=500)
+    parallel = autolysis.sweep_k(data, max_k=5, silhouette_sample_size=500, n_jobs=3)
+    assert [k for k, _, _, _ in parallel] == [2, 3, 4, 5]
+    for (_, inertia, score, _), (_, parallel_inertia, parallel_score, _) in zip(serial, parallel):
+        assert parallel_inertia == pytest.approx(inertia)
+        assert parallel_score == pytest.approx(score)
+
+
+def test_sampled_silhouette_is_close_to_the_exact_one():
+    data = _blobs(rows=2_000)
+    exact = [score for _, _, score, _ in autolysis.sweep_k(data, max_k=5, silhouette_sample_size=None)]
+    sampled = [score for _, _, score, _ in autolysis.sweep_k(data, max_k=5, silhouette_sample_size=500)]
+    assert int(np.argmax(sampled)) == int(np.argmax(exact))
+    assert np.allclose(sampled, exact, atol=0.05)
+
+
+def _correlated_frame(rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(rows, 2))
+    mixing = rng.normal(size=(2, 5))
+    df = pd.DataFrame(base @ mixing + rng.normal(scale=0.1, size=(rows, 5)), columns=list("abcde"))
+    df["e"] *= 100  # a wide column, standardizing must keep it from dominating
+    df.loc[::13, "b"] = np.nan
+    return df
+
+
+def _reference_projection(df):
+    # PCA of the mean-imputed, standardized table, fitted in one go
+    standardized = ((df.fillna(df.mean()) - df.mean()) / df.std()).to_numpy()
+    reference = PCA(n_components=2).fit(standardized)
+    return reference.transform(standardized), reference.explained_variance_ratio_
+
+
+def test_svd_projection_matches_pca_on_the_full_table():
+    df = _correlated_frame()
+    transform, explained = autolysis.fit_projection(df, list(df.columns), method="svd", batch_rows=64)
+    expected, expected_ratio = _reference_projection(df)
+    projected = transform(df)
+    assert projected.shape == (len(df), 2)
+    assert np.allclose(explained, expected_ratio)
+    # components are defined up to their sign
+    signs = np.sign(np.sum(projected * expected, axis=0))
+    assert np.allclose(projected * signs, expected, atol=1e-8)
+
+
+def test_incremental_pca_is_close_to_pca_on_the_full_table():
+    df = _correlated_frame()
+    transform, explained = autolysis.fit_projection(df, list(df.columns), method="pca", batch_rows=64)
+    expected, expected_ratio = _reference_projection(df)
+    projected = transform(df)
+    # IncrementalPCA only carries two components from batch to batch, so it is close to the exact fit but not equal
+    assert np.allclose(explained, expected_ratio, atol=1e-2)
+    for component in range(2):
+        assert abs(np.corrcoef(projected[:, component], expected[:, component])[0, 1]) > 0.99
+    # one batch holding every row is the exact fit
+    transform, _ = autolysis.fit_projection(df, list(df.columns), method="pca", batch_rows=len(df))
+    signs = np.sign(np.sum(transform(df) * expected, axis=0))
+    assert np.allclose(transform(df) * signs, expected, atol=1e-8)
+
+
+def test_projection_rejects_unknown_methods():
+    df = _correlated_frame()
+    with pytest.raises(ValueError):
+        autolysis.fit_projection(df, list(df.columns), method="tsne")
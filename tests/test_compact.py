@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import autolysis
+
+
+def _frame(rows=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "small": rng.integers(-100, 100, size=rows),
+        "unsigned": rng.integers(0, 60_000, size=rows),
+        "large": rng.integers(-2**40, 2**40, size=rows),
+        "halves": rng.integers(0, 100, size=rows) / 2,  # exact in float32
+        "noise": rng.normal(size=rows),  # needs float64
+        "flag": rng.random(rows) < 0.5,
+        "city": rng.choice(["Oslo", "Lima", "Pune"], size=rows),
+        "id": [f"row{index}" for index in range(rows)],
+    })
+
+
+@pytest.mark.parametrize("values, dtype", [
+    ([0, 255], np.uint8),
+    ([0, 256], np.uint16),
+    ([-128, 127], np.int8),
+    ([-129, 127], np.int16),
+    ([-2**31, 2**31 - 1], np.int32),
+    ([-2**31 - 1, 0], np.int64),
+    ([0, 2**32], np.uint64),
+])
+def test_integers_get_the_smallest_type_holding_their_range(values, dtype):
+    compact = autolysis.compact_dataframe(pd.DataFrame({"a": np.array(values, dtype=np.int64)}))
+    assert compact["a"].dtype == dtype
+    assert compact["a"].tolist() == values
+
+
+def test_floats_become_float32_only_when_exact():
+    df = pd.DataFrame({"exact": [0.5, 1.25, np.nan, -3.0], "inexact": [0.1, 1.25, np.nan, -3.0]})
+    compact = autolysis.compact_dataframe(df)
+    assert compact["exact"].dtype == np.float32
+    assert compact["inexact"].dtype == np.float64
+    np.testing.assert_array_equal(compact["exact"].to_numpy(dtype=np.float64), df["exact"].to_numpy())
+
+
+@pytest.mark.parametrize("distinct, categorical", [(5, True), (10, True), (11, False)])
+def test_strings_become_categorical_up_to_the_ratio(distinct, categorical):
+    values = [f"v{index % distinct}" for index in range(20)] + [None]
+    compact = autolysis.compact_dataframe(pd.DataFrame({"a": values}), category_ratio=0.5)
+    assert isinstance(compact["a"].dtype, pd.CategoricalDtype) == categorical
+    assert compact["a"].tolist()[:-1] == values[:-1]
+    assert compact["a"].isna().tolist() == [False] * 20 + [True]
+
+
+def test_mixed_objects_and_booleans_are_left_alone():
+    df = pd.DataFrame({"mixed": pd.Series([1, "a", 2.5, "a"], dtype=object), "flag": [True, False, True, True]})
+    compact = autolysis.compact_dataframe(df)
+    pd.testing.assert_frame_equal(compact, df)
+
+
+def test_values_survive_and_the_input_is_unchanged():
+    df = _frame()
+    original = df.copy()
+    compact = autolysis.compact_dataframe(df)
+    pd.testing.assert_frame_equal(df, original)
+    pd.testing.assert_frame_equal(compact, df, check_dtype=False, check_categorical=False)
+    stats = compact.attrs["memory_stats"]
+    assert stats["after_bytes"] < stats["before_bytes"]
+    # int64 values beyond 32 bits and inexact floats keep their type; "id" only changes on pandas < 3
+    assert set(stats["conversions"]) - {"id"} == {"small", "unsigned", "halves", "city"}
+
+
+def test_numeric_selection_and_correlations_are_unchanged():
+    df = _frame()
+    compact = autolysis.compact_dataframe(df)
+    numeric = df.select_dtypes(include="number").columns
+    assert compact.select_dtypes(include="number").columns.equals(numeric)
+    pd.testing.assert_frame_equal(compact[numeric].corr(), df[numeric].corr(), rtol=1e-12)
+    # float32 columns hold the same values, but their aggregates are computed in float32
+    pd.testing.assert_frame_equal(compact[numeric].describe(), df[numeric].describe(), rtol=1e-6)
@@ -0,0 +1,55 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+import autolysis
+
+
+def _frame(rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=rows)
+    df = pd.DataFrame({
+        "x": x,
+        "y": 2 * x + rng.normal(scale=0.5, size=rows),
+        "z": rng.integers(0, 50, size=rows).astype(float),
+        "label": rng.choice(["a", "b", "c"], size=rows),
+    })
+    df.loc[::17, "z"] = np.nan
+    return df
+
+
+def test_context_matches_the_direct_computations():
+    df = _frame()
+    ctx = autolysis.AnalysisContext(df)
+    assert ctx.numeric_columns == ["x", "y", "z"]
+    pdt.assert_frame_equal(ctx.correlation_matrix, df[["x", "y", "z"]].corr())
+    pdt.assert_frame_equal(ctx.describe, df.describe())
+    pdt.assert_series_equal(ctx.null_counts, df.isnull().sum())
+
+
+def test_statistics_are_computed_once():
+    ctx = autolysis.AnalysisContext(_frame())
+    assert ctx.describe is ctx.describe
+    assert ctx.correlation_matrix is ctx.correlation_matrix
+    assert ctx.null_counts is ctx.null_counts
+
+
+def test_profile_is_the_same_with_a_shared_context():
+    df = _frame()
+    # compared as JSON, the NaN statistics of the sparse column never compare equal as floats
+    shared = autolysis.profile_dataset(df, autolysis.AnalysisContext(df))
+    assert json.dumps(shared, default=str) == json.dumps(autolysis.profile_dataset(df), default=str)
+
+
+def test_plots_leave_the_dataframe_untouched(tmp_path):
+    df = _frame()
+    original = df.copy()
+    ctx = autolysis.AnalysisContext(df)
+    describe = ctx.describe
+    autolysis.generate_scatterplot(df, str(tmp_path), ctx=ctx)
+    autolysis.generate_correlation_heatmap(df, str(tmp_path), ctx=ctx)
+    autolysis.generate_cluster_data(df, str(tmp_path), ctx=ctx)
+    pdt.assert_frame_equal(df, original)
+    pdt.assert_frame_equal(ctx.describe, describe)
@@ -0,0 +1,87 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import autolysis
+
+
+def _frame(rows=500, columns=23, missing=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(rows, 4))
+    values = base @ rng.normal(size=(4, columns)) + rng.normal(scale=0.5, size=(rows, columns))
+    values[rng.random(values.shape) < missing] = np.nan
+    df = pd.DataFrame(values, columns=[f"c{index}" for index in range(columns)])
+    df["label"] = "x"  # non-numeric columns are ignored
+    return df
+
+
+def _expected_pairs(matrix, k, signed=False):
+    columns = matrix.columns
+    pairs = [(columns[i], columns[j], matrix.iat[i, j]) for i in range(len(columns))
+             for j in range(i + 1, len(columns)) if not np.isnan(matrix.iat[i, j])]
+    pairs.sort(key=lambda pair: pair[2] if signed else abs(pair[2]), reverse=True)
+    return pairs[:k]
+
+
+def _assert_same_pairs(pairs, expected):
+    assert len(pairs) == len(expected)
+    assert {frozenset(pair[:2]) for pair in pairs} == {frozenset(pair[:2]) for pair in expected}
+    values = {frozenset(pair[:2]): pair[2] for pair in expected}
+    for column_a, column_b, value in pairs:
+        assert value == pytest.approx(values[frozenset((column_a, column_b))], abs=1e-9)
+
+
+@pytest.mark.parametrize("missing", [0.0, 0.2])
+@pytest.mark.parametrize("block_size", [4, 7, 256])
+@pytest.mark.parametrize("signed", [False, True])
+def test_top_pairs_match_dataframe_corr(missing, block_size, signed):
+    df = _frame(missing=missing)
+    matrix = df.select_dtypes(include="number").corr()
+    pairs = autolysis.correlation_top_pairs(df, k=30, block_size=block_size, signed=signed)
+    _assert_same_pairs(pairs, _expected_pairs(matrix, 30, signed))
+
+
+def test_blocks_cover_the_upper_triangle_of_the_matrix():
+    # one block complete, the others with missing values, so both formulas meet in the mixed blocks
+    df = _frame(columns=12, missing=0.0)
+    df.loc[::5, ["c5", "c9", "c11"]] = np.nan
+    columns = [column for column in df.columns if column != "label"]
+    expected = df[columns].corr().to_numpy()
+    for row_offset, col_offset, corr in autolysis._correlation_blocks(df, columns, block_size=5):
+        rows, cols = corr.shape
+        np.testing.assert_allclose(corr, expected[row_offset:row_offset + rows, col_offset:col_offset + cols],
+                                   atol=1e-12)
+
+
+def test_spearman_matches_dataframe_corr_without_missing_values():
+    df = _frame()
+    df["c3"] = np.exp(df["c3"])  # monotonic, only the ranks matter
+    matrix = df.select_dtypes(include="number").corr(method="spearman")
+    pairs = autolysis.correlation_top_pairs(df, k=20, method="spearman", block_size=6)
+    _assert_same_pairs(pairs, _expected_pairs(matrix, 20))
+
+
+def test_sparse_pairs_and_unknown_methods():
+    df = pd.DataFrame({"a": [1.0, 2.0, np.nan, np.nan], "b": [np.nan, np.nan, 1.0, 2.0], "c": [1.0, 2.0, 3.0, 5.0]})
+    # a and b never overlap, that pair has no correlation and is left out
+    pairs = autolysis.correlation_top_pairs(df, k=5, block_size=1)
+    assert {frozenset(pair[:2]) for pair in pairs} == {frozenset("ac"), frozenset("bc")}
+    with pytest.raises(ValueError):
+        autolysis.correlation_top_pairs(df, method="kendall")
+
+
+def test_input_is_not_modified_and_temporaries_stay_per_block():
+    df = _frame(rows=10_000, columns=240, missing=0.1)
+    original = df.copy()
+    table_bytes = df.select_dtypes(include="number").memory_usage(index=False).sum()
+    tracemalloc.start()
+    try:
+        autolysis.correlation_top_pairs(df, k=10, block_size=8)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    pd.testing.assert_frame_equal(df, original)
+    # two blocks of 8 out of 240 columns with their masks and products, far below one copy of the table
+    assert peak < 0.5 * table_bytes
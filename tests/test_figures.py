@@ -0,0 +1,63 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+import autolysis
+
+
+def _frame(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=rows)
+    return pd.DataFrame({"x": x, "y": x + rng.normal(scale=0.3, size=rows), "z": rng.normal(size=rows)})
+
+
+def _generate_all(df, output_dir=None):
+    return [autolysis.generate_scatterplot(df, output_dir), autolysis.generate_correlation_heatmap(df, output_dir),
+            autolysis.generate_cluster_data(df, output_dir)]
+
+
+def test_plots_render_to_memory_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    figures = _generate_all(_frame())
+    assert [figure.name for figure in figures] == ["x_y_scatterplot.png", "correlation_heatmap.png",
+                                                   "clustering_plot.png"]
+    for figure in figures:
+        assert figure.mime_type == "image/png"
+        assert figure.metadata["dpi"] == autolysis.PLOT_DPI
+        assert Image.open(io.BytesIO(figure.data)).format == "PNG"
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_output_dir_gets_the_same_bytes(tmp_path):
+    figures = _generate_all(_frame(), str(tmp_path))
+    for figure in figures:
+        with open(os.path.join(str(tmp_path), figure.name), "rb") as f:
+            assert f.read() == figure.data
+
+
+def test_figure_writer_writes_in_the_background(tmp_path):
+    figures = _generate_all(_frame())
+    writer = autolysis.FigureWriter(str(tmp_path))
+    for figure in figures + [None]:
+        writer.write(figure)
+    writer.close()
+    assert sorted(os.listdir(str(tmp_path))) == sorted(figure.name for figure in figures)
+
+
+def test_scatterplot_switches_to_density_above_the_threshold():
+    df = _frame(rows=2_000)
+    assert not autolysis.generate_scatterplot(df, density_threshold=None).metadata["density"]
+    assert not autolysis.generate_scatterplot(df, density_threshold=2_000).metadata["density"]
+    assert autolysis.generate_scatterplot(df, density_threshold=1_999).metadata["density"]
+
+
+def test_cluster_plot_switches_to_density_above_the_threshold():
+    df = _frame(rows=2_000)
+    markers = autolysis.generate_cluster_data(df, sample_size=1_000, density_threshold=5_000)
+    density = autolysis.generate_cluster_data(df, sample_size=1_000, density_threshold=500)
+    assert not markers.metadata["density"]
+    assert density.metadata["density"]
+    assert density.metadata["k"] == markers.metadata["k"]
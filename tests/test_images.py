@@ -0,0 +1,62 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import autolysis
+
+
+def _png(width, height, seed=0):
+    # a gradient with noise, so the image neither compresses to nothing nor is pure noise
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width)[None, :, None] * np.ones((height, 1, 3))
+    pixels = np.clip(gradient + rng.normal(scale=40, size=(height, width, 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _size(data):
+    return Image.open(io.BytesIO(data)).size
+
+
+@pytest.mark.parametrize("image_format, mime_type", [("png", "image/png"), ("jpeg", "image/jpeg"),
+                                                     ("webp", "image/webp")])
+def test_downscales_to_the_max_edge(image_format, mime_type):
+    options = autolysis.ImageOptimization(max_edge=400, image_format=image_format)
+    data, mime = autolysis.optimize_image(_png(1200, 600), options)
+    assert mime == mime_type
+    assert _size(data) == (400, 200)
+
+
+@pytest.mark.parametrize("image_format", ["png", "jpeg", "webp"])
+def test_fits_the_byte_budget(image_format):
+    original = _png(800, 600)
+    options = autolysis.ImageOptimization(image_format=image_format)
+    budget = 30_000
+    data, _ = autolysis.optimize_image(original, options, max_bytes=budget)
+    assert len(data) <= budget < len(original)
+
+
+def test_budget_is_shared_between_the_images():
+    images = [_png(800, 600, seed) for seed in range(3)]
+    options = autolysis.ImageOptimization(image_format="jpeg", byte_budget=60_000)
+    optimized = autolysis.optimize_images(images, ["a.png", "b.png", "c.png"], options)
+    assert len(optimized) == 3
+    assert all(len(data) <= 20_000 and mime == "image/jpeg" for data, mime in optimized)
+
+
+def test_original_and_disabled_send_the_bytes_unchanged():
+    original = _png(800, 600)
+    data, mime = autolysis.optimize_image(original, autolysis.ImageOptimization(image_format="original"))
+    assert (data, mime) == (original, "image/png")
+    assert autolysis.optimize_images([original], ["a.png"], None) == [(original, "image/png")]
+
+
+def test_keeps_a_compact_png_that_would_grow():
+    # already a quantized, optimized PNG, re-encoding it cannot make it smaller
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30), "white").quantize(colors=256).save(buffer, format="PNG", optimize=True)
+    original = buffer.getvalue()
+    assert autolysis.optimize_image(original, autolysis.ImageOptimization()) == (original, "image/png")
@@ -0,0 +1,82 @@
+import io
+import os
+import time
+
+from PIL import Image
+
+import autolysis
+from benchmark import stub_llm_server
+
+HEADERS = '{"headers": ["a", "b"]}'
+
+
+def _figure(name, color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 24), color).save(buffer, format="PNG")
+    return autolysis.RenderedFigure(name=name, data=buffer.getvalue())
+
+
+def _analyze(endpoint, cache, images, headers_json=HEADERS):
+    client = autolysis.LLMClient("test", endpoint=endpoint, max_retries=0)
+    return autolysis.get_batched_image_analysis("test", images, headers_json, cache=cache, client=client,
+                                                image_options=None)
+
+
+def test_hit_skips_the_request(tmp_path):
+    cache = autolysis.LLMResponseCache(str(tmp_path))
+    images = [_figure("a.png", "red"), _figure("b.png", "blue")]
+    received = []
+    with stub_llm_server(received=received) as endpoint:
+        first = _analyze(endpoint, cache, images)
+        second = _analyze(endpoint, cache, images)
+    assert first and second == first
+    assert len(received) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_changed_inputs_miss(tmp_path):
+    cache = autolysis.LLMResponseCache(str(tmp_path))
+    images = [_figure("a.png", "red")]
+    received = []
+    with stub_llm_server(received=received) as endpoint:
+        _analyze(endpoint, cache, images)
+        _analyze(endpoint, cache, images, headers_json='{"headers": ["a", "c"]}')
+        _analyze(endpoint, cache, [_figure("a.png", "green")])
+    assert len(received) == 3
+    assert cache.stats() == {"hits": 0, "misses": 3}
+
+
+def test_failed_request_is_not_cached(tmp_path):
+    cache = autolysis.LLMResponseCache(str(tmp_path))
+    images = [_figure("a.png", "red")]
+    received = []
+    with stub_llm_server(faults=[{"status": 500}], received=received) as endpoint:
+        assert _analyze(endpoint, cache, images) is None
+        assert _analyze(endpoint, cache, images)
+    assert len(received) == 2
+    assert cache.stats() == {"hits": 0, "misses": 2}
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = autolysis.LLMResponseCache(str(tmp_path), max_age=60)
+    cache.put("key", "story")
+    old = time.time() - 120
+    os.utime(os.path.join(str(tmp_path), "key.json"), (old, old))
+    assert cache.get("key") is None
+    assert cache.stats() == {"hits": 0, "misses": 1}
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    cache = autolysis.LLMResponseCache(str(tmp_path), max_bytes=10_000)
+    content = "x" * 4_000
+    for index, key in enumerate(["first", "second"]):
+        cache.put(key, content)
+        # distinct mtimes, the eviction order must not depend on the file system's timestamp resolution
+        stamp = time.time() - 100 + index
+        os.utime(os.path.join(str(tmp_path), f"{key}.json"), (stamp, stamp))
+    assert cache.get("first") == content  # now the most recently used one
+    cache.put("third", content)
+    assert cache.get("second") is None
+    assert cache.get("first") == content
+    assert cache.get("third") == content
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".tmp")]
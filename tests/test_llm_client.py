@@ -0,0 +1,80 @@
+import time
+
+import pytest
+import requests
+
+import autolysis
+from benchmark import stub_llm_server
+
+PAYLOAD = {"model": autolysis.LLM_MODEL, "messages": [{"role": "user", "content": [{"type": "text", "text": "hi"}]}]}
+
+
+def _client(endpoint, **settings):
+    # no real backoff, so the tests only wait where the server asks them to
+    settings = {"backoff_base": 0.01, "backoff_max": 0.01, **settings}
+    return autolysis.LLMClient("test", endpoint=endpoint, **settings)
+
+
+def test_retries_5xx_until_success():
+    received = []
+    with stub_llm_server(faults=[{"status": 503}, {"status": 502}], received=received) as endpoint:
+        client = _client(endpoint, max_retries=3)
+        response = client.post_json(PAYLOAD)
+    assert response.status_code == 200
+    assert len(received) == 3
+    assert [metric["status"] for metric in client.metrics] == [503, 502, 200]
+    assert [metric["error"] for metric in client.metrics] == ["HTTP 503", "HTTP 502", None]
+
+
+def test_honors_retry_after():
+    received = []
+    with stub_llm_server(faults=[{"status": 429, "retry_after": "1"}], received=received) as endpoint:
+        client = _client(endpoint, max_retries=1)
+        start = time.perf_counter()
+        client.post_json(PAYLOAD)
+        elapsed = time.perf_counter() - start
+    assert len(received) == 2
+    # the 0.01s backoff would be used without the header
+    assert elapsed >= 1.0
+
+
+def test_gives_up_after_max_retries():
+    received = []
+    with stub_llm_server(faults=[{"status": 500}] * 5, received=received) as endpoint:
+        client = _client(endpoint, max_retries=2)
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.post_json(PAYLOAD)
+    assert len(received) == 3
+    assert [metric["status"] for metric in client.metrics] == [500, 500, 500]
+
+
+def test_does_not_retry_client_errors():
+    received = []
+    with stub_llm_server(faults=[{"status": 400}], received=received) as endpoint:
+        client = _client(endpoint, max_retries=3)
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.post_json(PAYLOAD)
+    assert len(received) == 1
+    assert client.metrics[0]["error"] == "HTTPError"
+
+
+def test_retries_read_timeout():
+    received = []
+    with stub_llm_server(faults=[{"delay": 1.0}], received=received) as endpoint:
+        client = _client(endpoint, read_timeout=0.2, max_retries=1)
+        response = client.post_json(PAYLOAD)
+    assert response.status_code == 200
+    assert len(received) == 2
+    assert client.metrics[0]["error"] == "ReadTimeout"
+    assert client.metrics[0]["seconds"] < 1.0
+
+
+def test_latency_summary_counts_attempts_and_failures():
+    with stub_llm_server(faults=[{"status": 503}, {"delay": 0.2}]) as endpoint:
+        client = _client(endpoint, max_retries=1)
+        client.post_json(PAYLOAD)
+    summary = client.latency_summary()
+    assert summary["attempts"] == 2
+    assert summary["failures"] == 1
+    assert summary["max"] >= 0.2
+    assert summary["p50"] <= summary["p95"] <= summary["max"]
@@ -0,0 +1,86 @@
+import gzip
+import warnings
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+import autolysis
+
+FRAME = pd.DataFrame({
+    "id": [1, 2, 3, 4, 5],
+    "score": [0.5, 1.5, None, 3.5, 4.5],
+    "label": ["a", "b", "c", "d", "e"],
+})
+
+
+def _write(path, kind):
+    # the same table in every format load_dataset claims to read
+    table = pa.Table.from_pandas(FRAME, preserve_index=False)
+    if kind == "parquet":
+        pq.write_table(table, path)
+    elif kind == "feather_v1":
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            feather.write_feather(FRAME, path, version=1)
+    elif kind == "feather_v2":
+        feather.write_feather(table, path)
+    elif kind == "arrow":
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif kind == "csv_gz":
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            FRAME.to_csv(f, index=False)
+
+
+FORMATS = [
+    ("parquet", "data.parquet", "parquet"),
+    ("feather_v1", "data.feather", "feather"),
+    ("feather_v2", "data.feather", "arrow"),
+    ("arrow", "data.arrow", "arrow"),
+    ("csv_gz", "data.csv.gz", "csv"),
+]
+
+
+@pytest.fixture(params=FORMATS, ids=[kind for kind, _, _ in FORMATS])
+def dataset(request, tmp_path):
+    kind, name, file_format = request.param
+    path = tmp_path / name
+    _write(path, kind)
+    return str(path), file_format
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_load_dataset_reads_every_format(dataset):
+    path, file_format = dataset
+    df = autolysis.load_dataset(path)
+    assert df.attrs["load_stats"]["format"] == file_format
+    assert df.columns.tolist() == ["id", "score", "label"]
+    assert df["id"].tolist() == [1, 2, 3, 4, 5]
+    assert df["score"].isna().sum() == 1
+    assert df["label"].tolist() == ["a", "b", "c", "d", "e"]
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_load_dataset_projects_columns(dataset):
+    path, _ = dataset
+    assert autolysis.load_dataset(path, usecols=autolysis.NUMERIC_COLUMNS).columns.tolist() == ["id", "score"]
+    assert autolysis.load_dataset(path, usecols=["label", "id"]).columns.tolist() == ["id", "label"]
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_streaming_profile_reads_every_format(dataset):
+    path, _ = dataset
+    summary = autolysis.profile_dataset_streaming(path, chunksize=2).summary()
+    assert summary["shape"] == (5, 3)
+    assert summary["numerical_summary"]["id"]["mean"] == pytest.approx(3.0)
+    assert summary["null_values"]["score"] == 1
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_dataset_columns_reads_only_the_schema(dataset):
+    path, _ = dataset
+    assert autolysis.dataset_columns(path) == ["id", "score", "label"]
+    assert autolysis.dataset_columns(path, numeric=True) == ["id", "score"]
@@ -0,0 +1,48 @@
+import os
+import stat
+
+import pytest
+
+import autolysis
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def _save_outputs(directory):
+    manifest = autolysis.ArtifactManifest(str(directory))
+    manifest.save()
+    trace = autolysis.RunTrace(str(directory / "trace.json"))
+    trace.save()
+    return manifest.path, trace.path
+
+
+def test_manifest_and_trace_get_the_default_file_mode(tmp_path):
+    reference = tmp_path / "reference.txt"
+    reference.write_text("x")
+    for path in _save_outputs(tmp_path):
+        assert _mode(path) == _mode(reference)
+    assert sorted(os.listdir(str(tmp_path))) == ["autolysis_manifest.json", "reference.txt", "trace.json"]
+
+
+@pytest.mark.parametrize("umask", [0o077, 0o002])
+def test_the_umask_is_applied_when_writing(tmp_path, umask):
+    previous = os.umask(umask)
+    try:
+        paths = _save_outputs(tmp_path)
+    finally:
+        os.umask(previous)
+    for path in paths:
+        assert _mode(path) == 0o666 & ~umask
+
+
+def test_failed_write_leaves_the_old_file(tmp_path):
+    path = tmp_path / "out.json"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with autolysis._atomic_output(str(path)) as f:
+            f.write("half")
+            raise RuntimeError("crash")
+    assert path.read_text() == "old"
+    assert os.listdir(str(tmp_path)) == ["out.json"]
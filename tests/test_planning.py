@@ -0,0 +1,116 @@
+import io
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from PIL import Image
+
+import autolysis
+from benchmark import stub_llm_server
+
+HEADERS = json.dumps({"headers": [f"column_{index}" for index in range(40)]})
+
+
+def _image(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(buffer, format="PNG")
+    return buffer.getvalue(), "image/png"
+
+
+def _prompt_tokens(plan):
+    return autolysis.estimate_text_tokens(autolysis.build_story_prompt(plan.context))
+
+
+def test_images_are_packed_in_order_into_the_budget():
+    # gpt-4o-mini: a 512x512 image is one tile, 2833 + 5667 = 8500 tokens
+    images = [_image(512, 512)] * 5
+    prompt_tokens = _prompt_tokens(autolysis.plan_requests(images[:1], HEADERS))
+    plan = autolysis.plan_requests(images, HEADERS, token_budget=prompt_tokens + 2 * 8500)
+    assert plan.batches == [[0, 1], [2, 3], [4]]
+    assert plan.estimated_tokens == [prompt_tokens + 2 * 8500, prompt_tokens + 2 * 8500, prompt_tokens + 8500]
+    assert autolysis.plan_requests(images, HEADERS).batches == [[0, 1, 2, 3, 4]]
+
+
+def test_an_image_over_the_budget_gets_a_request_of_its_own():
+    # scaled to 768x768, four tiles
+    images = [_image(512, 512), _image(2048, 2048), _image(512, 512)]
+    plan = autolysis.plan_requests(images, HEADERS, token_budget=20_000)
+    assert plan.batches == [[0], [1], [2]]
+    assert plan.estimated_tokens[1] == _prompt_tokens(plan) + 2833 + 4 * 5667
+
+
+def _profile():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(50, 40)), columns=json.loads(HEADERS)["headers"])
+    return autolysis.profile_dataset(df)
+
+
+def test_the_context_is_trimmed_level_by_level():
+    profile = _profile()
+    levels = [(level, autolysis.estimate_text_tokens(autolysis.build_story_prompt(context)))
+              for level, context in autolysis._context_levels(HEADERS, profile)]
+    assert [level for level, _ in levels[:3]] == ["profile", "summary", "headers"]
+    assert levels[3][0].startswith("headers[:")
+    for level, tokens in levels:
+        # the smallest budget whose context share still holds this level
+        budget = math.ceil((tokens + 1) / autolysis.CONTEXT_TOKEN_SHARE)
+        plan = autolysis.plan_requests([_image(64, 64)], HEADERS, profile=profile, token_budget=budget)
+        assert plan.context_level == level
+        assert _prompt_tokens(plan) <= int(budget * autolysis.CONTEXT_TOKEN_SHARE)
+    # nothing fits: the smallest context is sent anyway
+    plan = autolysis.plan_requests([_image(64, 64)], HEADERS, profile=profile, token_budget=10)
+    assert plan.context_level == levels[-1][0] == "headers[:1]"
+
+
+def test_split_responses_are_renumbered_across_requests():
+    responses = [
+        (0, 2, "### Image 1\nFirst.\n\n### Image 2\nSecond."),
+        (2, 1, "Third, without its label."),
+        (3, 2, "### Image 2\nFifth.\n\n### Image 3\nNot one of the images of this request."),
+    ]
+    merged, missing = autolysis.merge_stories(responses)
+    assert autolysis.split_stories(merged) == {"1": "First.", "2": "Second.", "3": "Third, without its label.",
+                                               "5": "Fifth."}
+    assert missing == [4]
+
+
+def test_failed_requests_leave_their_images_without_a_story():
+    merged, missing = autolysis.merge_stories([(0, 2, None), (2, 2, "### Image 1\nThird.\n\n### Image 2\nFourth.")])
+    assert autolysis.split_stories(merged) == {"3": "Third.", "4": "Fourth."}
+    assert missing == [1, 2]
+    assert autolysis.merge_stories([(0, 1, None), (1, 1, "")]) == (None, [1, 2])
+
+
+def _dataset(path):
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=60)
+    pd.DataFrame({"x": x, "y": 2 * x + rng.normal(size=60), "z": rng.normal(size=60)}).to_csv(path, index=False)
+    return str(path)
+
+
+def _analyze(dataset, output_dir, endpoint, narration):
+    # a budget of one image per request; no retries, so a fault fails its request
+    return autolysis.analyze_dataset(dataset, "test", output_dir=str(output_dir), cache_dir=None,
+                                     llm_settings={"endpoint": endpoint, "max_retries": 0}, token_budget=10_000,
+                                     narration=narration)
+
+
+@pytest.mark.parametrize("narration", ["batched", "streamed"])
+def test_readme_missing_the_stories_of_a_failed_request_is_not_recorded(tmp_path, narration):
+    dataset, output_dir = _dataset(tmp_path / "data.csv"), tmp_path / "out"
+    received = []
+    with stub_llm_server(faults=[{"status": 400}], received=received) as endpoint:
+        _analyze(dataset, output_dir, endpoint, narration)
+    assert len(received) >= 2
+    with open(output_dir / "README.md", encoding="utf-8") as f:
+        assert f.read().count(autolysis.MISSING_STORY) == 1
+    assert "readme" not in autolysis.ArtifactManifest.load(str(output_dir)).data["stages"]
+
+    # the next run asks again instead of keeping the partial README
+    with stub_llm_server() as endpoint:
+        _analyze(dataset, output_dir, endpoint, narration)
+    with open(output_dir / "README.md", encoding="utf-8") as f:
+        assert autolysis.MISSING_STORY not in f.read()
+    assert "readme" in autolysis.ArtifactManifest.load(str(output_dir)).data["stages"]
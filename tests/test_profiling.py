@@ -0,0 +1,114 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import autolysis
+
+# uneven chunk boundaries, including a chunk of a single row
+BOUNDARIES = [0, 1, 137, 900, 905, 2_500, 4_000]
+
+
+def _frame(rows=4_000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(10, 3, size=rows)
+    df = pd.DataFrame({
+        "x": x,
+        "y": 0.5 * x + rng.normal(size=rows),
+        "z": rng.exponential(5, size=rows),
+        "count": rng.integers(0, 1_000, size=rows),
+        "city": rng.choice(["Oslo", "Lima", "Pune", "Kobe"], size=rows),
+    })
+    # sparse columns, so the pairwise-complete accumulators see different rows per pair
+    df.loc[rng.random(rows) < 0.1, "y"] = np.nan
+    df.loc[rng.random(rows) < 0.3, "z"] = np.nan
+    df.loc[rng.random(rows) < 0.05, "city"] = None
+    return df
+
+
+def _chunk_profiles(df, numeric_columns):
+    profiles = []
+    for start, end in zip(BOUNDARIES, BOUNDARIES[1:]):
+        profiles.append(autolysis.StreamingProfiler(numeric_columns).update(df.iloc[start:end], offset=start))
+    return profiles
+
+
+def _merged(profiles, order):
+    merged = autolysis.StreamingProfiler()
+    for index in order:
+        merged.merge(profiles[index])
+    return merged
+
+
+def _tree_merged(profiles):
+    # pairwise merges as a parallel reduction would do them
+    while len(profiles) > 1:
+        profiles = [profiles[i].merge(profiles[i + 1]) if i + 1 < len(profiles) else profiles[i]
+                    for i in range(0, len(profiles), 2)]
+    return profiles[0]
+
+
+@pytest.mark.parametrize("order", ["forward", "reversed", "shuffled", "tree"])
+def test_merged_chunks_match_the_in_memory_profile(order):
+    df = _frame()
+    numeric_columns = df.select_dtypes(include="number").columns.tolist()
+    profiles = _chunk_profiles(df, numeric_columns)
+    if order == "tree":
+        profiler = _tree_merged(profiles)
+    else:
+        indices = list(range(len(profiles)))
+        if order == "reversed":
+            indices.reverse()
+        elif order == "shuffled":
+            np.random.default_rng(1).shuffle(indices)
+        profiler = _merged(profiles, indices)
+
+    summary = profiler.summary()
+    expected = autolysis.profile_dataset(df)
+    assert summary["shape"] == df.shape
+    assert summary["null_values"] == expected["null_values"]
+    assert summary["dtypes"] == expected["dtypes"]
+    describe = df.describe()
+    for column in numeric_columns:
+        for statistic in ("count", "mean", "std", "min", "max"):
+            assert summary["numerical_summary"][column][statistic] == pytest.approx(describe.loc[statistic, column],
+                                                                                   rel=1e-9)
+    pd.testing.assert_frame_equal(profiler.correlation_matrix(), df[numeric_columns].corr(), rtol=1e-9)
+    # the sample rows depend on the row positions only, not on how the chunks were combined
+    assert json.dumps(summary["sample_data"]) == json.dumps(expected["sample_data"])
+
+
+def test_chunks_parsed_with_different_dtypes_merge():
+    # the first chunk parses as int, the second as float because of a missing value
+    first = pd.DataFrame({"a": [1, 2, 3], "b": ["u", "v", "w"]})
+    second = pd.DataFrame({"a": [4.5, None], "b": ["x", None]})
+    profiler = autolysis.StreamingProfiler().update(first).update(second)
+    summary = profiler.summary()
+    assert summary["shape"] == (5, 2)
+    assert summary["dtypes"]["a"] == "float64"
+    assert summary["null_values"] == {"a": 1, "b": 1}
+    assert summary["numerical_summary"]["a"]["mean"] == pytest.approx(np.mean([1, 2, 3, 4.5]))
+
+
+def test_merging_an_empty_profiler_changes_nothing():
+    df = _frame(rows=200)
+    profiler = autolysis.StreamingProfiler().update(df)
+    before = json.dumps(profiler.summary(), default=str)
+    profiler.merge(autolysis.StreamingProfiler())
+    assert json.dumps(profiler.summary(), default=str) == before
+    assert json.dumps(autolysis.StreamingProfiler().merge(profiler).summary(), default=str) == before
+
+
+def test_parallel_streaming_profile_matches_the_serial_one(tmp_path):
+    df = _frame()
+    dataset = tmp_path / "data.csv"
+    df.to_csv(dataset, index=False)
+    serial = autolysis.profile_dataset_streaming(str(dataset), chunksize=333).summary()
+    parallel = autolysis.profile_dataset_streaming(str(dataset), chunksize=333, workers=3).summary()
+    assert parallel["shape"] == serial["shape"] == df.shape
+    assert parallel["null_values"] == serial["null_values"]
+    for column, statistics in serial["numerical_summary"].items():
+        for statistic in ("count", "mean", "std", "min", "max"):
+            assert parallel["numerical_summary"][column][statistic] == pytest.approx(statistics[statistic], rel=1e-9)
+    assert json.dumps(parallel["sample_data"]) == json.dumps(serial["sample_data"])
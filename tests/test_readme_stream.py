@@ -0,0 +1,52 @@
+import io
+import os
+
+import pandas as pd
+from PIL import Image
+
+import autolysis
+from benchmark import stub_llm_server
+
+HEADERS = '{"headers": ["a", "b"]}'
+
+
+def _figures():
+    figures = []
+    for index, color in enumerate(["red", "green", "blue"]):
+        buffer = io.BytesIO()
+        Image.new("RGB", (32, 24), color).save(buffer, format="PNG")
+        figures.append(autolysis.RenderedFigure(name=f"plot_{index}.png", data=buffer.getvalue()))
+    return figures
+
+
+def _create_readme(endpoint, output_dir, cache=None):
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0], "b": [2.0, 4.0, 5.0, 9.0]})
+    client = autolysis.LLMClient("test", endpoint=endpoint, max_retries=0)
+    return autolysis.process_images_and_create_readme(df, "data.csv", "test", HEADERS, output_dir=str(output_dir),
+                                                      cache=cache, client=client, figures=_figures(),
+                                                      image_options=None, stream=True)
+
+
+def test_streamed_readme_has_every_section(tmp_path):
+    with stub_llm_server() as endpoint:
+        path = _create_readme(endpoint, tmp_path)
+    with open(path, encoding="utf-8") as f:
+        readme = f.read()
+    for number in (1, 2, 3):
+        assert f"A synthetic story about image {number}." in readme
+    assert autolysis.MISSING_STORY not in readme
+
+
+def test_dropped_stream_leaves_a_partial_readme(tmp_path):
+    cache = autolysis.LLMResponseCache(str(tmp_path / "cache"))
+    # the stream ends in the middle of the second story
+    with stub_llm_server(faults=[{"drop_after": 12}]) as endpoint:
+        path = _create_readme(endpoint, tmp_path, cache)
+    assert path is None
+    with open(os.path.join(str(tmp_path), "README.md"), encoding="utf-8") as f:
+        readme = f.read()
+    assert "A synthetic story about image 1." in readme
+    # the truncated story is not written as if it were complete, nor cached
+    assert "image 2" not in readme
+    assert readme.count(autolysis.MISSING_STORY) == 2
+    assert not [name for name in os.listdir(str(tmp_path / "cache")) if name.endswith(".json")]
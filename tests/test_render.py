@@ -0,0 +1,63 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from PIL import Image, ImageChops
+
+import autolysis
+
+# the text of a fitted layout ends PLOT_PAD_PIXELS from the edge; the glyphs' ink a little further inside
+MAX_MARGIN = 3 * autolysis.PLOT_PAD_PIXELS
+
+
+@pytest.fixture(scope="module")
+def df():
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=2_000)
+    return pd.DataFrame({
+        "a_rather_long_column_name": base * 3 + 100,
+        "second": base + rng.normal(scale=0.5, size=2_000),
+        "third": rng.normal(size=2_000) * 1e6,
+        "fourth": rng.exponential(size=2_000),
+    })
+
+
+def _margins(figure):
+    # size of the image and the empty border around its content on each side (left, top, right, bottom)
+    image = Image.open(io.BytesIO(figure.data)).convert("RGB")
+    box = ImageChops.difference(image, Image.new("RGB", image.size, (255, 255, 255))).getbbox()
+    assert box is not None, "the image is blank"
+    width, height = image.size
+    return image.size, (box[0], box[1], width - box[2], height - box[3])
+
+
+PLOTS = {
+    "scatterplot": (lambda df: autolysis.generate_scatterplot(df, density_threshold=None), (8, 6)),
+    "scatterplot_density": (lambda df: autolysis.generate_scatterplot(df, density_threshold=100), (8, 6)),
+    "correlation_heatmap": (lambda df: autolysis.generate_correlation_heatmap(df), (10, 8)),
+    "clustering": (lambda df: autolysis.generate_cluster_data(df, max_k=3), (8, 6)),
+    "clustering_pca": (lambda df: autolysis.generate_cluster_data(df, max_k=3, projection="pca"), (8, 6)),
+}
+
+
+@pytest.mark.parametrize("plot", list(PLOTS))
+def test_plot_fills_the_image_without_clipping(df, plot):
+    generate, figsize = PLOTS[plot]
+    figure = generate(df)
+    size, margins = _margins(figure)
+    # cropped to the content at most, never larger than the figure; the fitted margins leave little to crop
+    width, height = figsize[0] * autolysis.PLOT_DPI, figsize[1] * autolysis.PLOT_DPI
+    assert 0.9 * width <= size[0] <= width and 0.9 * height <= size[1] <= height, size
+    # content touching an edge is cut off, a wide empty border is wasted space
+    for margin in margins:
+        assert 1 <= margin <= MAX_MARGIN, margins
+    assert figure.metadata["render_seconds"] > 0
+
+
+def test_layout_is_reused_per_kind(df):
+    autolysis.generate_correlation_heatmap(df)
+    fig, _ = autolysis.new_figure((10, 8), kind="correlation_heatmap")
+    layout = autolysis._figure_layouts.layouts["correlation_heatmap", (10.0, 8.0)]
+    assert fig.subplotpars.left == pytest.approx(layout["left"])
+    assert fig.subplotpars.top == pytest.approx(layout["top"])
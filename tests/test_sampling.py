@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import autolysis
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "value": rng.normal(size=3_000),
+        "group": rng.choice(["a", "b", "c"], size=3_000, p=[0.7, 0.2, 0.1]),
+        "id": np.arange(3_000),
+    })
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return str(path), pd.read_csv(path)
+
+
+@pytest.mark.parametrize("stratify", [None, "group", "id"])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_streamed_sample_equals_in_memory_sample(dataset, stratify, workers):
+    path, df = dataset
+    streamed = autolysis.profile_dataset_streaming(path, chunksize=400, workers=workers, stratify=stratify).summary()
+    in_memory = autolysis.AnalysisContext(df, stratify=stratify).sample(autolysis.PROFILE_SAMPLE_ROWS).to_dict()
+    assert streamed["sample_data"] == in_memory
+
+
+def test_stratified_sample_keeps_the_proportions(dataset):
+    _, df = dataset
+    sample = autolysis.AnalysisContext(df, stratify="group").sample(100)
+    assert sample["group"].value_counts().to_dict() == {"a": 70, "b": 20, "c": 10}
+
+
+def test_unknown_stratify_column_fails_once_the_data_is_loaded(dataset, tmp_path):
+    path, _ = dataset
+    # parse_args does not read the dataset, usage errors and the token check come first
+    assert autolysis.parse_args([path, "--stratify", "missing"]).stratify == "missing"
+    for numeric_only in (False, True):
+        result = autolysis._analyze_dataset_job(path, "test", {"output_dir": str(tmp_path / "out"), "cache_dir": None,
+                                                               "stratify": "missing", "numeric_only": numeric_only})
+        assert result["status"] == "failed"
+        assert result["error"] == f"ValueError: Stratify column 'missing' not found in {path}"
+
+
+def test_stratify_must_be_one_of_usecols(dataset, capsys):
+    path, _ = dataset
+    with pytest.raises(SystemExit):
+        autolysis.parse_args([path, "--usecols", "value", "--stratify", "group"])
+    assert "is not one of the --usecols columns" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("stratify", [None, "group"])
+def test_merged_samples_are_in_file_order(dataset, stratify):
+    _, df = dataset
+    samplers = [autolysis.ReservoirSampler(50, stratify=stratify).update(df.iloc[start:start + 700], offset=start)
+                for start in range(0, len(df), 700)]
+    merged = autolysis.ReservoirSampler(50, stratify=stratify)
+    for sampler in reversed(samplers):
+        merged.merge(sampler)
+    expected = autolysis.AnalysisContext(df, stratify=stratify).sample(20)
+    sample = merged.sample(20)
+    assert sample.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(sample, expected)
+
+
+@pytest.mark.parametrize("stratify", [None, "group"])
+def test_in_memory_sample_copies_only_the_sampled_rows(monkeypatch, stratify):
+    import tracemalloc
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(200_000, 20)), columns=[f"c{index}" for index in range(20)])
+    df["group"] = rng.choice(["a", "b", "c"], size=len(df))
+    table_bytes = int(df.memory_usage(deep=True).sum())
+    # the in-memory path never pushes the table through a reservoir
+    monkeypatch.setattr(autolysis.ReservoirSampler, "update", None)
+    ctx = autolysis.AnalysisContext(df, stratify=stratify)
+    tracemalloc.start()
+    try:
+        sample = ctx.sample(500)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(sample) == 500 and sample.index.is_monotonic_increasing
+    # a few 8-byte keys, codes and ranks per row, but no copy of the table
+    assert peak < 0.5 * table_bytes
+    pd.testing.assert_frame_equal(sample, df.iloc[sample.index])
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import autolysis
+
+
+def test_stages_start_after_their_dependencies_and_get_their_results():
+    events = []
+    lock = threading.Lock()
+
+    def stage(name, result):
+        def run(*inputs):
+            with lock:
+                events.append(("start", name, inputs))
+            time.sleep(0.01)
+            with lock:
+                events.append(("end", name))
+            return result
+        return run
+
+    scheduler = autolysis.StageScheduler(max_workers=4)
+    scheduler.add("load", stage("load", 1))
+    scheduler.add("left", stage("left", 2), depends_on=["load"])
+    scheduler.add("right", stage("right", 3), depends_on=["load"])
+    scheduler.add("report", stage("report", 4), depends_on=["right", "left"])
+    results = scheduler.run()
+
+    assert results == {"load": 1, "left": 2, "right": 3, "report": 4}
+    position = {event[:2]: index for index, event in enumerate(events)}
+    for name, depends_on in (("left", ["load"]), ("right", ["load"]), ("report", ["left", "right"])):
+        for dependency in depends_on:
+            assert position[("end", dependency)] < position[("start", name)]
+    # the results arrive in the order the dependencies were listed
+    assert ("start", "report", (3, 2)) in events
+
+
+def test_independent_stages_overlap():
+    barrier = threading.Barrier(2, timeout=5)
+    scheduler = autolysis.StageScheduler(max_workers=2)
+    # deadlocks (and the barrier times out) unless both stages run at the same time
+    scheduler.add("a", barrier.wait)
+    scheduler.add("b", barrier.wait)
+    assert sorted(scheduler.run().values()) == [0, 1]
+
+
+def test_dependents_of_a_failed_stage_are_skipped_and_the_error_propagates():
+    calls = []
+
+    def fail():
+        raise ValueError("broken")
+
+    def record(name):
+        def run(*inputs):
+            calls.append(name)
+            return name
+        return run
+
+    scheduler = autolysis.StageScheduler(max_workers=2)
+    scheduler.add("ok", record("ok"))
+    scheduler.add("fail", fail)
+    scheduler.add("after_fail", record("after_fail"), depends_on=["fail"])
+    scheduler.add("after_both", record("after_both"), depends_on=["ok", "after_fail"])
+    scheduler.add("after_ok", record("after_ok"), depends_on=["ok"])
+    with pytest.raises(ValueError, match="broken"):
+        scheduler.run()
+    # independent stages still ran, the dependents of the failed one never started
+    assert sorted(calls) == ["after_ok", "ok"]
+
+
+def test_the_first_failure_in_stage_order_is_raised():
+    def fail(error):
+        def run():
+            time.sleep(0.05 if isinstance(error, KeyError) else 0)
+            raise error
+        return run
+
+    scheduler = autolysis.StageScheduler(max_workers=2)
+    scheduler.add("first", fail(KeyError("first")))
+    scheduler.add("second", fail(ValueError("second")))
+    with pytest.raises(KeyError):
+        scheduler.run()
+
+
+def test_invalid_stages_are_rejected():
+    scheduler = autolysis.StageScheduler()
+    scheduler.add("a", lambda: None)
+    with pytest.raises(ValueError, match="Duplicate stage"):
+        scheduler.add("a", lambda: None)
+    with pytest.raises(ValueError, match="unknown stages: b"):
+        scheduler.add("c", lambda result: None, depends_on=["a", "b"])
+
+
+def test_concurrent_stages_compute_shared_statistics_once(monkeypatch):
+    rng = np.random.default_rng(0)
+    ctx = autolysis.AnalysisContext(pd.DataFrame({"x": rng.normal(size=1_000), "y": rng.normal(size=1_000)}))
+    calls = []
+    describe = pd.DataFrame.describe
+
+    def slow_describe(df, *args, **kwargs):
+        calls.append(threading.current_thread().name)
+        time.sleep(0.05)  # long enough for every stage to ask before the first one is done
+        return describe(df, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, "describe", slow_describe)
+    scheduler = autolysis.StageScheduler(max_workers=4)
+    for index in range(4):
+        scheduler.add(f"stage{index}", lambda: ctx.describe)
+    results = scheduler.run()
+    assert len(calls) == 1
+    assert all(result is ctx.describe for result in results.values())
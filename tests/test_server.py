@@ -0,0 +1,160 @@
+import http.client
+import io
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+import autolysis
+from benchmark import stub_llm_server
+
+
+def _wait_for(predicate, timeout=120):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"x": range(30), "y": [value % 7 for value in range(30)], "label": ["a", "b", "c"] * 10}).to_csv(
+        path, index=False)
+    return str(path)
+
+
+@contextmanager
+def _analysis_server(jobs_dir):
+    with stub_llm_server() as endpoint:
+        server = autolysis.AnalysisServer("test", workers=1, jobs_dir=str(jobs_dir), cache_dir=None,
+                                          llm_settings={"endpoint": endpoint})
+        try:
+            yield server
+        finally:
+            server.close()
+
+
+@contextmanager
+def _http_server(analysis):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), autolysis._ServerHandler)
+    httpd.analysis = analysis
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd.server_address
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def analysis(tmp_path):
+    # a fresh server whose only worker is still warming up, so the first job keeps it busy for a while
+    with _analysis_server(tmp_path / "jobs") as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def idle_analysis(tmp_path_factory):
+    # shared by the tests whose requests never reach the queue
+    with _analysis_server(tmp_path_factory.mktemp("jobs")) as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def http_server(idle_analysis):
+    with _http_server(idle_analysis) as address:
+        yield address
+
+
+def test_jobs_queue_behind_a_busy_worker_and_can_be_cancelled(analysis, dataset):
+    running = analysis.submit(dataset_file=dataset)
+    queued = analysis.submit(dataset_file=dataset)
+    last = analysis.submit(upload=io.BytesIO(open(dataset, "rb").read()), name="../upload.csv")
+    # the worker is still warming up, the first job waits for it
+    _wait_for(lambda: running.status == "running")
+    status = analysis.status()
+    assert (status["workers"], status["busy"], status["queue_depth"]) == (1, 1, 2)
+    assert status["jobs"] == {"running": 1, "queued": 2}
+    # the upload is stored under its base name in the job's directory
+    assert last.dataset == os.path.join(last.output_dir, "upload.csv")
+
+    assert analysis.cancel(queued.id) is queued
+    assert queued.status == "cancelled"
+    assert analysis.status()["queue_depth"] == 1
+    analysis.cancel(running.id)
+    _wait_for(lambda: running.status == "cancelled")
+
+    # the restarted worker takes the remaining job
+    _wait_for(lambda: last.finished is not None)
+    assert last.status == "ok", last.error
+    assert os.path.exists(last.to_dict()["readme"])
+    assert analysis.status()["queue_depth"] == 0
+    with pytest.raises(ValueError, match="already finished"):
+        analysis.cancel(last.id)
+    assert analysis.cancel("unknown") is None
+
+
+def test_missing_datasets_and_bad_upload_names_are_rejected(idle_analysis, tmp_path):
+    with pytest.raises(ValueError, match="No such dataset file"):
+        idle_analysis.submit(dataset_file=str(tmp_path / "missing.csv"))
+    for name in (".", "..", "dir/.."):
+        with pytest.raises(ValueError, match="Invalid upload file name"):
+            idle_analysis.submit(upload=io.BytesIO(b"x\n1\n"), name=name)
+    assert idle_analysis.status()["queue_depth"] == 0
+    assert not idle_analysis.jobs
+
+
+def _request(address, method, path, body=b"", headers=None):
+    connection = http.client.HTTPConnection(*address, timeout=10)
+    try:
+        connection.putrequest(method, path)
+        for key, value in (headers or {}).items():
+            connection.putheader(key, value)
+        connection.endheaders(body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_invalid_content_length_is_a_bad_request(http_server, length):
+    status, payload = _request(http_server, "POST", "/jobs", headers={"Content-Length": length})
+    assert status == 400
+    assert payload["error"] == "invalid Content-Length"
+
+
+@pytest.mark.parametrize("name", [".", ".."])
+def test_upload_named_like_a_directory_is_a_bad_request(http_server, name):
+    body = b"x,y\n1,2\n"
+    status, payload = _request(http_server, "POST", f"/jobs?name={name}", body=body,
+                               headers={"Content-Type": "text/csv", "Content-Length": str(len(body))})
+    assert status == 400
+    assert "Invalid upload file name" in payload["error"]
+
+
+def test_jobs_are_submitted_listed_and_cancelled_over_http(analysis, dataset):
+    body = json.dumps({"dataset": dataset}).encode()
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(body))}
+    with _http_server(analysis) as address:
+        status, first = _request(address, "POST", "/jobs", body=body, headers=headers)
+        assert status == 202
+        _wait_for(lambda: analysis.jobs[first["id"]].status == "running")
+        status, second = _request(address, "POST", "/jobs", body=body, headers=headers)
+        assert (status, second["status"], second["queue_depth"]) == (202, "queued", 1)
+
+        status, cancelled = _request(address, "DELETE", f"/jobs/{second['id']}")
+        assert (status, cancelled["status"]) == (200, "cancelled")
+        assert _request(address, "DELETE", f"/jobs/{second['id']}")[0] == 409
+        assert _request(address, "GET", "/jobs/unknown")[0] == 404
+        status, listing = _request(address, "GET", "/jobs")
+        assert {job["id"] for job in listing["jobs"]} == {first["id"], second["id"]}
+        status, server_status = _request(address, "GET", "/status")
+        assert server_status["jobs"]["cancelled"] == 1
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import autolysis
+
+QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+# uneven chunk sizes, including tiny ones that never fill a level on their own
+CHUNK_SIZES = [1, 7, 5_000, 333, 40_000, 12, 54_647]
+
+
+def _rank_errors(sketch, values, qs=QUANTILES):
+    # normalized rank distance between every estimate and the quantile it stands for
+    ordered = np.sort(values)
+    estimates = sketch.quantiles(qs)
+    low = np.searchsorted(ordered, estimates, side="left") / ordered.size
+    high = np.searchsorted(ordered, estimates, side="right") / ordered.size
+    return [max(low_ - q, q - high_, 0.0) for q, low_, high_ in zip(qs, low, high)]
+
+
+def _chunks(values):
+    chunks, start = [], 0
+    for size in CHUNK_SIZES:
+        chunks.append(values[start:start + size])
+        start += size
+    assert start == values.size
+    return chunks
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_quantiles_stay_within_the_rank_error(seed):
+    values = np.random.default_rng(seed).lognormal(size=100_000)
+    sketch = autolysis.QuantileSketch(seed=seed).update(values)
+    assert not sketch.exact
+    assert max(_rank_errors(sketch, values)) <= sketch.rank_error
+    assert sketch.quantiles((0.0, 1.0)) == [values.min(), values.max()]
+
+
+@pytest.mark.parametrize("order", ["forward", "reversed", "shuffled"])
+def test_merged_sketches_stay_within_the_rank_error(order):
+    values = np.random.default_rng(0).normal(size=sum(CHUNK_SIZES))
+    sketches = [autolysis.QuantileSketch(seed=index).update(chunk) for index, chunk in enumerate(_chunks(values))]
+    if order == "reversed":
+        sketches.reverse()
+    elif order == "shuffled":
+        np.random.default_rng(1).shuffle(sketches)
+    merged = autolysis.QuantileSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    assert merged.count == values.size
+    assert max(_rank_errors(merged, values)) <= merged.rank_error
+    # bounded memory whatever the number of values
+    assert sum(level.size for level in merged.levels) <= 3 * merged.k
+
+
+def test_small_inputs_are_exact_like_describe():
+    values = np.array([4.0, 1.0, np.nan, 3.0, 2.0, 10.0])
+    sketch = autolysis.QuantileSketch().update(values[:2]).merge(autolysis.QuantileSketch().update(values[2:]))
+    assert sketch.exact and sketch.rank_error == 0.0
+    described = pd.Series(values).describe()
+    assert sketch.quantiles() == [described["25%"], described["50%"], described["75%"]]
+    assert autolysis.QuantileSketch().quantiles() == [None, None, None]
+
+
+@pytest.mark.parametrize("distinct", [1, 100, 5_000, 200_000])
+def test_distinct_count_stays_within_the_error(distinct):
+    rng = np.random.default_rng(distinct)
+    values = pd.Series(rng.integers(0, distinct, size=max(3 * distinct, 1_000)))
+    true_count = values.nunique()
+    counter = autolysis.HyperLogLog().update(values)
+    # three standard errors
+    assert abs(counter.estimate() - true_count) <= 3 * counter.relative_error * true_count + 1
+
+
+@pytest.mark.parametrize("order", ["forward", "reversed", "shuffled"])
+def test_merged_counters_equal_a_single_pass(order):
+    values = pd.Series(np.random.default_rng(0).choice([f"user{index}" for index in range(30_000)],
+                                                       size=sum(CHUNK_SIZES)))
+    counters = [autolysis.HyperLogLog().update(pd.Series(chunk)) for chunk in _chunks(values.to_numpy())]
+    if order == "reversed":
+        counters.reverse()
+    elif order == "shuffled":
+        np.random.default_rng(1).shuffle(counters)
+    merged = autolysis.HyperLogLog()
+    for counter in counters:
+        merged.merge(counter)
+    single = autolysis.HyperLogLog().update(values)
+    # the register-wise maximum does not depend on how the values were split
+    assert np.array_equal(merged.registers, single.registers)
+    assert merged.estimate() == single.estimate()
+    assert abs(merged.estimate() - values.nunique()) <= 3 * merged.relative_error * values.nunique()
+
+
+def test_numbers_count_once_whatever_they_were_parsed_as():
+    counter = autolysis.HyperLogLog().update(pd.Series([1, 2, 3]))
+    counter.update(pd.Series([1.0, 2.0, 3.0, None]))
+    assert counter.estimate() == 3
+    assert autolysis.HyperLogLog().estimate() == 0
+
+
+def test_streaming_profile_quartiles_and_distinct_counts_stay_within_their_bounds():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"value": rng.gamma(2.0, size=sum(CHUNK_SIZES)),
+                       "key": rng.integers(0, 20_000, size=sum(CHUNK_SIZES)).astype(str)})
+    profiler = autolysis.StreamingProfiler()
+    start = 0
+    for size in CHUNK_SIZES:
+        profiler.update(df.iloc[start:start + size])
+        start += size
+    statistics = profiler.summary()["approximate_statistics"]
+
+    value = statistics["value"]
+    ordered = np.sort(df["value"].to_numpy())
+    for q, estimate in zip(autolysis.SKETCH_QUANTILES, value["quantiles"].values()):
+        rank = np.searchsorted(ordered, estimate) / ordered.size
+        assert abs(rank - q) <= value["rank_error"] + 1 / ordered.size
+    for column in df.columns:
+        distinct = statistics[column]["distinct"]
+        true_count = df[column].nunique()
+        assert abs(distinct["estimate"] - true_count) <= 3 * distinct["relative_error"] * true_count
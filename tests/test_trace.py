@@ -0,0 +1,68 @@
+import json
+import os
+import pstats
+
+import pytest
+
+import autolysis
+
+
+def _busy(seconds=0.05):
+    # burn CPU, so the stage has a measurable CPU time
+    import time
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def test_records_every_stage_and_writes_json(tmp_path):
+    trace = autolysis.RunTrace(str(tmp_path / "trace.json"))
+    trace.info["dataset"] = "data.csv"
+    with trace.stage("load", input_bytes=123) as entry:
+        _busy()
+        entry["rows"] = 10
+    trace.skipped("plots")
+    trace.save()
+
+    with open(str(tmp_path / "trace.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["version"] == autolysis.TRACE_VERSION
+    assert data["dataset"] == "data.csv"
+    load, plots = data["stages"]
+    assert load["stage"] == "load" and load["input_bytes"] == 123 and load["rows"] == 10
+    assert load["wall_seconds"] > 0 and load["cpu_seconds"] >= 0.04
+    assert load["peak_rss_bytes"] > 0 and load["peak_rss_delta_bytes"] >= 0
+    assert plots == {"stage": "plots", "skipped": "inputs unchanged"}
+    assert data["wall_seconds"] >= load["wall_seconds"]
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".tmp")]
+
+
+def test_annotate_sums_numbers_in_the_innermost_stage(tmp_path):
+    trace = autolysis.RunTrace(str(tmp_path / "trace.json"))
+    trace.annotate(ignored=1)  # outside of a stage
+    with trace.stage("readme"):
+        with trace.stage("request"):
+            trace.annotate(llm_requests=1, llm_cache="miss")
+            trace.annotate(llm_requests=1, llm_cache="hit")
+        trace.annotate(images=3)
+    request, readme = trace.to_dict()["stages"]
+    assert request["llm_requests"] == 2 and request["llm_cache"] == "hit"
+    assert readme["images"] == 3
+    assert "ignored" not in readme and "ignored" not in request
+
+
+def test_failed_stage_keeps_the_error(tmp_path):
+    trace = autolysis.RunTrace(str(tmp_path / "trace.json"))
+    with pytest.raises(ValueError):
+        with trace.stage("plots"):
+            raise ValueError("no numeric columns")
+    assert trace.to_dict()["stages"][0]["error"] == "ValueError: no numeric columns"
+
+
+def test_profile_dumps_one_stats_file_per_stage(tmp_path):
+    trace = autolysis.RunTrace(str(tmp_path / "trace.json"), profile=True)
+    with trace.stage("profile"):
+        _busy()
+    path = trace.to_dict()["stages"][0]["profile"]
+    assert path == str(tmp_path / "trace.profile.prof")
+    assert pstats.Stats(path).total_calls > 0